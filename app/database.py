@@ -3,7 +3,10 @@
 import os
 import logging
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, Text, DateTime, Date, UniqueConstraint, text
+
+import orjson
+from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, Text, DateTime, Date, Index, JSON, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -15,12 +18,20 @@ DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./autosem.db")
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-# Build engine with appropriate settings
+
+def _json_dumps(value) -> str:
+    return orjson.dumps(value).decode()
+
+
+# Build engine with appropriate settings (JSON columns are encoded with orjson)
 if "sqlite" in DATABASE_URL:
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False},
+                           json_serializer=_json_dumps, json_deserializer=orjson.loads)
 else:
     engine = create_engine(
         DATABASE_URL,
+        json_serializer=_json_dumps,
+        json_deserializer=orjson.loads,
         pool_pre_ping=True,
         pool_recycle=300,
         pool_size=5,
@@ -42,6 +53,7 @@ def _run_migrations():
     migrations = [
         ("campaigns", "impressions", "INTEGER DEFAULT 0"),
         ("campaigns", "clicks", "INTEGER DEFAULT 0"),
+        ("campaigns", "targeting", "JSONB" if engine.dialect.name == "postgresql" else "JSON"),
     ]
     with engine.connect() as conn:
         for table, column, col_type in migrations:
@@ -52,6 +64,24 @@ def _run_migrations():
             except Exception:
                 conn.rollback()  # Column already exists, skip
 
+        # create_all() does not add indexes to tables that already exist
+        for index in CampaignModel.__table__.indexes:
+            index.create(bind=conn, checkfirst=True)
+        conn.commit()
+
+        # Trigram index so attribution's ILIKE '%name%' match can avoid a seq scan
+        if engine.dialect.name == "postgresql":
+            try:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_campaign_name_trgm "
+                    "ON campaigns USING gin (name gin_trgm_ops)"
+                ))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.warning(f"Migration: trigram index on campaigns.name skipped: {e}")
+
 
 def get_db():
     db = SessionLocal()
@@ -89,6 +119,12 @@ class ProductModel(Base):
 
 class CampaignModel(Base):
     __tablename__ = "campaigns"
+    __table_args__ = (
+        Index("ix_campaign_platform_cid", "platform_campaign_id"),
+        Index("ix_campaign_platform_status_updated", "platform", "status", "updated_at"),
+        # Campaign generation's per-platform NOT EXISTS probe
+        Index("ix_campaign_product_platform", "product_id", "platform"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     platform = Column(String, nullable=False)
@@ -111,6 +147,7 @@ class CampaignModel(Base):
     headlines = Column(Text, nullable=True)
     descriptions = Column(Text, nullable=True)
     keywords = Column(Text, nullable=True)
+    targeting = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -196,6 +233,19 @@ class TikTokTokenModel(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class TikTokImageModel(Base):
+    __tablename__ = "tiktok_images"
+    __table_args__ = (
+        UniqueConstraint("advertiser_id", "url_hash", name="uq_tiktok_image_advertiser_url"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    advertiser_id = Column(String, nullable=False)
+    url_hash = Column(String(32), nullable=False)  # md5 of the source image URL
+    image_id = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 class ABTestModel(Base):
     __tablename__ = "ab_tests"
 
@@ -16,8 +16,9 @@ import hashlib
 import hmac
 from datetime import datetime, timezone
 
+import orjson
 import requests
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from typing import Optional
@@ -112,7 +113,7 @@ def _api(method: str, endpoint: str, **kwargs) -> dict:
         headers["X-Shopify-Access-Token"] = token
         resp = requests.request(method, url, headers=headers, timeout=20, **kwargs)
 
-    return resp.json()
+    return orjson.loads(resp.content)
 
 
 def _log_activity(db: Session, action: str, entity_id: str = "", details: str = ""):
@@ -523,7 +524,8 @@ def list_registered_webhooks():
 
 @router.post("/webhook/order-created", summary="Order created webhook",
              description="Receive Shopify order webhook, attribute revenue to campaigns via UTM/referrer")
-async def webhook_order_created(request: Request, db: Session = Depends(get_db)):
+async def webhook_order_created(request: Request, background_tasks: BackgroundTasks,
+                                db: Session = Depends(get_db)):
     """Receive Shopify order webhook.
 
     Shopify sends the order as a raw JSON body (not wrapped in {"order": ...}).
@@ -564,7 +566,7 @@ async def webhook_order_created(request: Request, db: Session = Depends(get_db))
     # Attribute revenue to a campaign
     from app.services.attribution import AttributionService
     attribution_svc = AttributionService(db)
-    result = attribution_svc.attribute_order(order)
+    result = attribution_svc.attribute_order(order, background_tasks)
 
     # Fire Meta CAPI Purchase event (server-side conversion tracking)
     capi_result = None
@@ -624,7 +626,7 @@ async def webhook_order_created(request: Request, db: Session = Depends(get_db))
 # ─── Checkout Audit ──────────────────────────────────────────────
 
 @router.get("/checkout-audit", summary="Abandoned checkout audit report")
-def checkout_audit(days_back: int = 30, db: Session = Depends(get_db)):
+def checkout_audit(days_back: int = 30, refresh: bool = False, db: Session = Depends(get_db)):
     """Analyze abandoned checkouts to diagnose conversion problems.
 
     With 509 ad clicks and 0 purchases, this answers WHERE visitors drop off:
@@ -633,12 +635,13 @@ def checkout_audit(days_back: int = 30, db: Session = Depends(get_db)):
     - Starting checkout but not completing payment?
 
     Returns 7-day and 30-day abandonment analysis with UTM attribution
-    and actionable recommendations.
+    and actionable recommendations. Reports are cached for a minute;
+    pass refresh=true to rebuild immediately.
     """
     from app.services.checkout_audit import CheckoutAuditor
 
-    auditor = CheckoutAuditor(_api)
-    report = auditor.generate_report(days_back=days_back)
+    auditor = CheckoutAuditor(_api, shop=SHOPIFY_STORE)
+    report = auditor.generate_report(days_back=days_back, refresh=refresh)
 
     _log_activity(
         db, "CHECKOUT_AUDIT_RUN", "",
@@ -651,7 +654,7 @@ def checkout_audit(days_back: int = 30, db: Session = Depends(get_db)):
 
 
 @router.get("/cart-recovery", summary="Get recoverable abandoned carts")
-def cart_recovery(hours_back: int = 48, db: Session = Depends(get_db)):
+def cart_recovery(hours_back: int = 48, refresh: bool = False, db: Session = Depends(get_db)):
     """Get abandoned checkouts from last N hours with recovery URLs.
 
     Returns carts that have a customer email and recovery URL,
@@ -661,11 +664,13 @@ def cart_recovery(hours_back: int = 48, db: Session = Depends(get_db)):
     1. Send targeted recovery emails via Klaviyo
     2. Identify high-value carts worth personal outreach
     3. Track which products are most frequently abandoned
+
+    Results are cached for a minute; pass refresh=true to rebuild immediately.
     """
     from app.services.checkout_audit import CheckoutAuditor
 
-    auditor = CheckoutAuditor(_api)
-    result = auditor.get_recoverable_carts(hours_back=hours_back)
+    auditor = CheckoutAuditor(_api, shop=SHOPIFY_STORE)
+    result = auditor.get_recoverable_carts(hours_back=hours_back, refresh=refresh)
 
     _log_activity(
         db, "CART_RECOVERY_CHECK", "",
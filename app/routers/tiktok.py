@@ -1,5 +1,6 @@
 """TikTok Ads router - OAuth, campaign creation, and performance tracking
 
+v1.3.0 - Perf: Async routes over a shared httpx.AsyncClient (keep-alive pooling)
 v1.2.1 - Fix: /pause-all-campaigns uses correct endpoint /campaign/update/ with campaign_id
 v1.2.0 - Add: /pause-all-campaigns, /launch-targeted-campaign, /targeting-categories, /targeting-keywords
 v1.1.0 - Fix: /performance endpoint returns per-campaign metrics (spend, impressions, clicks, ctr, cpc)
@@ -13,38 +14,63 @@ Ad creation strategy priority:
 2. SINGLE_VIDEO + TT_USER + poster_url thumbnail (fallback)
 3. SINGLE_VIDEO + TT_USER + product image thumbnail
 4. Pangle display ad (audience network)
+Strategies 1-3 are POSTed concurrently as paused ads; the highest-priority success is
+enabled and any other ads created are deleted.
 
 Key insight: TikTok video upload response includes video_cover_url - a 9:16
 auto-generated cover image. Uploading this URL as an image via UPLOAD_BY_URL
 gives us a thumbnail that perfectly matches the video aspect ratio.
 """
 
+import asyncio
 import os
 import io
 import json
 import logging
+import math
+from html import escape
+from operator import itemgetter
 import time
 import hashlib
+import random
+import secrets
 import tempfile
 import subprocess
 from datetime import datetime, timedelta
-from pathlib import Path
+from types import MappingProxyType
 
-import requests
-from fastapi import APIRouter, Depends, Query, Request
-from fastapi.responses import RedirectResponse, HTMLResponse, JSONResponse
+import httpx
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, HTMLResponse, ORJSONResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.database import get_db, TikTokTokenModel, CampaignModel, ActivityLogModel
+from app.database import get_db, SessionLocal, TikTokTokenModel, TikTokImageModel, CampaignModel, ActivityLogModel
 
 logger = logging.getLogger("AutoSEM.TikTok")
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 TIKTOK_APP_ID = os.environ.get("TIKTOK_APP_ID", "7602833892719542273")
 TIKTOK_APP_SECRET = os.environ.get("TIKTOK_APP_SECRET", "b2d479247984871ef1b6f26c1639bf36ad822c21")
 TIKTOK_REDIRECT_URI = os.environ.get("TIKTOK_REDIRECT_URI", "https://auto-sem.replit.app/api/v1/tiktok/callback")
+# Used when no token row exists (e.g. before the OAuth flow has been completed)
+_ENV_FALLBACK = {"access_token": os.environ.get("TIKTOK_ACCESS_TOKEN", ""),
+                 "advertiser_id": os.environ.get("TIKTOK_ADVERTISER_ID", "")}
 TIKTOK_API_BASE = "https://business-api.tiktok.com/open_api/v1.3"
 
+# Shared keep-alive client: one TLS handshake per pooled connection instead of per call.
+# Created lazily so it binds to the running event loop, closed on app shutdown.
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=50, keepalive_expiry=60)
+_http_client: httpx.AsyncClient = None
+
+# HTTP/2 multiplexes concurrent TikTok calls over one connection; needs the optional h2 package
+try:
+    import h2  # noqa: F401
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
 PRODUCT_IMAGES = [
     "https://cdn.shopify.com/s/files/1/0672/2030/8191/products/mens-tennis-hoodie-921535.jpg?v=1708170515",
     "https://cdn.shopify.com/s/files/1/0672/2030/8191/products/mens-tennis-hoodie-404401.jpg?v=1708087650",
@@ -83,6 +109,12 @@ def _safe_get_data(result: dict, *keys):
     return current
 
 
+def _schedule_start(offset_minutes: int = 5) -> str:
+    """UTC start time N minutes out, formatted without the locale-aware strftime."""
+    dt = datetime.utcnow() + timedelta(minutes=offset_minutes)
+    return f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d} {dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}"
+
+
 def _get_ffmpeg_path() -> str:
     """Find ffmpeg: system PATH -> imageio-ffmpeg bundle -> empty string."""
     try:
@@ -103,44 +135,172 @@ def _get_ffmpeg_path() -> str:
     return ""
 
 
+# Token row rarely changes; skip the SELECT for TOKEN_CACHE_TTL seconds (reset by _exchange_token)
+TOKEN_CACHE_TTL = 60
+_token_cache = {"loaded_at": 0.0, "creds": None}
+# The token table holds a single row; new tokens are saved under this id so
+# reads are a primary-key lookup (tables from older deploys fall back to first())
+TOKEN_ROW_ID = 1
+
+
+# (computed_at, start, end) of the 7-day report window; dates only change daily
+REPORT_DATES_TTL = 60
+_report_dates_cache = [0.0, "", ""]
+
+
+def _report_dates() -> tuple:
+    """Return (start_date, end_date) for the last 7 days, recomputed at most once a minute."""
+    now = time.monotonic()
+    if now - _report_dates_cache[0] >= REPORT_DATES_TTL:
+        today = datetime.utcnow().date()
+        _report_dates_cache[:] = [now, (today - timedelta(days=7)).isoformat(), today.isoformat()]
+    return _report_dates_cache[1], _report_dates_cache[2]
+
+
+def _token_row(db: Session):
+    return db.get(TikTokTokenModel, TOKEN_ROW_ID) or db.query(TikTokTokenModel).first()
+
+
 def _get_active_token(db: Session) -> dict:
+    if _token_cache["creds"] and time.monotonic() - _token_cache["loaded_at"] < TOKEN_CACHE_TTL:
+        return _token_cache["creds"]
+    creds = _ENV_FALLBACK
     try:
-        token_record = db.query(TikTokTokenModel).first()
+        token_record = _token_row(db)
         if token_record and token_record.access_token:
-            return {"access_token": token_record.access_token, "advertiser_id": token_record.advertiser_id}
-    except Exception:
-        pass
-    return {"access_token": os.environ.get("TIKTOK_ACCESS_TOKEN", ""), "advertiser_id": os.environ.get("TIKTOK_ADVERTISER_ID", "")}
+            creds = {"access_token": token_record.access_token, "advertiser_id": token_record.advertiser_id}
+    except Exception as e:
+        logger.warning(f"TikTok token lookup failed, using env credentials: {e}")
+    _token_cache.update(loaded_at=time.monotonic(), creds=creds)
+    return creds
+
+
+async def _active_token(db: Session) -> dict:
+    """_get_active_token for async routes: cache hits stay on the loop, the DB read runs in the threadpool."""
+    if _token_cache["creds"] and time.monotonic() - _token_cache["loaded_at"] < TOKEN_CACHE_TTL:
+        return _token_cache["creds"]
+    return await run_in_threadpool(_get_active_token, db)
+
+
+def _http() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        # retries=1 re-attempts a failed connect (e.g. a stale pooled socket) once
+        transport = httpx.AsyncHTTPTransport(http2=_HTTP2, limits=_HTTP_LIMITS, retries=1)
+        _http_client = httpx.AsyncClient(base_url=TIKTOK_API_BASE, timeout=30, transport=transport)
+    return _http_client
+
+
+@router.on_event("shutdown")
+async def _close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+# Transient failures (rate limit / gateway errors / dropped connections) are retried
+# with jittered exponential backoff instead of failing the whole launch flow.
+# Only GETs are safe to resend after a 5xx or a mid-request network error: TikTok may
+# already have created the campaign/ad group/ad. Writes are retried only when the
+# request provably wasn't processed (429, or the connection never opened).
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+WRITE_RETRY_STATUSES = frozenset({429})
+RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+RETRY_BUDGET = 20.0
 
 
-def _tiktok_api(method: str, endpoint: str, access_token: str, params: dict = None, data: dict = None) -> dict:
-    url = f"{TIKTOK_API_BASE}{endpoint}"
+def _retry_after(resp: httpx.Response) -> float:
+    try:
+        return max(0.0, float(resp.headers.get("Retry-After", "")))
+    except ValueError:
+        return 0.0
+
+
+async def _request_with_backoff(method: str, url: str, **kwargs) -> httpx.Response:
+    """Send a request, retrying transient failures for at most RETRY_BUDGET seconds.
+
+    GETs retry 429/5xx and any network error; other methods only 429 and connect errors.
+    """
+    idempotent = method.upper() == "GET"
+    retry_statuses = RETRY_STATUSES if idempotent else WRITE_RETRY_STATUSES
+    retry_errors = httpx.TransportError if idempotent else httpx.ConnectError
+    deadline = time.monotonic() + RETRY_BUDGET
+    delay = RETRY_BASE_DELAY
+    for attempt in range(1, RETRY_ATTEMPTS + 1):
+        try:
+            resp = await _http().request(method, url, **kwargs)
+            if resp.status_code not in retry_statuses:
+                return resp
+            wait = max(delay, _retry_after(resp))
+            reason = f"HTTP {resp.status_code}"
+        except retry_errors as e:
+            resp, wait, reason = None, delay, str(e) or type(e).__name__
+        wait += random.random() * delay / 2
+        if attempt == RETRY_ATTEMPTS or time.monotonic() + wait > deadline:
+            if resp is None:
+                raise httpx.TransportError(reason)
+            return resp
+        logger.warning(f"TikTok {method} {url}: {reason}, retry {attempt}/{RETRY_ATTEMPTS - 1} in {wait:.1f}s")
+        await asyncio.sleep(wait)
+        delay = min(delay * 2, RETRY_MAX_DELAY)
+
+
+# Identical GETs already in flight are shared: {(token, endpoint, params): Task}
+_INFLIGHT: dict = {}
+
+
+async def _tiktok_api(method: str, endpoint: str, access_token: str, params: dict = None, data: dict = None,
+                      coalesce_tag=None) -> dict:
+    """Call the TikTok API. Identical concurrent GETs share one request; callers that
+    must not join a request started earlier (e.g. before a mutation) pass a distinct
+    `coalesce_tag`."""
+    if method.upper() != "GET":
+        return await _tiktok_request(method, endpoint, access_token, params, data)
+    # Params may hold lists/dicts (fields, filtering); a canonical JSON encoding is hashable
+    key = (access_token, endpoint, orjson.dumps(params or {}, option=orjson.OPT_SORT_KEYS), coalesce_tag)
+    task = _INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_tiktok_request("GET", endpoint, access_token, params))
+        _INFLIGHT[key] = task
+        task.add_done_callback(lambda _: _INFLIGHT.pop(key, None))
+    # shield: a cancelled caller must not cancel the request other callers are awaiting
+    return await asyncio.shield(task)
+
+
+async def _tiktok_request(method: str, endpoint: str, access_token: str, params: dict = None, data: dict = None) -> dict:
     headers = {"Access-Token": access_token, "Content-Type": "application/json"}
     try:
         if method.upper() == "GET":
-            resp = requests.get(url, headers=headers, params=params, timeout=30)
+            resp = await _request_with_backoff("GET", endpoint, headers=headers, params=params)
         else:
-            resp = requests.post(url, headers=headers, json=data, timeout=30)
-        resp.raise_for_status()
-        return resp.json()
-    except requests.exceptions.HTTPError as e:
-        # Try to parse JSON error body even on HTTP errors
-        try:
-            return e.response.json()
-        except Exception:
-            pass
-        logger.error(f"TikTok API HTTP error: {e}")
-        return {"code": -1, "message": str(e)}
+            resp = await _request_with_backoff("POST", endpoint, headers=headers, content=orjson.dumps(data))
     except Exception as e:
         logger.error(f"TikTok API error: {e}")
         return {"code": -1, "message": str(e)}
+    if resp.status_code < 400:
+        try:
+            return orjson.loads(resp.content)
+        except orjson.JSONDecodeError as e:
+            logger.error(f"TikTok API error: {e}")
+            return {"code": -1, "message": str(e)}
+    # TikTok usually sends a JSON error body even on HTTP errors; prefer it
+    if resp.headers.get("content-type", "").startswith("application/json"):
+        try:
+            return orjson.loads(resp.content)
+        except orjson.JSONDecodeError:
+            pass
+    message = f"HTTP {resp.status_code}: {resp.text[:200]}"
+    logger.error(f"TikTok API HTTP error on {endpoint}: {message}")
+    return {"code": -1, "message": message}
 
 
-def _tiktok_upload(endpoint: str, access_token: str, advertiser_id: str,
-                   file_path: str, file_field: str = "video_file",
-                   extra_data: dict = None) -> dict:
+async def _tiktok_upload(endpoint: str, access_token: str, advertiser_id: str,
+                         file_path: str, file_field: str = "video_file",
+                         extra_data: dict = None) -> dict:
     """Upload a file to TikTok using multipart form data with MD5 signature."""
-    url = f"{TIKTOK_API_BASE}{endpoint}"
     headers = {"Access-Token": access_token}
     data = {"advertiser_id": advertiser_id}
     if extra_data:
@@ -153,9 +313,9 @@ def _tiktok_upload(endpoint: str, access_token: str, advertiser_id: str,
         logger.info(f"Upload: file={os.path.basename(file_path)}, size={len(file_content)}, md5={md5_hash}")
         mime = "video/mp4" if file_path.endswith(".mp4") else "image/jpeg"
         files = {file_field: (os.path.basename(file_path), io.BytesIO(file_content), mime)}
-        resp = requests.post(url, headers=headers, data=data, files=files, timeout=120)
+        resp = await _http().post(endpoint, headers=headers, data=data, files=files, timeout=120)
         resp.raise_for_status()
-        result = resp.json()
+        result = orjson.loads(resp.content)
         logger.info(f"Upload response: code={result.get('code')}, message={result.get('message')}")
         return result
     except Exception as e:
@@ -163,41 +323,141 @@ def _tiktok_upload(endpoint: str, access_token: str, advertiser_id: str,
         return {"code": -1, "message": str(e)}
 
 
+# ── In-process Cache ──
+# {(advertiser_id, kind): (stored_at_monotonic, value)}. Identities change on the
+# order of days, the image library slowly, advertiser info almost never; the
+# storefront product feed is re-read at most every few minutes.
+
+IDENTITY_CACHE_TTL = 86400
+IMAGES_CACHE_TTL = 600
+ADVERTISER_INFO_CACHE_TTL = 3600
+PRODUCTS_CACHE_TTL = 300
+
+_CACHE: dict = {}
+_CACHE_LOCKS: dict = {}
+
+
+async def _cached(key: tuple, ttl: float, loader, keep=bool):
+    """Return a fresh cached value or await loader() once per key (concurrent callers wait).
+
+    Only values passing `keep` are stored; if a refresh fails that check, the
+    previous (stale) value is served instead of the failure.
+    """
+    hit = _CACHE.get(key)
+    if hit and time.monotonic() - hit[0] < ttl:
+        return hit[1]
+    lock = _CACHE_LOCKS.setdefault(key, asyncio.Lock())
+    async with lock:
+        hit = _CACHE.get(key)
+        if hit and time.monotonic() - hit[0] < ttl:
+            return hit[1]
+        value = await loader()
+        if keep(value):
+            _CACHE[key] = (time.monotonic(), value)
+            return value
+        if hit:
+            logger.warning(f"TikTok {key[1]} refresh failed, serving cached value")
+            return hit[1]
+        return value
+
+
+def _api_ok(result: dict) -> bool:
+    return result.get("code") == 0
+
+
+def _campaigns_view_key(advertiser_id: str) -> tuple:
+    """Cache key of the GET /campaigns response (tiktok_campaigns.py)."""
+    return advertiser_id, "campaigns_view"
+
+
+# Bumped on every invalidation. A view build that started under an older generation
+# may hold pre-mutation data, so it must not be cached. {advertiser_id: int}
+_campaigns_view_generation: dict = {}
+
+
+def _campaigns_view_gen(advertiser_id: str) -> int:
+    return _campaigns_view_generation.get(advertiser_id, 0)
+
+
+def _invalidate_campaigns_view(advertiser_id: str):
+    _campaigns_view_generation[advertiser_id] = _campaigns_view_gen(advertiser_id) + 1
+    _CACHE.pop(_campaigns_view_key(advertiser_id), None)
+
+
+async def _get_advertiser_info(access_token: str, advertiser_id: str) -> dict:
+    """Raw /advertiser/info/ response for the advertiser (cached)."""
+    return await _cached(
+        (advertiser_id, "advertiser_info"), ADVERTISER_INFO_CACHE_TTL,
+        lambda: _tiktok_api("GET", "/advertiser/info/", access_token,
+                            params={"advertiser_ids": orjson.dumps([advertiser_id]).decode()}),
+        keep=_api_ok)
+
+
 # ── Identity Management ──
 
-def _find_best_identity(access_token: str, advertiser_id: str) -> dict:
+IDENTITY_TYPES = ("TT_USER", "BC_AUTH_TT", "CUSTOMIZED_USER")
+
+
+async def _fetch_identity_lists(access_token: str, advertiser_id: str) -> dict:
+    """Probe every identity type concurrently. Returns {identity_type: identity_list}."""
+    async def _load():
+        results = await asyncio.gather(*[
+            _tiktok_api("GET", "/identity/get/", access_token,
+                        params={"advertiser_id": advertiser_id, "identity_type": it})
+            for it in IDENTITY_TYPES])
+        return {it: (_safe_get_data(r).get("identity_list", []) if r.get("code") == 0 else [])
+                for it, r in zip(IDENTITY_TYPES, results)}
+    return await _cached((advertiser_id, "identities"), IDENTITY_CACHE_TTL, _load,
+                         keep=lambda by_type: any(by_type.values()))
+
+
+async def _find_best_identity(access_token: str, advertiser_id: str) -> dict:
     """Find best identity. Priority: TT_USER > BC_AUTH_TT > CUSTOMIZED_USER (deprecated)"""
-    for identity_type in ["TT_USER", "BC_AUTH_TT", "CUSTOMIZED_USER"]:
-        result = _tiktok_api("GET", "/identity/get/", access_token,
-                             params={"advertiser_id": advertiser_id, "identity_type": identity_type})
-        if result.get("code") == 0:
-            data = _safe_get_data(result)
-            identities = data.get("identity_list", [])
-            if identities:
-                ident = identities[0]
-                if identity_type == "CUSTOMIZED_USER":
-                    logger.warning("Using CUSTOMIZED_USER identity - deprecated by TikTok, may fail")
-                else:
-                    logger.info(f"Using {identity_type} identity: {ident.get('identity_id')} ({ident.get('display_name')})")
-                return {"identity_id": ident.get("identity_id"),
-                        "identity_type": identity_type,
-                        "display_name": ident.get("display_name", "Court Sportswear"),
-                        "profile_image": ident.get("profile_image", "")}
+    by_type = await _fetch_identity_lists(access_token, advertiser_id)
+    for identity_type in IDENTITY_TYPES:
+        identities = by_type[identity_type]
+        if identities:
+            ident = identities[0]
+            if identity_type == "CUSTOMIZED_USER":
+                logger.warning("Using CUSTOMIZED_USER identity - deprecated by TikTok, may fail")
+            else:
+                logger.info(f"Using {identity_type} identity: {ident.get('identity_id')} ({ident.get('display_name')})")
+            return {"identity_id": ident.get("identity_id"),
+                    "identity_type": identity_type,
+                    "display_name": ident.get("display_name", "Court Sportswear"),
+                    "profile_image": ident.get("profile_image", "")}
     return {}
 
 
 # ── Image Management ──
 
-def _get_product_images() -> list:
+async def _get_existing_images(access_token: str, advertiser_id: str) -> dict:
+    """Raw /file/image/ad/get/ response for the advertiser's image library (cached)."""
+    return await _cached(
+        (advertiser_id, "images"), IMAGES_CACHE_TTL,
+        lambda: _tiktok_api("GET", "/file/image/ad/get/", access_token,
+                            params={"advertiser_id": advertiser_id, "page_size": 50}),
+        keep=_api_ok)
+
+
+PRODUCT_IMAGE_LIMIT = 5
+
+
+async def _fetch_product_images() -> list:
     try:
-        resp = requests.get("https://court-sportswear.com/products.json?limit=10", timeout=10)
+        # Callers use at most PRODUCT_IMAGE_LIMIT images (one per product), so
+        # only request that many products rather than decoding a larger feed.
+        resp = await _http().get("https://court-sportswear.com/products.json",
+                                 params={"limit": PRODUCT_IMAGE_LIMIT}, timeout=10, follow_redirects=True)
         if resp.status_code == 200:
             urls = []
-            for p in resp.json().get("products", []):
-                for img in p.get("images", [])[:1]:
-                    src = img.get("src", "")
-                    if src:
-                        urls.append(src)
+            for p in orjson.loads(resp.content).get("products", []):
+                images = p.get("images") or []
+                src = images[0].get("src", "") if images else ""
+                if src:
+                    urls.append(src)
+                    if len(urls) == PRODUCT_IMAGE_LIMIT:
+                        break
             if urls:
                 return urls
     except Exception:
@@ -205,52 +465,172 @@ def _get_product_images() -> list:
     return PRODUCT_IMAGES
 
 
-def _upload_images(access_token: str, advertiser_id: str, image_urls: list) -> list:
-    """Upload multiple images, return list of image_ids."""
+async def _get_product_images() -> list:
+    """First image of each storefront product (cached), or PRODUCT_IMAGES if the feed is unavailable."""
+    return await _cached(("shopify", "products"), PRODUCTS_CACHE_TTL, _fetch_product_images,
+                         keep=lambda urls: urls is not PRODUCT_IMAGES)
+
+
+# {(advertiser_id, md5(source_url)): image_id} - a product image uploaded once is
+# reused by every later launch instead of being POSTed again. Backed by the
+# tiktok_images table so the mapping survives restarts.
+_URL_TO_IMAGE_ID: dict = {}
+
+
+def _url_key(advertiser_id: str, image_url: str) -> tuple:
+    return advertiser_id, hashlib.md5(image_url.encode()).hexdigest()
+
+
+def _load_image_id(key: tuple) -> str:
+    db = SessionLocal()
+    try:
+        row = db.query(TikTokImageModel.image_id).filter(
+            TikTokImageModel.advertiser_id == key[0], TikTokImageModel.url_hash == key[1]).first()
+        return row.image_id if row else ""
+    except Exception as e:
+        logger.warning(f"TikTok image lookup failed: {e}")
+        return ""
+    finally:
+        db.close()
+
+
+def _save_image_id(key: tuple, image_id: str):
+    db = SessionLocal()
+    try:
+        db.add(TikTokImageModel(advertiser_id=key[0], url_hash=key[1], image_id=image_id))
+        db.commit()
+    except Exception as e:
+        # Usually the unique constraint: another launch recorded the same URL first
+        db.rollback()
+        logger.debug(f"TikTok image {image_id} not recorded: {e}")
+    finally:
+        db.close()
+
+
+async def _known_image_id(key: tuple) -> str:
+    """image_id previously uploaded for this URL (memory first, then the DB), or ""."""
+    image_id = _URL_TO_IMAGE_ID.get(key)
+    if image_id is None:
+        image_id = await run_in_threadpool(_load_image_id, key)
+        if image_id:
+            _URL_TO_IMAGE_ID[key] = image_id
+    return image_id or ""
+
+
+async def _remember_image_id(key: tuple, image_id: str):
+    _URL_TO_IMAGE_ID[key] = image_id
+    await run_in_threadpool(_save_image_id, key, image_id)
+
+
+def _library_image_id(library: dict, file_name: str) -> str:
+    """image_id of the library image named `file_name`, or "" if it isn't in the listing."""
+    for img in _safe_get_data(library).get("list", []) or []:
+        if img.get("file_name") == file_name and img.get("image_id"):
+            return img["image_id"]
+    return ""
+
+
+async def _upload_images(access_token: str, advertiser_id: str, image_urls: list,
+                         library: dict = None) -> list:
+    """Upload multiple images, return list of image_ids.
+
+    On a duplicate-name error (40911) the image already in the library is reused;
+    the listing is fetched at most once per call (and is itself TTL-cached).
+    """
     image_ids = []
     for url in image_urls:
-        result = _tiktok_api("POST", "/file/image/ad/upload/", access_token, data={
+        key = _url_key(advertiser_id, url)
+        known = await _known_image_id(key)
+        if known:
+            image_ids.append(known)
+            continue
+        file_name = f"cs_{int(time.time())}_{len(image_ids)}.jpg"
+        result = await _tiktok_api("POST", "/file/image/ad/upload/", access_token, data={
             "advertiser_id": advertiser_id, "upload_type": "UPLOAD_BY_URL", "image_url": url,
-            "file_name": f"cs_{int(time.time())}_{len(image_ids)}.jpg",
+            "file_name": file_name,
         })
-        if result.get("code") == 0:
-            img_id = _safe_get_data(result, "image_id")
+        if result.get("code") == 40911:
+            if library is None:
+                library = await _get_existing_images(access_token, advertiser_id)
+            img_id = _library_image_id(library, file_name)
             if img_id:
+                await _remember_image_id(key, img_id)
                 image_ids.append(img_id)
-        elif result.get("code") == 40911:
-            result2 = _tiktok_api("POST", "/file/image/ad/upload/", access_token, data={
+                continue
+            result = await _tiktok_api("POST", "/file/image/ad/upload/", access_token, data={
                 "advertiser_id": advertiser_id, "upload_type": "UPLOAD_BY_URL", "image_url": url,
                 "file_name": f"cs_u{int(time.time())}_{len(image_ids)}.jpg",
             })
-            if result2.get("code") == 0:
-                img_id = _safe_get_data(result2, "image_id")
-                if img_id:
-                    image_ids.append(img_id)
+        if result.get("code") == 0:
+            img_id = _safe_get_data(result, "image_id")
+            if img_id:
+                await _remember_image_id(key, img_id)
+                image_ids.append(img_id)
     return image_ids
 
 
-def _upload_image_by_url(access_token: str, advertiser_id: str, image_url: str,
-                         file_name: str = None) -> str:
-    """Upload a single image by URL, return image_id."""
+async def _upload_image_by_url(access_token: str, advertiser_id: str, image_url: str,
+                               file_name: str = None, library: dict = None) -> str:
+    """Upload a single image by URL, return image_id (the existing one on a duplicate name)."""
     if not image_url:
         return ""
+    key = _url_key(advertiser_id, image_url)
+    known = await _known_image_id(key)
+    if known:
+        return known
     if not file_name:
         file_name = f"thumb_{int(time.time())}.jpg"
-    result = _tiktok_api("POST", "/file/image/ad/upload/", access_token, data={
+    result = await _tiktok_api("POST", "/file/image/ad/upload/", access_token, data={
         "advertiser_id": advertiser_id,
         "upload_type": "UPLOAD_BY_URL",
         "image_url": image_url,
         "file_name": file_name,
     })
+    if result.get("code") == 40911:
+        if library is None:
+            library = await _get_existing_images(access_token, advertiser_id)
+        img_id = _library_image_id(library, file_name)
+        if img_id:
+            logger.info(f"Image {file_name} already uploaded: {img_id}")
+            await _remember_image_id(key, img_id)
+            return img_id
     if result.get("code") == 0:
         img_id = _safe_get_data(result, "image_id")
         if img_id:
             logger.info(f"Image uploaded by URL: {img_id}")
+            await _remember_image_id(key, img_id)
             return img_id
     logger.error(f"URL image upload failed: code={result.get('code')}, msg={result.get('message')}")
     return ""
 
 
+async def _upload_first_image(access_token: str, advertiser_id: str, image_urls: list,
+                              max_attempts: int = 3, concurrency: int = 2) -> str:
+    """Try up to `max_attempts` URLs, `concurrency` at a time; return the first image_id.
+
+    Remaining attempts are cancelled once one succeeds, so at most
+    `concurrency - 1` surplus images end up in the library.
+    """
+    stamp = int(time.time())
+    slots = asyncio.Semaphore(concurrency)
+
+    async def _attempt(i: int, url: str) -> str:
+        async with slots:
+            return await _upload_image_by_url(access_token, advertiser_id, url,
+                                              file_name=f"cs_{stamp}_{i}.jpg")
+
+    tasks = [asyncio.create_task(_attempt(i, url)) for i, url in enumerate(image_urls[:max_attempts])]
+    image_id = ""
+    for fut in asyncio.as_completed(tasks):
+        image_id = await fut
+        if image_id:
+            break
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return image_id
+
+
 # ── Video Generation ──
 
 def _create_minimal_mp4(image_paths: list, output_path: str, duration_per_image: int = 3) -> bool:
@@ -288,36 +668,60 @@ def _create_minimal_mp4(image_paths: list, output_path: str, duration_per_image:
         return False
 
 
-def _download_images_for_video(image_urls: list, max_images: int = 5) -> list:
-    """Download product images to temp files for video creation."""
-    paths = []
-    for url in image_urls[:max_images]:
+async def _download_images_for_video(image_urls: list, max_images: int = 5) -> list:
+    """Download product images (concurrently) to temp files for video creation."""
+    async def _download(url: str) -> str:
         try:
-            resp = requests.get(url, timeout=15)
+            resp = await _http().get(url, timeout=15, follow_redirects=True)
             if resp.status_code == 200:
                 tmp = tempfile.NamedTemporaryFile(suffix=".jpg", delete=False)
                 tmp.write(resp.content)
                 tmp.close()
-                paths.append(tmp.name)
+                return tmp.name
         except Exception as e:
             logger.warning(f"Failed to download {url}: {e}")
-    return paths
+        return ""
+
+    paths = await asyncio.gather(*[_download(url) for url in image_urls[:max_images]])
+    return [p for p in paths if p]
 
 
-def _generate_and_upload_video(access_token: str, advertiser_id: str,
-                                image_urls: list = None) -> dict:
+POSTER_POLL_BUDGET = 15.0
+
+
+async def _poll_video_poster(access_token: str, advertiser_id: str, video_id: str) -> str:
+    """Wait for TikTok to publish the uploaded video's poster; back off 0.5s -> 5s, give up after the budget."""
+    deadline = time.monotonic() + POSTER_POLL_BUDGET
+    delay = 0.5
+    while time.monotonic() + delay < deadline:
+        await asyncio.sleep(delay + random.uniform(0, delay * 0.2))
+        result = await _tiktok_api("GET", "/file/video/ad/info/", access_token,
+                                   params={"advertiser_id": advertiser_id,
+                                           "video_ids": orjson.dumps([video_id]).decode()})
+        if result.get("code") == 0:
+            video_list = _safe_get_data(result).get("list", [])
+            if video_list:
+                poster_url = video_list[0].get("poster_url", "") or video_list[0].get("video_cover_url", "")
+                if poster_url:
+                    return poster_url
+        delay = min(delay * 1.6, 5.0)
+    return ""
+
+
+async def _generate_and_upload_video(access_token: str, advertiser_id: str,
+                                      image_urls: list = None) -> dict:
     """Full pipeline: download images -> create video -> upload -> get thumbnail from video_cover_url."""
     if not image_urls:
-        image_urls = _get_product_images()[:5]
+        image_urls = (await _get_product_images())[:5]
     steps = []
 
-    image_paths = _download_images_for_video(image_urls)
+    image_paths = await _download_images_for_video(image_urls)
     steps.append({"step": "download_images", "count": len(image_paths)})
     if not image_paths:
         return {"video_id": "", "thumbnail_image_id": "", "steps": steps, "error": "No images downloaded"}
 
     video_path = tempfile.mktemp(suffix=".mp4")
-    success = _create_minimal_mp4(image_paths, video_path, duration_per_image=3)
+    success = await run_in_threadpool(_create_minimal_mp4, image_paths, video_path, 3)
     steps.append({"step": "create_video", "success": success,
                   "file_size": os.path.getsize(video_path) if success and os.path.exists(video_path) else 0})
 
@@ -334,7 +738,7 @@ def _generate_and_upload_video(access_token: str, advertiser_id: str,
     video_id = ""
     video_cover_url = ""
     try:
-        result = _tiktok_upload(
+        result = await _tiktok_upload(
             "/file/video/ad/upload/", access_token, advertiser_id,
             video_path, file_field="video_file",
             extra_data={"upload_type": "UPLOAD_BY_FILE",
@@ -358,113 +762,143 @@ def _generate_and_upload_video(access_token: str, advertiser_id: str,
 
     thumbnail_image_id = ""
     if video_cover_url:
-        thumbnail_image_id = _upload_image_by_url(
+        thumbnail_image_id = await _upload_image_by_url(
             access_token, advertiser_id, video_cover_url,
             file_name=f"cover_{int(time.time())}.jpg")
         steps.append({"step": "upload_thumbnail", "image_id": thumbnail_image_id,
                       "method": "video_cover_url"})
 
     if not thumbnail_image_id and video_id:
-        time.sleep(2)
-        poster_result = _tiktok_api("GET", "/file/video/ad/info/", access_token,
-                                     params={"advertiser_id": advertiser_id,
-                                             "video_ids": json.dumps([video_id])})
-        if poster_result.get("code") == 0:
-            poster_data = _safe_get_data(poster_result)
-            video_list = poster_data.get("list", [])
-            if video_list:
-                poster_url = video_list[0].get("poster_url", "") or video_list[0].get("video_cover_url", "")
-                if poster_url:
-                    thumbnail_image_id = _upload_image_by_url(
-                        access_token, advertiser_id, poster_url,
-                        file_name=f"poster_{int(time.time())}.jpg")
-                    steps.append({"step": "upload_thumbnail_poster", "image_id": thumbnail_image_id,
-                                  "method": "poster_url"})
+        poster_url = await _poll_video_poster(access_token, advertiser_id, video_id)
+        if poster_url:
+            thumbnail_image_id = await _upload_image_by_url(
+                access_token, advertiser_id, poster_url,
+                file_name=f"poster_{int(time.time())}.jpg")
+            steps.append({"step": "upload_thumbnail_poster", "image_id": thumbnail_image_id,
+                          "method": "poster_url"})
 
     return {"video_id": video_id, "thumbnail_image_id": thumbnail_image_id, "steps": steps}
 
 
 # ── Ad Creation ──
 
-def _try_create_ad(access_token: str, advertiser_id: str, adgroup_id: str,
-                   image_id: str, identity: dict, video_id: str = "",
-                   campaign_id: str = "", thumbnail_image_id: str = "") -> dict:
-    """Try multiple ad creation strategies in priority order."""
+AD_LANDING_PAGE = "https://court-sportswear.com/collections/all"
+
+# Fixed part of each /ad/create/ creative: strategy -> (ad_name prefix, read-only fields).
+# Per-attempt values (ad_name suffix, media and identity ids) are merged in by _creative().
+_CREATIVE_TEMPLATES = {
+    "video_with_cover_thumb": ("Court Sportswear - Tennis Video", MappingProxyType({
+        "ad_text": "Premium tennis & pickleball apparel. Performance gear for every court. Shop now!",
+        "landing_page_url": AD_LANDING_PAGE, "call_to_action": "SHOP_NOW", "ad_format": "SINGLE_VIDEO"})),
+    "video_with_product_thumb": ("Court Sportswear - Performance Gear", MappingProxyType({
+        "ad_text": "Premium tennis & pickleball apparel. Shop court-sportswear.com",
+        "landing_page_url": AD_LANDING_PAGE, "call_to_action": "SHOP_NOW", "ad_format": "SINGLE_VIDEO"})),
+    "video_no_cta": ("Court Sportswear - Shop Now", MappingProxyType({
+        "ad_text": "Premium tennis & pickleball apparel. Shop court-sportswear.com",
+        "landing_page_url": AD_LANDING_PAGE, "ad_format": "SINGLE_VIDEO"})),
+    "pangle_image": ("Court Sportswear - Pangle Image", MappingProxyType({
+        "ad_text": "Premium tennis & pickleball apparel. Shop now!",
+        "landing_page_url": AD_LANDING_PAGE, "call_to_action": "SHOP_NOW", "ad_format": "SINGLE_IMAGE"})),
+}
+
+
+def _creative(strategy: str, suffix: int, **fields) -> dict:
+    name_prefix, template = _CREATIVE_TEMPLATES[strategy]
+    creative = template | fields  # C-level merge into a fresh dict
+    creative["ad_name"] = f"{name_prefix} {suffix}"
+    return creative
+
+
+async def _post_ad(access_token: str, advertiser_id: str, adgroup_id: str, creative: dict,
+                   operation_status: str = "ENABLE") -> dict:
+    return await _tiktok_api("POST", "/ad/create/", access_token, data={
+        "advertiser_id": advertiser_id, "adgroup_id": adgroup_id,
+        "creatives": [creative], "operation_status": operation_status})
+
+
+async def _set_ad_status(access_token: str, advertiser_id: str, ad_ids: list, status: str) -> dict:
+    return await _tiktok_api("POST", "/ad/status/update/", access_token, data={
+        "advertiser_id": advertiser_id, "ad_ids": ad_ids, "operation_status": status})
+
+
+async def _first_successful_ad(access_token: str, advertiser_id: str, adgroup_id: str,
+                               candidates: list, attempts: list) -> dict:
+    """POST all (strategy, creative, log_extra) candidates at once as paused ads.
+
+    Every attempt is awaited, since an ad TikTok has created can't be recalled by
+    cancelling the request. The highest-priority success is enabled; any other ads
+    that were created are deleted. All of them, with their ad_ids, are logged to
+    `attempts` in priority order.
+    """
+    results = await asyncio.gather(*(
+        _post_ad(access_token, advertiser_id, adgroup_id, creative, operation_status="DISABLE")
+        for _, creative, _ in candidates))
+
+    winner = None
+    for (strategy, _, extra), result in zip(candidates, results):
+        ad_ids = _safe_get_data(result, "ad_ids")
+        attempt = {"strategy": strategy, "code": result.get("code"),
+                   "message": result.get("message"), "ad_ids": ad_ids, **extra}
+        attempts.append(attempt)
+        if not (result.get("code") == 0 and ad_ids):
+            continue
+        if winner is None:
+            enabled = await _set_ad_status(access_token, advertiser_id, ad_ids, "ENABLE")
+            attempt["enable_code"] = enabled.get("code")
+            if enabled.get("code") == 0:
+                winner = {"success": True, "ad_ids": ad_ids, "strategy": strategy}
+                continue
+        # A surplus (or un-enablable) ad: remove it so it never runs alongside the winner
+        deleted = await _set_ad_status(access_token, advertiser_id, ad_ids, "DELETE")
+        attempt["discarded"] = True
+        attempt["delete_code"] = deleted.get("code")
+        if deleted.get("code") != 0:
+            logger.warning(f"TikTok: could not delete surplus ad(s) {ad_ids}: {deleted.get('message')}")
+
+    if winner:
+        winner["attempts"] = attempts
+    return winner
+
+
+async def _try_create_ad(access_token: str, advertiser_id: str, adgroup_id: str,
+                         image_id: str, identity: dict, video_id: str = "",
+                         campaign_id: str = "", thumbnail_image_id: str = "") -> dict:
+    """Try multiple ad creation strategies: video variants concurrently, then Pangle."""
     identity_id = identity.get("identity_id", "")
     identity_type = identity.get("identity_type", "TT_USER")
     attempts = []
     best_thumb = thumbnail_image_id or image_id
 
+    suffix = int(time.time()) % 10000
+    ident = {"identity_id": identity_id, "identity_type": identity_type}
+
+    candidates = []
     if video_id and identity_id and best_thumb:
-        creative = {
-            "ad_name": f"Court Sportswear - Tennis Video {int(time.time()) % 10000}",
-            "ad_text": "Premium tennis & pickleball apparel. Performance gear for every court. Shop now!",
-            "landing_page_url": "https://court-sportswear.com/collections/all",
-            "call_to_action": "SHOP_NOW",
-            "ad_format": "SINGLE_VIDEO",
-            "video_id": video_id,
-            "image_ids": [best_thumb],
-            "identity_id": identity_id,
-            "identity_type": identity_type,
-        }
-        result = _tiktok_api("POST", "/ad/create/", access_token, data={
-            "advertiser_id": advertiser_id, "adgroup_id": adgroup_id,
-            "creatives": [creative], "operation_status": "ENABLE"})
-        ad_ids = _safe_get_data(result, "ad_ids")
-        attempts.append({"strategy": "video_with_cover_thumb", "code": result.get("code"),
-                        "message": result.get("message"), "ad_ids": ad_ids,
-                        "thumbnail_used": best_thumb,
-                        "identity_type_used": identity_type})
-        if result.get("code") == 0 and ad_ids:
-            return {"success": True, "ad_ids": ad_ids,
-                    "strategy": "video_with_cover_thumb", "attempts": attempts}
+        candidates.append(("video_with_cover_thumb",
+                           _creative("video_with_cover_thumb", suffix, video_id=video_id,
+                                     image_ids=[best_thumb], **ident),
+                           {"thumbnail_used": best_thumb, "identity_type_used": identity_type}))
 
     if video_id and identity_id and image_id and image_id != best_thumb:
-        creative = {
-            "ad_name": f"Court Sportswear - Performance Gear {int(time.time()) % 10000}",
-            "ad_text": "Premium tennis & pickleball apparel. Shop court-sportswear.com",
-            "landing_page_url": "https://court-sportswear.com/collections/all",
-            "call_to_action": "SHOP_NOW",
-            "ad_format": "SINGLE_VIDEO",
-            "video_id": video_id,
-            "image_ids": [image_id],
-            "identity_id": identity_id,
-            "identity_type": identity_type,
-        }
-        result = _tiktok_api("POST", "/ad/create/", access_token, data={
-            "advertiser_id": advertiser_id, "adgroup_id": adgroup_id,
-            "creatives": [creative], "operation_status": "ENABLE"})
-        ad_ids = _safe_get_data(result, "ad_ids")
-        attempts.append({"strategy": "video_with_product_thumb", "code": result.get("code"),
-                        "message": result.get("message"), "ad_ids": ad_ids})
-        if result.get("code") == 0 and ad_ids:
-            return {"success": True, "ad_ids": ad_ids,
-                    "strategy": "video_with_product_thumb", "attempts": attempts}
+        candidates.append(("video_with_product_thumb",
+                           _creative("video_with_product_thumb", suffix, video_id=video_id,
+                                     image_ids=[image_id], **ident), {}))
 
     if video_id and identity_id and best_thumb:
-        creative = {
-            "ad_name": f"Court Sportswear - Shop Now {int(time.time()) % 10000}",
-            "ad_text": "Premium tennis & pickleball apparel. Shop court-sportswear.com",
-            "landing_page_url": "https://court-sportswear.com/collections/all",
-            "ad_format": "SINGLE_VIDEO",
-            "video_id": video_id,
-            "image_ids": [best_thumb],
-            "identity_id": identity_id,
-            "identity_type": identity_type,
-        }
-        result = _tiktok_api("POST", "/ad/create/", access_token, data={
-            "advertiser_id": advertiser_id, "adgroup_id": adgroup_id,
-            "creatives": [creative], "operation_status": "ENABLE"})
-        ad_ids = _safe_get_data(result, "ad_ids")
-        attempts.append({"strategy": "video_no_cta", "code": result.get("code"),
-                        "message": result.get("message"), "ad_ids": ad_ids})
-        if result.get("code") == 0 and ad_ids:
-            return {"success": True, "ad_ids": ad_ids,
-                    "strategy": "video_no_cta", "attempts": attempts}
+        candidates.append(("video_no_cta",
+                           _creative("video_no_cta", suffix, video_id=video_id,
+                                     image_ids=[best_thumb], **ident), {}))
+
+    if candidates:
+        winner = await _first_successful_ad(access_token, advertiser_id, adgroup_id,
+                                            candidates, attempts)
+        if winner:
+            return winner
 
+    # Pangle creates its own budgeted ad group, so it only runs once the video strategies fail.
     if image_id and campaign_id and identity_id:
-        schedule_start = (datetime.utcnow() + timedelta(minutes=5)).strftime("%Y-%m-%d %H:%M:%S")
-        ag_result = _tiktok_api("POST", "/adgroup/create/", access_token, data={
+        schedule_start = _schedule_start()
+        ag_result = await _tiktok_api("POST", "/adgroup/create/", access_token, data={
             "advertiser_id": advertiser_id, "campaign_id": campaign_id,
             "adgroup_name": f"Court Sportswear - Pangle Display {int(time.time()) % 10000}",
             "placement_type": "PLACEMENT_TYPE_NORMAL",
@@ -482,19 +916,8 @@ def _try_create_ad(access_token: str, advertiser_id: str, adgroup_id: str,
         attempts.append({"strategy": "create_pangle_adgroup", "code": ag_result.get("code"),
                          "message": ag_result.get("message"), "adgroup_id": pangle_ag_id})
         if ag_result.get("code") == 0 and pangle_ag_id:
-            creative = {
-                "ad_name": f"Court Sportswear - Pangle Image {int(time.time()) % 10000}",
-                "ad_text": "Premium tennis & pickleball apparel. Shop now!",
-                "landing_page_url": "https://court-sportswear.com/collections/all",
-                "call_to_action": "SHOP_NOW",
-                "ad_format": "SINGLE_IMAGE",
-                "image_ids": [image_id],
-                "identity_id": identity_id,
-                "identity_type": identity_type,
-            }
-            ad_result = _tiktok_api("POST", "/ad/create/", access_token, data={
-                "advertiser_id": advertiser_id, "adgroup_id": pangle_ag_id,
-                "creatives": [creative], "operation_status": "ENABLE"})
+            creative = _creative("pangle_image", suffix, image_ids=[image_id], **ident)
+            ad_result = await _post_ad(access_token, advertiser_id, pangle_ag_id, creative)
             ad_ids = _safe_get_data(ad_result, "ad_ids")
             attempts.append({"strategy": "pangle_image_ad", "code": ad_result.get("code"),
                              "message": ad_result.get("message"), "ad_ids": ad_ids})
@@ -513,6 +936,54 @@ def _try_create_ad(access_token: str, advertiser_id: str, adgroup_id: str,
 
 # ── OAuth & Token Endpoints ──
 
+# Pre-encoded page bodies; the escaped dynamic value is spliced in with bytes.replace.
+_CALLBACK_SUCCESS_HTML = b'''<!DOCTYPE html><html><head><title>TikTok Connected</title>
+<style>body{font-family:sans-serif;max-width:700px;margin:40px auto;padding:20px;background:#f5f5f5}
+.card{background:white;border-radius:12px;padding:30px;box-shadow:0 2px 8px rgba(0,0,0,.1)}
+h1{color:#28a745}</style></head><body>
+<div class="card"><h1>TikTok Connected!</h1><p>Advertiser ID: <strong>{{ADV}}</strong></p>
+<pre id="setup">Loading account details...\n</pre>
+<p><a href="/dashboard">Go to Dashboard</a></p></div>
+<script>
+const out = document.getElementById("setup");
+const es = new EventSource("/api/v1/tiktok/connect-events?state={{STATE}}");
+["advertiser", "identities", "images"].forEach(name =>
+  es.addEventListener(name, e => { out.textContent += name + ": " + e.data + "\n"; }));
+es.addEventListener("done", () => es.close());
+es.onerror = () => es.close();
+</script></body></html>'''
+_CALLBACK_ERROR_HTML = b"<h1>Error</h1><p>{{ERROR}}</p>"
+_CALLBACK_NO_CODE_HTML = _CALLBACK_ERROR_HTML.replace(b"{{ERROR}}", b"No auth code received.")
+
+
+def _html_page(template: bytes, placeholder: bytes, value, **extra) -> Response:
+    body = template.replace(placeholder, escape(str(value)).encode())
+    for name, extra_value in extra.items():
+        body = body.replace(b"{{" + name.encode() + b"}}", escape(str(extra_value)).encode())
+    return Response(content=body, media_type="text/html")
+
+
+# One-time tokens handed to the success page of a completed OAuth callback; only a
+# holder of one may open /connect-events. {token: expires_at_monotonic}
+CONNECT_EVENTS_TOKEN_TTL = 300
+_connect_event_tokens: dict = {}
+
+
+def _issue_connect_events_token() -> str:
+    now = time.monotonic()
+    for token, expires_at in list(_connect_event_tokens.items()):
+        if expires_at <= now:
+            _connect_event_tokens.pop(token, None)
+    token = secrets.token_urlsafe(24)
+    _connect_event_tokens[token] = now + CONNECT_EVENTS_TOKEN_TTL
+    return token
+
+
+def _consume_connect_events_token(token: str) -> bool:
+    expires_at = _connect_event_tokens.pop(token, None) if token else None
+    return expires_at is not None and expires_at > time.monotonic()
+
+
 @router.get("/connect", summary="Connect TikTok")
 def connect_tiktok():
     if not TIKTOK_APP_ID:
@@ -520,37 +991,93 @@ def connect_tiktok():
     return RedirectResponse(url=f"https://business-api.tiktok.com/portal/auth?app_id={TIKTOK_APP_ID}&state=autosem_connect&redirect_uri={TIKTOK_REDIRECT_URI}")
 
 
-@router.get("/callback", summary="OAuth Callback")
-def oauth_callback(auth_code: str = Query(None), code: str = Query(None),
-                   state: str = Query(None), error: str = Query(None),
-                   db: Session = Depends(get_db)):
+@router.get("/callback", summary="OAuth Callback", response_class=HTMLResponse)
+async def oauth_callback(auth_code: str = Query(None), code: str = Query(None),
+                         state: str = Query(None), error: str = Query(None),
+                         db: Session = Depends(get_db)):
     the_code = auth_code or code
     if error:
-        return HTMLResponse(content=f"<h1>Error</h1><p>{error}</p>")
+        return _html_page(_CALLBACK_ERROR_HTML, b"{{ERROR}}", error)
     if not the_code:
-        return HTMLResponse(content="<h1>Error</h1><p>No auth code received.</p>")
-    result = _exchange_token(the_code, db)
+        return Response(content=_CALLBACK_NO_CODE_HTML, media_type="text/html")
+    result = await _exchange_token(the_code, db)
     if result.get("success"):
-        adv_id = result.get("advertiser_id", "unknown")
-        return HTMLResponse(content=f'''<!DOCTYPE html><html><head><title>TikTok Connected</title>
-<style>body{{font-family:sans-serif;max-width:700px;margin:40px auto;padding:20px;background:#f5f5f5}}
-.card{{background:white;border-radius:12px;padding:30px;box-shadow:0 2px 8px rgba(0,0,0,.1)}}
-h1{{color:#28a745}}</style></head><body>
-<div class="card"><h1>TikTok Connected!</h1><p>Advertiser ID: <strong>{adv_id}</strong></p>
-<p><a href="/dashboard">Go to Dashboard</a></p></div></body></html>''')
-    return HTMLResponse(content=f"<h1>Error</h1><p>{result.get('error')}</p>")
+        return _html_page(_CALLBACK_SUCCESS_HTML, b"{{ADV}}", result.get("advertiser_id", "unknown"),
+                          STATE=_issue_connect_events_token())
+    return _html_page(_CALLBACK_ERROR_HTML, b"{{ERROR}}", result.get("error"))
+
+
+def _sse(event: str, data) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+def _connect_summaries(access_token: str, advertiser_id: str) -> list:
+    """(event, coroutine) pairs for the post-connect account overview, each reduced to a small summary."""
+    async def _advertiser():
+        result = await _get_advertiser_info(access_token, advertiser_id)
+        if not _api_ok(result):
+            return {"error": result.get("message")}
+        info = (_safe_get_data(result).get("list") or [{}])[0]
+        return {"name": info.get("name"), "currency": info.get("currency"), "status": info.get("status")}
+
+    async def _identities():
+        by_type = await _fetch_identity_lists(access_token, advertiser_id)
+        return {it: len(lst) for it, lst in by_type.items()}
+
+    async def _images():
+        result = await _get_existing_images(access_token, advertiser_id)
+        if not _api_ok(result):
+            return {"error": result.get("message")}
+        return {"count": len(_safe_get_data(result).get("list", []))}
+
+    return [("advertiser", _advertiser()), ("identities", _identities()), ("images", _images())]
+
+
+@router.get("/connect-events", summary="Stream account details after connecting (SSE)")
+async def connect_events(state: str = Query(None), db: Session = Depends(get_db)):
+    """Server-sent events: advertiser, identities and images summaries as each lookup finishes.
+
+    Fetched concurrently right after the OAuth callback; the lookups also warm
+    the caches the first campaign launch reads from. `state` must be the one-time
+    token embedded in the callback's success page.
+    """
+    if not _consume_connect_events_token(state):
+        raise HTTPException(status_code=403, detail="Invalid or expired connect state")
+    creds = await _active_token(db)
+
+    async def _stream():
+        if not creds["access_token"] or not creds["advertiser_id"]:
+            yield _sse("done", {"error": "TikTok not connected"})
+            return
+        pending = _connect_summaries(creds["access_token"], creds["advertiser_id"])
+
+        async def _named(event, coro):
+            return event, await coro
+
+        tasks = [asyncio.create_task(_named(event, coro)) for event, coro in pending]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                event, summary = await fut
+                yield _sse(event, summary)
+            yield _sse("done", {})
+        finally:
+            for t in tasks:
+                t.cancel()
+
+    return StreamingResponse(_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
 
 
 @router.post("/exchange-token", summary="Exchange auth code for access token")
-def exchange_token_endpoint(auth_code: str = Query(...), db: Session = Depends(get_db)):
-    return _exchange_token(auth_code, db)
+async def exchange_token_endpoint(auth_code: str = Query(...), db: Session = Depends(get_db)):
+    return await _exchange_token(auth_code, db)
 
 
-def _exchange_token(auth_code: str, db: Session) -> dict:
+async def _exchange_token(auth_code: str, db: Session) -> dict:
     try:
-        resp = requests.post(f"{TIKTOK_API_BASE}/oauth2/access_token/",
-                             json={"app_id": TIKTOK_APP_ID, "secret": TIKTOK_APP_SECRET, "auth_code": auth_code}, timeout=30)
-        result = resp.json()
+        resp = await _request_with_backoff("POST", "/oauth2/access_token/",
+                                           json={"app_id": TIKTOK_APP_ID, "secret": TIKTOK_APP_SECRET, "auth_code": auth_code})
+        result = orjson.loads(resp.content)
         if result.get("code") != 0:
             return {"success": False, "error": result.get("message")}
         data = _safe_get_data(result)
@@ -559,28 +1086,50 @@ def _exchange_token(auth_code: str, db: Session) -> dict:
         advertiser_id = advertiser_ids[0] if advertiser_ids else ""
         if not access_token:
             return {"success": False, "error": "No access token"}
-        existing = db.query(TikTokTokenModel).first()
-        if existing:
-            existing.access_token = access_token
-            existing.advertiser_id = advertiser_id
-            existing.advertiser_ids = json.dumps(advertiser_ids)
-            existing.updated_at = datetime.utcnow()
-        else:
-            db.add(TikTokTokenModel(access_token=access_token, advertiser_id=advertiser_id,
-                                    advertiser_ids=json.dumps(advertiser_ids)))
-        db.commit()
+        await run_in_threadpool(_save_token, db, access_token, advertiser_id, advertiser_ids)
         return {"success": True, "advertiser_id": advertiser_id, "_token": access_token}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
+def _save_token(db: Session, access_token: str, advertiser_id: str, advertiser_ids: list):
+    existing = _token_row(db)
+    if existing:
+        existing.access_token = access_token
+        existing.advertiser_id = advertiser_id
+        existing.advertiser_ids = json.dumps(advertiser_ids)
+        existing.updated_at = datetime.utcnow()
+    else:
+        db.add(TikTokTokenModel(id=TOKEN_ROW_ID, access_token=access_token, advertiser_id=advertiser_id,
+                                advertiser_ids=json.dumps(advertiser_ids)))
+    db.commit()
+    _token_cache["loaded_at"] = 0.0
+
+
+def _persist_launch(campaign_id: str, campaign_name: str, daily_budget: float, action: str, details: str):
+    """Record a launched campaign and its activity log (runs as a background task after the response)."""
+    db = SessionLocal()
+    try:
+        db.add(CampaignModel(platform="tiktok", platform_campaign_id=str(campaign_id),
+                             name=campaign_name, status="ACTIVE", campaign_type="TRAFFIC",
+                             daily_budget=daily_budget))
+        db.add(ActivityLogModel(action=action, entity_type="campaign",
+                                entity_id=str(campaign_id), details=details))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to record TikTok campaign {campaign_id}: {e}")
+    finally:
+        db.close()
+
+
 @router.get("/status", summary="Check TikTok Status")
-def check_tiktok_status(db: Session = Depends(get_db)):
-    creds = _get_active_token(db)
+async def check_tiktok_status(db: Session = Depends(get_db)):
+    creds = await _active_token(db)
     if not creds["access_token"]:
         return {"connected": False, "message": "No TikTok token found"}
-    result = _tiktok_api("GET", "/oauth2/advertiser/get/", creds["access_token"],
-                        params={"app_id": TIKTOK_APP_ID, "secret": TIKTOK_APP_SECRET})
+    result = await _tiktok_api("GET", "/oauth2/advertiser/get/", creds["access_token"],
+                               params={"app_id": TIKTOK_APP_ID, "secret": TIKTOK_APP_SECRET})
     if result.get("code") == 0:
         return {"connected": True, "advertiser_id": creds["advertiser_id"],
                 "advertisers": _safe_get_data(result).get("list", [])}
@@ -590,11 +1139,12 @@ def check_tiktok_status(db: Session = Depends(get_db)):
 # ── Campaign & Ad Creation ──
 
 @router.post("/launch-campaign", summary="Launch TikTok Ad Campaign")
-def launch_campaign(daily_budget: float = Query(20.0),
-                    campaign_name: str = Query(None),
-                    db: Session = Depends(get_db)):
+async def launch_campaign(background: BackgroundTasks,
+                          daily_budget: float = Query(20.0),
+                          campaign_name: str = Query(None),
+                          db: Session = Depends(get_db)):
     """Full campaign launch: campaign -> ad group -> upload images -> generate video + thumbnail -> create ad."""
-    creds = _get_active_token(db)
+    creds = await _active_token(db)
     if not creds["access_token"] or not creds["advertiser_id"]:
         return {"success": False, "error": "TikTok not connected."}
     access_token, advertiser_id = creds["access_token"], creds["advertiser_id"]
@@ -606,7 +1156,7 @@ def launch_campaign(daily_budget: float = Query(20.0),
         campaign_name = f"Court Sportswear - Tennis {ts}"
 
     try:
-        camp = _tiktok_api("POST", "/campaign/create/", access_token, data={
+        camp = await _tiktok_api("POST", "/campaign/create/", access_token, data={
             "advertiser_id": advertiser_id, "campaign_name": campaign_name,
             "objective_type": "TRAFFIC", "budget_mode": "BUDGET_MODE_INFINITE",
             "operation_status": "ENABLE"})
@@ -614,11 +1164,12 @@ def launch_campaign(daily_budget: float = Query(20.0),
         if camp.get("code") != 0:
             return {"success": False, "error": camp.get("message"), "steps": steps}
         campaign_id = _safe_get_data(camp, "campaign_id")
+        _invalidate_campaigns_view(advertiser_id)
         if not campaign_id:
             return {"success": False, "error": "No campaign_id in response", "steps": steps}
 
-        schedule = (datetime.utcnow() + timedelta(minutes=5)).strftime("%Y-%m-%d %H:%M:%S")
-        ag = _tiktok_api("POST", "/adgroup/create/", access_token, data={
+        schedule = _schedule_start()
+        ag = await _tiktok_api("POST", "/adgroup/create/", access_token, data={
             "advertiser_id": advertiser_id, "campaign_id": campaign_id,
             "adgroup_name": f"{campaign_name} - US Tennis 25-55",
             "placement_type": "PLACEMENT_TYPE_AUTOMATIC", "promotion_type": "WEBSITE",
@@ -635,24 +1186,26 @@ def launch_campaign(daily_budget: float = Query(20.0),
         if not adgroup_id:
             return {"success": False, "error": "No adgroup_id in response", "steps": steps, "campaign_id": campaign_id}
 
-        product_urls = _get_product_images()[:5]
-        image_ids = _upload_images(access_token, advertiser_id, product_urls)
-        steps.append({"step": "upload_images", "count": len(image_ids)})
+        # Identity lookup and the product feed are independent; the image upload
+        # and video pipeline only need the product URLs.
+        identity_task = asyncio.create_task(_find_best_identity(access_token, advertiser_id))
+        product_urls = (await _get_product_images())[:5]
+        image_id, video_result, identity = await asyncio.gather(
+            _upload_first_image(access_token, advertiser_id, product_urls),
+            _generate_and_upload_video(access_token, advertiser_id, product_urls),
+            identity_task)
+        steps.append({"step": "upload_images", "count": 1 if image_id else 0})
 
-        video_result = _generate_and_upload_video(access_token, advertiser_id, product_urls)
         video_id = video_result.get("video_id", "")
         thumbnail_image_id = video_result.get("thumbnail_image_id", "")
         steps.append({"step": "video_generation", "video_id": video_id,
                       "thumbnail_image_id": thumbnail_image_id,
                       "details": video_result.get("steps", [])})
-
-        identity = _find_best_identity(access_token, advertiser_id)
         steps.append({"step": "identity", "result": identity})
 
-        image_id = image_ids[0] if image_ids else ""
-        ad_result = _try_create_ad(access_token, advertiser_id, adgroup_id,
-                                    image_id, identity, video_id, campaign_id,
-                                    thumbnail_image_id)
+        ad_result = await _try_create_ad(access_token, advertiser_id, adgroup_id,
+                                         image_id, identity, video_id, campaign_id,
+                                         thumbnail_image_id)
         steps.append({"step": "create_ad", "result": ad_result})
 
         ad_id = None
@@ -660,13 +1213,9 @@ def launch_campaign(daily_budget: float = Query(20.0),
             ad_ids = ad_result.get("ad_ids", [])
             ad_id = ad_ids[0] if ad_ids else None
 
-        db.add(CampaignModel(platform="tiktok", platform_campaign_id=str(campaign_id),
-                             name=campaign_name, status="ACTIVE", campaign_type="TRAFFIC",
-                             daily_budget=adgroup_budget))
-        db.add(ActivityLogModel(action="TIKTOK_CAMPAIGN_LAUNCHED", entity_type="campaign",
-                                entity_id=str(campaign_id),
-                                details=f"Campaign: {campaign_id}, AdGroup: {adgroup_id}, Ad: {ad_id}, Video: {video_id}, Thumb: {thumbnail_image_id}, Strategy: {ad_result.get('strategy', 'none')}"))
-        db.commit()
+        background.add_task(
+            _persist_launch, campaign_id, campaign_name, adgroup_budget, "TIKTOK_CAMPAIGN_LAUNCHED",
+            f"Campaign: {campaign_id}, AdGroup: {adgroup_id}, Ad: {ad_id}, Video: {video_id}, Thumb: {thumbnail_image_id}, Strategy: {ad_result.get('strategy', 'none')}")
 
         return {"success": True, "campaign_id": campaign_id, "adgroup_id": adgroup_id,
                 "ad_id": ad_id, "video_id": video_id,
@@ -680,37 +1229,38 @@ def launch_campaign(daily_budget: float = Query(20.0),
 
 
 @router.post("/create-ad-for-adgroup", summary="Create ad for existing ad group")
-def create_ad_for_adgroup(adgroup_id: str = Query(...),
-                          campaign_id: str = Query("1856672017238274"),
-                          image_url: str = Query(None),
-                          db: Session = Depends(get_db)):
+async def create_ad_for_adgroup(adgroup_id: str = Query(...),
+                                campaign_id: str = Query("1856672017238274"),
+                                image_url: str = Query(None),
+                                db: Session = Depends(get_db)):
     """Create an ad for an existing ad group."""
-    creds = _get_active_token(db)
+    creds = await _active_token(db)
     if not creds["access_token"] or not creds["advertiser_id"]:
         return {"success": False, "error": "TikTok not connected"}
     access_token, advertiser_id = creds["access_token"], creds["advertiser_id"]
     steps = []
 
-    image_urls = [image_url] if image_url else _get_product_images()[:5]
-    image_ids = _upload_images(access_token, advertiser_id, image_urls)
+    identity_task = asyncio.create_task(_find_best_identity(access_token, advertiser_id))
+    image_urls = [image_url] if image_url else (await _get_product_images())[:5]
+    image_ids, video_result, identity = await asyncio.gather(
+        _upload_images(access_token, advertiser_id, image_urls),
+        _generate_and_upload_video(access_token, advertiser_id, image_urls),
+        identity_task)
     steps.append({"step": "images", "count": len(image_ids), "ids": image_ids})
 
-    video_result = _generate_and_upload_video(access_token, advertiser_id, image_urls)
     video_id = video_result.get("video_id", "")
     thumbnail_image_id = video_result.get("thumbnail_image_id", "")
     steps.append({"step": "video", "video_id": video_id,
                   "thumbnail_image_id": thumbnail_image_id,
                   "details": video_result.get("steps", [])})
-
-    identity = _find_best_identity(access_token, advertiser_id)
     steps.append({"step": "identity", "result": identity})
     if not identity.get("identity_id"):
         return {"success": False, "error": "No identity found.", "steps": steps}
 
     image_id = image_ids[0] if image_ids else ""
-    ad_result = _try_create_ad(access_token, advertiser_id, adgroup_id,
-                                image_id, identity, video_id, campaign_id,
-                                thumbnail_image_id)
+    ad_result = await _try_create_ad(access_token, advertiser_id, adgroup_id,
+                                     image_id, identity, video_id, campaign_id,
+                                     thumbnail_image_id)
     steps.append({"step": "create_ad", "result": ad_result})
 
     if ad_result.get("success"):
@@ -724,20 +1274,20 @@ def create_ad_for_adgroup(adgroup_id: str = Query(...),
 # ── Video Upload Endpoints ──
 
 @router.post("/generate-video", summary="Generate and upload video from product images")
-def generate_video_endpoint(db: Session = Depends(get_db)):
-    creds = _get_active_token(db)
+async def generate_video_endpoint(db: Session = Depends(get_db)):
+    creds = await _active_token(db)
     if not creds["access_token"]:
         return {"error": "Not connected"}
-    return _generate_and_upload_video(creds["access_token"], creds["advertiser_id"],
-                                      _get_product_images()[:5])
+    product_urls = (await _get_product_images())[:5]
+    return await _generate_and_upload_video(creds["access_token"], creds["advertiser_id"], product_urls)
 
 
 @router.post("/upload-video-url", summary="Upload video from URL")
-def upload_video_from_url(video_url: str = Query(...), db: Session = Depends(get_db)):
-    creds = _get_active_token(db)
+async def upload_video_from_url(video_url: str = Query(...), db: Session = Depends(get_db)):
+    creds = await _active_token(db)
     if not creds["access_token"]:
         return {"error": "Not connected"}
-    result = _tiktok_api("POST", "/file/video/ad/upload/", creds["access_token"], data={
+    result = await _tiktok_api("POST", "/file/video/ad/upload/", creds["access_token"], data={
         "advertiser_id": creds["advertiser_id"], "upload_type": "UPLOAD_BY_URL",
         "video_url": video_url, "file_name": f"court_sportswear_{int(time.time())}.mp4"})
     video_id = _safe_get_data(result, "video_id") if result.get("code") == 0 else ""
@@ -747,12 +1297,11 @@ def upload_video_from_url(video_url: str = Query(...), db: Session = Depends(get
 # ── Debug & Info Endpoints ──
 
 @router.get("/images", summary="List uploaded images")
-def list_images(db: Session = Depends(get_db)):
-    creds = _get_active_token(db)
+async def list_images(db: Session = Depends(get_db)):
+    creds = await _active_token(db)
     if not creds["access_token"]:
         return {"error": "Not connected"}
-    result = _tiktok_api("GET", "/file/image/ad/get/", creds["access_token"],
-                         params={"advertiser_id": creds["advertiser_id"], "page_size": 50})
+    result = await _get_existing_images(creds["access_token"], creds["advertiser_id"])
     data = _safe_get_data(result)
     images = data.get("list", [])
     return {"count": len(images), "images": images,
@@ -760,13 +1309,13 @@ def list_images(db: Session = Depends(get_db)):
 
 
 @router.get("/videos", summary="List uploaded videos")
-def list_videos(db: Session = Depends(get_db)):
-    creds = _get_active_token(db)
+async def list_videos(db: Session = Depends(get_db)):
+    creds = await _active_token(db)
     if not creds["access_token"]:
         return {"error": "Not connected"}
     for endpoint in ["/file/video/ad/info/", "/file/video/ad/get/"]:
-        result = _tiktok_api("GET", endpoint, creds["access_token"],
-                             params={"advertiser_id": creds["advertiser_id"], "page_size": 50})
+        result = await _tiktok_api("GET", endpoint, creds["access_token"],
+                                   params={"advertiser_id": creds["advertiser_id"], "page_size": 50})
         if result.get("code") == 0:
             data = _safe_get_data(result)
             videos = data.get("list", [])
@@ -775,17 +1324,12 @@ def list_videos(db: Session = Depends(get_db)):
 
 
 @router.get("/identities", summary="List all TikTok identities")
-def list_identities(db: Session = Depends(get_db)):
-    creds = _get_active_token(db)
+async def list_identities(db: Session = Depends(get_db)):
+    creds = await _active_token(db)
     if not creds["access_token"]:
         return {"error": "Not connected"}
-    all_ids = {}
-    for it in ["TT_USER", "BC_AUTH_TT", "CUSTOMIZED_USER"]:
-        result = _tiktok_api("GET", "/identity/get/", creds["access_token"],
-                             params={"advertiser_id": creds["advertiser_id"], "identity_type": it})
-        data = _safe_get_data(result)
-        lst = data.get("identity_list", []) if result.get("code") == 0 else []
-        all_ids[it] = {"count": len(lst), "list": lst}
+    by_type = await _fetch_identity_lists(creds["access_token"], creds["advertiser_id"])
+    all_ids = {it: {"count": len(lst), "list": lst} for it, lst in by_type.items()}
     return {"advertiser_id": creds["advertiser_id"], "identities": all_ids}
 
 
@@ -815,30 +1359,48 @@ def debug_ffmpeg():
 
 # ── Performance Endpoints ──
 
+_REPORT_DIMENSIONS = orjson.dumps(["campaign_id"]).decode()
+_REPORT_METRICS = orjson.dumps(["spend", "impressions", "clicks", "ctr", "cpc", "reach"]).decode()
+_EMPTY_METRICS = MappingProxyType({"spend": 0, "impressions": 0, "clicks": 0, "ctr": 0, "cpc": 0, "reach": 0})
+
+
+def _performance_row(c: dict, campaign_metrics: dict) -> dict:
+    cid = str(c.get("campaign_id", ""))
+    return {
+        "id": cid,
+        "name": c.get("campaign_name", ""),
+        "status": c.get("operation_status", ""),
+        "objective": c.get("objective_type", ""),
+        "budget": c.get("budget", 0),
+        **campaign_metrics.get(cid, _EMPTY_METRICS),
+    }
+
+
 @router.get("/performance", summary="Get TikTok Performance Data (with per-campaign metrics)")
-def get_tiktok_performance(db: Session = Depends(get_db)):
+async def get_tiktok_performance(db: Session = Depends(get_db)):
     """Fetch TikTok campaign list AND per-campaign performance metrics."""
-    creds = _get_active_token(db)
+    creds = await _active_token(db)
     if not creds["access_token"] or not creds["advertiser_id"]:
         return {"error": "TikTok not connected"}
     try:
-        result = _tiktok_api("GET", "/campaign/get/", creds["access_token"],
-                           params={"advertiser_id": creds["advertiser_id"], "page_size": 100})
+        start, end = _report_dates()
+
+        # Campaign list and report are independent — fetch both in one round trip
+        result, stats = await asyncio.gather(
+            _tiktok_api("GET", "/campaign/get/", creds["access_token"],
+                        params={"advertiser_id": creds["advertiser_id"], "page_size": 100}),
+            _tiktok_api("GET", "/report/integrated/get/", creds["access_token"], params={
+                "advertiser_id": creds["advertiser_id"], "report_type": "BASIC",
+                "dimensions": _REPORT_DIMENSIONS, "data_level": "AUCTION_CAMPAIGN",
+                "start_date": start, "end_date": end,
+                "metrics": _REPORT_METRICS}),
+        )
         campaigns_raw = []
         if result.get("code") == 0:
             data = _safe_get_data(result)
             campaigns_raw = data.get("list", [])
 
-        end = datetime.utcnow().strftime("%Y-%m-%d")
-        start = (datetime.utcnow() - timedelta(days=7)).strftime("%Y-%m-%d")
         campaign_metrics = {}
-
-        stats = _tiktok_api("GET", "/report/integrated/get/", creds["access_token"], params={
-            "advertiser_id": creds["advertiser_id"], "report_type": "BASIC",
-            "dimensions": json.dumps(["campaign_id"]), "data_level": "AUCTION_CAMPAIGN",
-            "start_date": start, "end_date": end,
-            "metrics": json.dumps(["spend", "impressions", "clicks", "ctr", "cpc", "reach"])})
-
         if stats.get("code") == 0:
             stats_data = _safe_get_data(stats)
             for row in stats_data.get("list", []):
@@ -855,34 +1417,13 @@ def get_tiktok_performance(db: Session = Depends(get_db)):
                         "reach": int(m.get("reach", 0)),
                     }
 
-        total_spend = total_imp = total_clicks = total_reach = 0
-        campaigns = []
-        for c in campaigns_raw:
-            cid = str(c.get("campaign_id", ""))
-            metrics = campaign_metrics.get(cid, {})
-            spend = metrics.get("spend", 0)
-            impressions = metrics.get("impressions", 0)
-            clicks = metrics.get("clicks", 0)
-            ctr = metrics.get("ctr", 0)
-            cpc = metrics.get("cpc", 0)
-            reach = metrics.get("reach", 0)
-
-            total_spend += spend
-            total_imp += impressions
-            total_clicks += clicks
-            total_reach += reach
-
-            campaigns.append({
-                "id": cid,
-                "name": c.get("campaign_name", ""),
-                "status": c.get("operation_status", ""),
-                "objective": c.get("objective_type", ""),
-                "budget": c.get("budget", 0),
-                "spend": spend, "impressions": impressions,
-                "clicks": clicks, "ctr": ctr, "cpc": cpc, "reach": reach,
-            })
+        campaigns = [_performance_row(c, campaign_metrics) for c in campaigns_raw]
+        total_spend = math.fsum(map(itemgetter("spend"), campaigns))
+        total_imp = sum(map(itemgetter("impressions"), campaigns))
+        total_clicks = sum(map(itemgetter("clicks"), campaigns))
+        total_reach = sum(map(itemgetter("reach"), campaigns))
 
-        campaigns.sort(key=lambda x: x["spend"], reverse=True)
+        campaigns.sort(key=itemgetter("spend"), reverse=True)
         avg_ctr = round((total_clicks / total_imp * 100) if total_imp else 0, 2)
         avg_cpc = round((total_spend / total_clicks) if total_clicks else 0, 2)
 
@@ -906,13 +1447,13 @@ def get_tiktok_performance(db: Session = Depends(get_db)):
 # ── Targeting Discovery ──
 
 @router.get("/targeting-categories", summary="Get TikTok interest categories for targeting")
-def get_targeting_categories(db: Session = Depends(get_db)):
+async def get_targeting_categories(db: Session = Depends(get_db)):
     """Query TikTok interest category taxonomy to find tennis/sports IDs."""
-    creds = _get_active_token(db)
+    creds = await _active_token(db)
     if not creds["access_token"]:
         return {"error": "Not connected"}
-    result = _tiktok_api("GET", "/tool/interest_category/", creds["access_token"],
-                         params={"advertiser_id": creds["advertiser_id"], "language": "en"})
+    result = await _tiktok_api("GET", "/tool/interest_category/", creds["access_token"],
+                               params={"advertiser_id": creds["advertiser_id"], "language": "en"})
     if result.get("code") != 0:
         return {"error": result.get("message"), "raw": result}
     data = _safe_get_data(result)
@@ -929,32 +1470,32 @@ def get_targeting_categories(db: Session = Depends(get_db)):
 
 
 @router.get("/targeting-keywords", summary="Search TikTok interest keywords")
-def get_targeting_keywords(keyword: str = Query("tennis"), db: Session = Depends(get_db)):
+async def get_targeting_keywords(keyword: str = Query("tennis"), db: Session = Depends(get_db)):
     """Search TikTok keyword targeting for specific terms like tennis, pickleball."""
-    creds = _get_active_token(db)
+    creds = await _active_token(db)
     if not creds["access_token"]:
         return {"error": "Not connected"}
-    result = _tiktok_api("GET", "/tool/interest_keyword/recommend/", creds["access_token"],
-                         params={"advertiser_id": creds["advertiser_id"],
-                                 "keyword": keyword, "language": "en", "limit": 50})
+    result = await _tiktok_api("GET", "/tool/interest_keyword/recommend/", creds["access_token"],
+                               params={"advertiser_id": creds["advertiser_id"],
+                                       "keyword": keyword, "language": "en", "limit": 50})
     if result.get("code") != 0:
-        result = _tiktok_api("GET", "/tool/interest_keyword/get/", creds["access_token"],
-                             params={"advertiser_id": creds["advertiser_id"],
-                                     "keyword": keyword, "language": "en"})
+        result = await _tiktok_api("GET", "/tool/interest_keyword/get/", creds["access_token"],
+                                   params={"advertiser_id": creds["advertiser_id"],
+                                           "keyword": keyword, "language": "en"})
     return {"keyword": keyword, "result": result}
 
 
 # ── Campaign Management (API-level) ──
 
 @router.post("/pause-all-campaigns", summary="Pause ALL TikTok campaigns via API")
-def pause_all_campaigns(db: Session = Depends(get_db)):
+async def pause_all_campaigns(db: Session = Depends(get_db)):
     """Actually pause campaigns on TikTok platform using /campaign/update/ endpoint."""
-    creds = _get_active_token(db)
+    creds = await _active_token(db)
     if not creds["access_token"]:
         return {"error": "Not connected"}
     access_token, advertiser_id = creds["access_token"], creds["advertiser_id"]
-    result = _tiktok_api("GET", "/campaign/get/", access_token,
-                         params={"advertiser_id": advertiser_id, "page_size": 100})
+    result = await _tiktok_api("GET", "/campaign/get/", access_token,
+                               params={"advertiser_id": advertiser_id, "page_size": 100})
     if result.get("code") != 0:
         return {"error": result.get("message")}
     data = _safe_get_data(result)
@@ -968,7 +1509,7 @@ def pause_all_campaigns(db: Session = Depends(get_db)):
             already_paused.append({"id": cid, "name": name, "status": status})
             continue
         # v1.2.1 FIX: Use /campaign/update/ with campaign_id (singular), not /campaign/update/status/
-        pr = _tiktok_api("POST", "/campaign/update/", access_token, data={
+        pr = await _tiktok_api("POST", "/campaign/update/", access_token, data={
             "advertiser_id": advertiser_id,
             "campaign_id": cid,
             "operation_status": "DISABLE"})
@@ -976,40 +1517,47 @@ def pause_all_campaigns(db: Session = Depends(get_db)):
             paused.append({"id": cid, "name": name})
         else:
             errors.append({"id": cid, "name": name, "error": pr.get("message"), "code": pr.get("code")})
+    _invalidate_campaigns_view(advertiser_id)
+    await run_in_threadpool(_record_pause_all, db, len(paused))
+    return {"total_campaigns": len(campaigns), "paused": len(paused),
+            "already_paused": len(already_paused), "errors": len(errors),
+            "paused_list": paused, "already_paused_list": already_paused, "error_list": errors}
+
+
+def _record_pause_all(db: Session, paused_count: int):
     try:
         db.query(CampaignModel).filter(CampaignModel.platform == "tiktok").update({"status": "PAUSED"})
         db.add(ActivityLogModel(action="TIKTOK_ALL_CAMPAIGNS_PAUSED", entity_type="campaign",
-                                entity_id="all", details=f"Paused {len(paused)} campaigns via API"))
+                                entity_id="all", details=f"Paused {paused_count} campaigns via API"))
         db.commit()
     except Exception:
-        pass
-    return {"total_campaigns": len(campaigns), "paused": len(paused),
-            "already_paused": len(already_paused), "errors": len(errors),
-            "paused_list": paused, "already_paused_list": already_paused, "error_list": errors}
+        db.rollback()
 
 
 @router.post("/pause-campaign", summary="Pause a single TikTok campaign")
-def pause_single_campaign(campaign_id: str = Query(...), db: Session = Depends(get_db)):
+async def pause_single_campaign(campaign_id: str = Query(...), db: Session = Depends(get_db)):
     """Pause a single campaign by ID."""
-    creds = _get_active_token(db)
+    creds = await _active_token(db)
     if not creds["access_token"]:
         return {"error": "Not connected"}
-    result = _tiktok_api("POST", "/campaign/update/", creds["access_token"], data={
+    result = await _tiktok_api("POST", "/campaign/update/", creds["access_token"], data={
         "advertiser_id": creds["advertiser_id"],
         "campaign_id": campaign_id,
         "operation_status": "DISABLE"})
+    _invalidate_campaigns_view(creds["advertiser_id"])
     return {"campaign_id": campaign_id, "code": result.get("code"), "message": result.get("message")}
 
 
 @router.post("/launch-targeted-campaign", summary="Launch properly targeted tennis campaign")
-def launch_targeted_campaign(daily_budget: float = Query(20.0),
-                             campaign_name: str = Query(None),
-                             interest_category_ids: str = Query(None),
-                             interest_keyword_ids: str = Query(None),
-                             db: Session = Depends(get_db)):
+async def launch_targeted_campaign(background: BackgroundTasks,
+                                   daily_budget: float = Query(20.0),
+                                   campaign_name: str = Query(None),
+                                   interest_category_ids: str = Query(None),
+                                   interest_keyword_ids: str = Query(None),
+                                   db: Session = Depends(get_db)):
     """Launch campaign with proper tennis/sports interest targeting.
     Auto-discovers sports/fitness categories if no IDs provided."""
-    creds = _get_active_token(db)
+    creds = await _active_token(db)
     if not creds["access_token"] or not creds["advertiser_id"]:
         return {"success": False, "error": "TikTok not connected."}
     access_token, advertiser_id = creds["access_token"], creds["advertiser_id"]
@@ -1027,8 +1575,8 @@ def launch_targeted_campaign(daily_budget: float = Query(20.0),
         targeting_data["interest_keyword_ids"] = json.loads(interest_keyword_ids) if isinstance(interest_keyword_ids, str) else interest_keyword_ids
         steps.append({"step": "targeting", "method": "provided_keywords"})
     else:
-        cat_result = _tiktok_api("GET", "/tool/interest_category/", access_token,
-                                 params={"advertiser_id": advertiser_id, "language": "en"})
+        cat_result = await _tiktok_api("GET", "/tool/interest_category/", access_token,
+                                       params={"advertiser_id": advertiser_id, "language": "en"})
         if cat_result.get("code") == 0:
             cat_data = _safe_get_data(cat_result)
             all_cats = cat_data.get("interest_categories", []) or cat_data.get("list", [])
@@ -1050,7 +1598,7 @@ def launch_targeted_campaign(daily_budget: float = Query(20.0),
             steps.append({"step": "auto_targeting", "error": cat_result.get("message")})
 
     try:
-        camp = _tiktok_api("POST", "/campaign/create/", access_token, data={
+        camp = await _tiktok_api("POST", "/campaign/create/", access_token, data={
             "advertiser_id": advertiser_id, "campaign_name": campaign_name,
             "objective_type": "TRAFFIC", "budget_mode": "BUDGET_MODE_INFINITE",
             "operation_status": "ENABLE"})
@@ -1058,8 +1606,9 @@ def launch_targeted_campaign(daily_budget: float = Query(20.0),
         if camp.get("code") != 0:
             return {"success": False, "error": camp.get("message"), "steps": steps}
         campaign_id = _safe_get_data(camp, "campaign_id")
+        _invalidate_campaigns_view(advertiser_id)
 
-        schedule = (datetime.utcnow() + timedelta(minutes=5)).strftime("%Y-%m-%d %H:%M:%S")
+        schedule = _schedule_start()
         adgroup_data = {
             "advertiser_id": advertiser_id, "campaign_id": campaign_id,
             "adgroup_name": f"{campaign_name} - Tennis Enthusiasts 25-54",
@@ -1076,27 +1625,27 @@ def launch_targeted_campaign(daily_budget: float = Query(20.0),
         if targeting_data.get("interest_keyword_ids"):
             adgroup_data["interest_keyword_ids"] = targeting_data["interest_keyword_ids"]
 
-        ag = _tiktok_api("POST", "/adgroup/create/", access_token, data=adgroup_data)
+        ag = await _tiktok_api("POST", "/adgroup/create/", access_token, data=adgroup_data)
         steps.append({"step": "adgroup", "code": ag.get("code"), "message": ag.get("message"), "targeting": targeting_data})
         if ag.get("code") != 0:
             return {"success": False, "error": ag.get("message"), "steps": steps, "campaign_id": campaign_id}
         adgroup_id = _safe_get_data(ag, "adgroup_id")
 
-        product_urls = _get_product_images()[:5]
-        image_ids = _upload_images(access_token, advertiser_id, product_urls)
-        steps.append({"step": "upload_images", "count": len(image_ids)})
+        identity_task = asyncio.create_task(_find_best_identity(access_token, advertiser_id))
+        product_urls = (await _get_product_images())[:5]
+        image_id, video_result, identity = await asyncio.gather(
+            _upload_first_image(access_token, advertiser_id, product_urls),
+            _generate_and_upload_video(access_token, advertiser_id, product_urls),
+            identity_task)
+        steps.append({"step": "upload_images", "count": 1 if image_id else 0})
 
-        video_result = _generate_and_upload_video(access_token, advertiser_id, product_urls)
         video_id = video_result.get("video_id", "")
         thumbnail_image_id = video_result.get("thumbnail_image_id", "")
         steps.append({"step": "video", "video_id": video_id, "thumbnail_id": thumbnail_image_id})
-
-        identity = _find_best_identity(access_token, advertiser_id)
         steps.append({"step": "identity", "result": identity})
 
-        image_id = image_ids[0] if image_ids else ""
-        ad_result = _try_create_ad(access_token, advertiser_id, adgroup_id,
-                                    image_id, identity, video_id, campaign_id, thumbnail_image_id)
+        ad_result = await _try_create_ad(access_token, advertiser_id, adgroup_id,
+                                         image_id, identity, video_id, campaign_id, thumbnail_image_id)
         steps.append({"step": "create_ad", "result": ad_result})
 
         ad_id = None
@@ -1104,12 +1653,8 @@ def launch_targeted_campaign(daily_budget: float = Query(20.0),
             ad_ids = ad_result.get("ad_ids", [])
             ad_id = ad_ids[0] if ad_ids else None
 
-        db.add(CampaignModel(platform="tiktok", platform_campaign_id=str(campaign_id),
-                             name=campaign_name, status="ACTIVE", campaign_type="TRAFFIC",
-                             daily_budget=adgroup_budget))
-        db.add(ActivityLogModel(action="TIKTOK_TARGETED_CAMPAIGN_LAUNCHED", entity_type="campaign",
-                                entity_id=str(campaign_id), details=f"Targeted with: {targeting_data}"))
-        db.commit()
+        background.add_task(_persist_launch, campaign_id, campaign_name, adgroup_budget,
+                            "TIKTOK_TARGETED_CAMPAIGN_LAUNCHED", f"Targeted with: {targeting_data}")
 
         return {"success": True, "campaign_id": campaign_id, "adgroup_id": adgroup_id,
                 "ad_id": ad_id, "video_id": video_id, "targeting": targeting_data,
@@ -1119,9 +1664,8 @@ def launch_targeted_campaign(daily_budget: float = Query(20.0),
 
 
 @router.get("/advertiser-info", summary="Get advertiser info")
-def get_advertiser_info(db: Session = Depends(get_db)):
-    creds = _get_active_token(db)
+async def get_advertiser_info(db: Session = Depends(get_db)):
+    creds = await _active_token(db)
     if not creds["access_token"]:
         return {"error": "Not connected"}
-    return _tiktok_api("GET", "/advertiser/info/", creds["access_token"],
-                       params={"advertiser_ids": json.dumps([creds["advertiser_id"]])})
+    return await _get_advertiser_info(creds["access_token"], creds["advertiser_id"])
@@ -2,150 +2,247 @@
 
 This router is mounted at the same /api/v1/tiktok prefix as the main
 TikTok router, adding the missing /campaigns endpoint that the dashboard
-expects. Imports shared helpers from tiktok.py.
+expects. Imports shared helpers from tiktok.py (which never imports this
+module, so they are bound once at import time).
 
 Fixes BUG-12: GET /api/v1/tiktok/campaigns was returning 404.
+
+Responses are cached per advertiser with stale-while-revalidate: fresh for
+CAMPAIGNS_CACHE_TTL seconds, then served stale (while one background refresh
+runs) for up to CAMPAIGNS_STALE_TTL. Campaign mutations in tiktok.py drop the
+entry; a `Cache-Control: no-cache` request header bypasses it.
 """
 
+import asyncio
 import json
 import logging
-from datetime import datetime, timedelta
+import time
+
+import orjson
+from operator import itemgetter
+from types import MappingProxyType
 
-from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.database import get_db
+from app.routers.tiktok import (
+    _CACHE, _active_token, _campaigns_view_gen, _campaigns_view_key, _report_dates, _safe_get_data,
+    _tiktok_api,
+)
 
 logger = logging.getLogger("AutoSEM.TikTokCampaigns")
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+CAMPAIGNS_CACHE_TTL = 60
+CAMPAIGNS_STALE_TTL = 600
+
+_DIMENSIONS_JSON = json.dumps(["campaign_id"])
+
+
+def _money(v: float) -> float:
+    return round(v, 2)
 
 
-def _get_tiktok_helpers():
-    """Lazy import helpers from the main tiktok router to avoid circular imports."""
-    from app.routers.tiktok import _get_active_token, _tiktok_api, _safe_get_data
-    return _get_active_token, _tiktok_api, _safe_get_data
+def _percent(v: float) -> float:
+    return round(v * 100, 2)
+
+
+# (report metric, response field, converter applied to float(value))
+_METRIC_CONVERTERS = (
+    ("spend", "spend", _money),
+    ("impressions", "impressions", int),
+    ("clicks", "clicks", int),
+    ("ctr", "ctr", _percent),
+    ("cpc", "cpc", _money),
+    ("reach", "reach", int),
+    ("conversion", "conversions", int),
+    ("cost_per_conversion", "cost_per_conversion", _money),
+)
+_METRICS_JSON = json.dumps([src for src, _, _ in _METRIC_CONVERTERS])
+_ACTIVE_STATUSES = frozenset({"ENABLE", "ACTIVE", "CAMPAIGN_STATUS_ENABLE"})
+_EMPTY_METRICS = MappingProxyType({dst: 0 for _, dst, _ in _METRIC_CONVERTERS})
+
+# Pre-encoded body for accounts without TikTok credentials. The disconnected state
+# itself is held by tiktok.py's token cache and reset when the OAuth callback saves a token.
+_NOT_CONNECTED_BODY = orjson.dumps({
+    "campaigns": [],
+    "total_campaigns": 0,
+    "active_campaigns": 0,
+    "error": "TikTok not connected — no access token or advertiser ID",
+})
+
+# Background refreshes in flight, keyed by cache key (also keeps the tasks referenced)
+_REFRESHING: dict = {}
 
 
 @router.get("/campaigns", summary="List TikTok campaigns with metrics")
-def get_tiktok_campaigns(db: Session = Depends(get_db)):
+async def get_tiktok_campaigns(request: Request,
+                               limit: int = Query(None, ge=1, description="Only return the top N campaigns by spend"),
+                               stream: bool = Query(False, description="Stream campaigns as NDJSON, one per line"),
+                               db: Session = Depends(get_db)):
     """List all TikTok campaigns with their status and 7-day performance metrics.
 
     Returns:
         campaigns: List of campaign objects with metadata + metrics
+                   (highest spend first; top `limit` only if given)
         total_campaigns: Total campaign count
         active_campaigns: Count of ENABLE/ACTIVE campaigns
-    """
-    _get_active_token, _tiktok_api, _safe_get_data = _get_tiktok_helpers()
 
-    creds = _get_active_token(db)
+    With ?stream=1 the campaign objects are sent as application/x-ndjson
+    instead, one per line, so the dashboard can render rows as they arrive.
+    """
+    creds = await _active_token(db)
     if not creds.get("access_token") or not creds.get("advertiser_id"):
-        return JSONResponse(status_code=200, content={
+        return Response(_NOT_CONNECTED_BODY, media_type="application/json")
+
+    key = _campaigns_view_key(creds["advertiser_id"])
+    hit = _CACHE.get(key)
+    if hit and "no-cache" not in request.headers.get("cache-control", ""):
+        age = time.monotonic() - hit[0]
+        if age < CAMPAIGNS_CACHE_TTL:
+            return _render(hit[1], limit, stream)
+        if age < CAMPAIGNS_STALE_TTL:
+            if key not in _REFRESHING:
+                task = asyncio.create_task(_background_refresh(key, creds))
+                _REFRESHING[key] = task
+                task.add_done_callback(lambda _: _REFRESHING.pop(key, None))
+            return _render(hit[1], limit, stream)
+
+    try:
+        return _render(await _refresh(key, creds), limit, stream)
+    except Exception as e:
+        logger.error(f"TikTok campaigns error: {e}", exc_info=True)
+        return ORJSONResponse(status_code=500, content={
             "campaigns": [],
             "total_campaigns": 0,
             "active_campaigns": 0,
-            "error": "TikTok not connected — no access token or advertiser ID",
+            "error": str(e),
         })
 
+
+def _top(body: dict, limit: int) -> dict:
+    """The cached list is already sorted by spend, so the top N is a slice."""
+    if not limit or limit >= len(body["campaigns"]):
+        return body
+    return {**body, "campaigns": body["campaigns"][:limit]}
+
+
+def _render(body: dict, limit: int, stream: bool):
+    body = _top(body, limit)
+    if not stream:
+        return body
+    return StreamingResponse(_ndjson(body["campaigns"]), media_type="application/x-ndjson")
+
+
+def _ndjson(rows: list):
+    for row in rows:
+        yield orjson.dumps(row) + b"\n"
+
+
+async def _refresh(key: tuple, creds: dict) -> dict:
+    """Rebuild the campaigns view and cache it if the campaign list call succeeded.
+
+    If the view was invalidated (a pause or launch) while this build was in flight,
+    the result may predate the mutation and is returned without being cached.
+    """
+    generation = _campaigns_view_gen(creds["advertiser_id"])
+    body, ok = await _build_campaigns_view(creds, generation)
+    if ok and _campaigns_view_gen(creds["advertiser_id"]) == generation:
+        _CACHE[key] = (time.monotonic(), body)
+    return body
+
+
+async def _background_refresh(key: tuple, creds: dict):
     try:
-        # --- Fetch campaign list ---
-        result = _tiktok_api(
+        await _refresh(key, creds)
+    except Exception as e:
+        logger.warning(f"TikTok campaigns background refresh failed: {e}")
+
+
+async def _build_campaigns_view(creds: dict, generation: int = 0) -> tuple:
+    """Return (response body, campaign list fetched OK).
+
+    The GETs only coalesce with others of the same view generation, so a build after
+    an invalidation never joins a request sent before it.
+    """
+    start_date, end_date = _report_dates()
+
+    # --- Fetch campaign list and 7-day metrics concurrently ---
+    result, stats = await asyncio.gather(
+        _tiktok_api(
             "GET", "/campaign/get/", creds["access_token"],
             params={
                 "advertiser_id": creds["advertiser_id"],
                 "page_size": 100,
             },
-        )
-        campaigns_raw = []
-        if result.get("code") == 0:
-            data = _safe_get_data(result)
-            campaigns_raw = data.get("list", [])
-
-        # --- Fetch 7-day performance metrics per campaign ---
-        end_date = datetime.utcnow().strftime("%Y-%m-%d")
-        start_date = (datetime.utcnow() - timedelta(days=7)).strftime("%Y-%m-%d")
-
-        campaign_metrics = {}
-        try:
-            stats = _tiktok_api(
-                "GET", "/report/integrated/get/", creds["access_token"],
-                params={
-                    "advertiser_id": creds["advertiser_id"],
-                    "report_type": "BASIC",
-                    "dimensions": json.dumps(["campaign_id"]),
-                    "data_level": "AUCTION_CAMPAIGN",
-                    "start_date": start_date,
-                    "end_date": end_date,
-                    "metrics": json.dumps([
-                        "spend", "impressions", "clicks", "ctr", "cpc",
-                        "reach", "conversion", "cost_per_conversion",
-                    ]),
-                },
-            )
-            if stats.get("code") == 0:
-                stats_data = _safe_get_data(stats)
-                for row in stats_data.get("list", []):
-                    dims = row.get("dimensions", {})
-                    m = row.get("metrics", {})
-                    cid = str(dims.get("campaign_id", ""))
-                    if cid:
-                        campaign_metrics[cid] = {
-                            "spend": round(float(m.get("spend", 0)), 2),
-                            "impressions": int(float(m.get("impressions", 0))),
-                            "clicks": int(float(m.get("clicks", 0))),
-                            "ctr": round(float(m.get("ctr", 0)) * 100, 2),
-                            "cpc": round(float(m.get("cpc", 0)), 2),
-                            "reach": int(float(m.get("reach", 0))),
-                            "conversions": int(float(m.get("conversion", 0))),
-                            "cost_per_conversion": round(
-                                float(m.get("cost_per_conversion", 0)), 2
-                            ),
-                        }
-        except Exception as stats_err:
-            logger.warning(f"Could not fetch TikTok campaign metrics: {stats_err}")
-
-        # --- Merge campaign info with metrics ---
-        campaigns = []
-        active_count = 0
-        for c in campaigns_raw:
-            cid = str(c.get("campaign_id", ""))
-            status = c.get("operation_status", c.get("status", "UNKNOWN"))
-            metrics = campaign_metrics.get(cid, {})
-
-            if status in ("ENABLE", "ACTIVE", "CAMPAIGN_STATUS_ENABLE"):
-                active_count += 1
-
-            campaigns.append({
-                "campaign_id": cid,
-                "campaign_name": c.get("campaign_name", ""),
-                "status": status,
-                "budget": c.get("budget", 0),
-                "budget_mode": c.get("budget_mode", ""),
-                "objective_type": c.get("objective_type", ""),
-                "spend": metrics.get("spend", 0),
-                "impressions": metrics.get("impressions", 0),
-                "clicks": metrics.get("clicks", 0),
-                "ctr": metrics.get("ctr", 0),
-                "cpc": metrics.get("cpc", 0),
-                "reach": metrics.get("reach", 0),
-                "conversions": metrics.get("conversions", 0),
-                "cost_per_conversion": metrics.get("cost_per_conversion", 0),
-            })
-
-        # Sort by spend descending (highest spenders first)
-        campaigns.sort(key=lambda x: x["spend"], reverse=True)
-
-        return {
-            "campaigns": campaigns,
-            "total_campaigns": len(campaigns),
-            "active_campaigns": active_count,
-        }
-
-    except Exception as e:
-        logger.error(f"TikTok campaigns error: {e}", exc_info=True)
-        return JSONResponse(status_code=500, content={
-            "campaigns": [],
-            "total_campaigns": 0,
-            "active_campaigns": 0,
-            "error": str(e),
-        })
+            coalesce_tag=("campaigns_view", generation),
+        ),
+        _tiktok_api(
+            "GET", "/report/integrated/get/", creds["access_token"],
+            params={
+                "advertiser_id": creds["advertiser_id"],
+                "report_type": "BASIC",
+                "dimensions": _DIMENSIONS_JSON,
+                "data_level": "AUCTION_CAMPAIGN",
+                "start_date": start_date,
+                "end_date": end_date,
+                "metrics": _METRICS_JSON,
+            },
+            coalesce_tag=("campaigns_view", generation),
+        ),
+        return_exceptions=True,
+    )
+    if isinstance(result, BaseException):
+        raise result
+    campaigns_raw = []
+    if result.get("code") == 0:
+        data = _safe_get_data(result)
+        campaigns_raw = data.get("list", [])
+
+    campaign_metrics = {}
+    try:
+        if isinstance(stats, BaseException):
+            raise stats
+        if stats.get("code") == 0:
+            stats_data = _safe_get_data(stats)
+            for row in stats_data.get("list", []):
+                dims = row.get("dimensions", {})
+                m = row.get("metrics", {})
+                cid = str(dims.get("campaign_id", ""))
+                if cid:
+                    campaign_metrics[cid] = {
+                        dst: convert(float(m.get(src, 0)))
+                        for src, dst, convert in _METRIC_CONVERTERS
+                    }
+    except Exception as stats_err:
+        logger.warning(f"Could not fetch TikTok campaign metrics: {stats_err}")
+
+    # --- Merge campaign info with metrics ---
+    campaigns = [_campaign_row(c, campaign_metrics) for c in campaigns_raw]
+    active_count = sum(row["status"] in _ACTIVE_STATUSES for row in campaigns)
+
+    # Sort by spend descending (highest spenders first)
+    campaigns.sort(key=itemgetter("spend"), reverse=True)
+
+    return {
+        "campaigns": campaigns,
+        "total_campaigns": len(campaigns),
+        "active_campaigns": active_count,
+    }, result.get("code") == 0
+
+
+def _campaign_row(c: dict, campaign_metrics: dict) -> dict:
+    cid = str(c.get("campaign_id", ""))
+    metrics = campaign_metrics.get(cid) or _EMPTY_METRICS
+    return {
+        "campaign_id": cid,
+        "campaign_name": c.get("campaign_name", ""),
+        "status": c.get("operation_status") or c.get("status") or "UNKNOWN",
+        "budget": c.get("budget", 0),
+        "budget_mode": c.get("budget_mode", ""),
+        "objective_type": c.get("objective_type", ""),
+        # Same keys and order as _EMPTY_METRICS / _METRIC_CONVERTERS
+        **metrics,
+    }
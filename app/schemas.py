@@ -4,12 +4,14 @@ Pydantic schemas for AutoSEM API
 
 from datetime import date
 from typing import Optional, List
-from pydantic import BaseModel, model_validator
+from pydantic import BaseModel, ConfigDict, computed_field
 
 
 # --- Products ---
 
 class ProductBase(BaseModel):
+    model_config = ConfigDict(from_attributes=True, extra="ignore")
+
     shopify_id: str
     title: str
     description: Optional[str] = None
@@ -34,13 +36,12 @@ class ProductCreate(ProductBase):
 class Product(ProductBase):
     id: int
 
-    class Config:
-        from_attributes = True
-
 
 # --- Campaigns ---
 
 class CampaignBase(BaseModel):
+    model_config = ConfigDict(from_attributes=True, extra="ignore")
+
     platform: str
     platform_campaign_id: Optional[str] = None
     name: str
@@ -73,20 +74,18 @@ class CampaignUpdate(CampaignBase):
 
 class Campaign(CampaignBase):
     id: int
-    ctr: Optional[float] = 0.0
-    cpc: Optional[float] = 0.0
 
-    @model_validator(mode="after")
-    def compute_metrics(self):
+    @computed_field
+    @property
+    def ctr(self) -> float:
         impressions = self.impressions or 0
-        clicks = self.clicks or 0
-        spend = self.spend or 0.0
-        self.ctr = round((clicks / impressions) * 100, 2) if impressions > 0 else 0.0
-        self.cpc = round(spend / clicks, 2) if clicks > 0 else 0.0
-        return self
+        return round(((self.clicks or 0) / impressions) * 100, 2) if impressions > 0 else 0.0
 
-    class Config:
-        from_attributes = True
+    @computed_field
+    @property
+    def cpc(self) -> float:
+        clicks = self.clicks or 0
+        return round((self.spend or 0.0) / clicks, 2) if clicks > 0 else 0.0
 
 
 class CampaignHistory(BaseModel):
@@ -1,9 +1,11 @@
 from datetime import date
 from typing import Optional
-from pydantic import BaseModel, model_validator
+from pydantic import BaseModel, ConfigDict, computed_field
 
 
 class CampaignBase(BaseModel):
+    model_config = ConfigDict(from_attributes=True, extra="ignore")
+
     platform: str
     platform_campaign_id: Optional[str] = None
     name: str
@@ -36,20 +38,18 @@ class CampaignUpdate(CampaignBase):
 
 class Campaign(CampaignBase):
     id: int
-    ctr: Optional[float] = 0.0
-    cpc: Optional[float] = 0.0
 
-    @model_validator(mode="after")
-    def compute_metrics(self):
+    @computed_field
+    @property
+    def ctr(self) -> float:
         impressions = self.impressions or 0
-        clicks = self.clicks or 0
-        spend = self.spend or 0.0
-        self.ctr = round((clicks / impressions) * 100, 2) if impressions > 0 else 0.0
-        self.cpc = round(spend / clicks, 2) if clicks > 0 else 0.0
-        return self
+        return round(((self.clicks or 0) / impressions) * 100, 2) if impressions > 0 else 0.0
 
-    class Config:
-        from_attributes = True
+    @computed_field
+    @property
+    def cpc(self) -> float:
+        clicks = self.clicks or 0
+        return round((self.spend or 0.0) / clicks, 2) if clicks > 0 else 0.0
 
 
 class CampaignHistory(BaseModel):
@@ -1,8 +1,10 @@
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class ProductBase(BaseModel):
+    model_config = ConfigDict(from_attributes=True, extra="ignore")
+
     shopify_id: str
     title: str
     description: Optional[str] = None
@@ -30,6 +32,3 @@ class ProductUpdate(ProductBase):
 
 class Product(ProductBase):
     id: int
-
-    class Config:
-        from_attributes = True
\ No newline at end of file
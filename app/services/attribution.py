@@ -4,13 +4,17 @@ Parses Shopify order data to attribute revenue to ad campaigns.
 """
 
 import logging
+import re
+from collections import defaultdict
 from datetime import datetime, timezone
-from typing import Dict, Optional
-from urllib.parse import urlparse, parse_qs
+from typing import Dict, List, Optional
+from urllib.parse import unquote_plus
 
+from sqlalchemy import case, func, insert, literal, select, union_all, update
+from fastapi import BackgroundTasks
 from sqlalchemy.orm import Session
 
-from app.database import CampaignModel, ActivityLogModel
+from app.database import SessionLocal, CampaignModel, ActivityLogModel
 
 logger = logging.getLogger("autosem.attribution")
 
@@ -28,6 +32,41 @@ PLATFORM_MAP = {
     "email": "klaviyo",
 }
 
+# One pattern for all keywords. Alternatives are tried in PLATFORM_MAP order,
+# so the first keyword found anywhere in the source wins, as with a loop of `in`.
+_PLATFORM_RE = re.compile(
+    "|".join(f".*?({re.escape(keyword)})" for keyword in PLATFORM_MAP), re.S,
+)
+_PLATFORM_GROUPS = tuple(PLATFORM_MAP.values())
+
+_ACTIVE_STATUSES = ("active", "ACTIVE", "live")
+
+_UTM_KEYS = ("utm_source", "utm_medium", "utm_campaign", "utm_content")
+
+
+def _query_utm(url: str) -> Dict:
+    """First non-empty value of each UTM key in a URL's query string."""
+    query = url.partition("?")[2].partition("#")[0]
+    found = {}
+    for pair in query.split("&"):
+        key, _, value = pair.partition("=")
+        if value and key in _UTM_KEYS and key not in found:
+            found[key] = unquote_plus(value)
+    return found
+
+
+def _write_log_rows(log_rows: List[Dict]):
+    """Insert attribution activity logs (runs as a background task after the response)."""
+    db = SessionLocal()
+    try:
+        db.execute(insert(ActivityLogModel), log_rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Failed to log attribution: {e}")
+    finally:
+        db.close()
+
 
 class AttributionService:
     """Attributes Shopify order revenue to the correct ad campaign."""
@@ -35,82 +74,141 @@ class AttributionService:
     def __init__(self, db: Session):
         self.db = db
 
-    def attribute_order(self, order: Dict) -> Dict:
+    def attribute_order(self, order: Dict, background: Optional[BackgroundTasks] = None) -> Dict:
         """Parse a Shopify order and attribute revenue to a campaign.
 
         Returns an attribution result dict with order_id, total_price,
         utm params, matched campaign info, and whether attribution succeeded.
         """
-        order_id = order.get("id", "unknown")
-        total_price = float(order.get("total_price", 0))
-
-        # Extract UTM params
-        utm = self._extract_utm(order)
-
-        # Determine ad platform
-        platform = self._resolve_platform(utm["utm_source"])
-
-        # Match to a campaign
-        campaign = self._match_campaign(utm["utm_campaign"], utm["utm_source"], platform)
-
-        result = {
-            "order_id": order_id,
-            "total_price": total_price,
-            "utm_source": utm["utm_source"],
-            "utm_medium": utm["utm_medium"],
-            "utm_campaign": utm["utm_campaign"],
-            "utm_content": utm["utm_content"],
-            "platform": platform,
-            "campaign_id": None,
-            "campaign_name": None,
-            "attributed": False,
-        }
+        return self.attribute_orders([order], background)[0]
 
-        if campaign and total_price > 0:
-            campaign.total_revenue = (campaign.total_revenue or 0) + total_price
-            campaign.revenue = (campaign.revenue or 0) + total_price
-            campaign.conversions = (campaign.conversions or 0) + 1
-            if campaign.total_spend and campaign.total_spend > 0:
-                campaign.roas = campaign.total_revenue / campaign.total_spend
-            campaign.updated_at = datetime.now(timezone.utc)
-            self.db.commit()
+    def attribute_orders(self, orders: List[Dict],
+                         background: Optional[BackgroundTasks] = None) -> List[Dict]:
+        """Attribute a batch of orders, writing all campaign and log rows in one commit.
 
-            result["campaign_id"] = campaign.id
-            result["campaign_name"] = campaign.name
-            result["attributed"] = True
+        Revenue and conversions are summed per campaign in Python, then applied
+        with one UPDATE per matched campaign and a single bulk activity-log insert.
+        Batches of more than one order load the campaigns table once and match
+        in memory instead of querying per order. With `background`, the
+        activity logs are written after the response instead.
+        """
+        match = self._campaign_lookup() if len(orders) > 1 else self._match_campaign
+        results = []
+        deltas = defaultdict(lambda: [0.0, 0])  # campaign id -> [revenue, conversions]
+        log_rows = []
 
-            self._log(
-                "ORDER_ATTRIBUTED", str(order_id),
-                f"${total_price:.2f} -> '{campaign.name}' "
-                f"(utm_source={utm['utm_source']}, platform={platform})",
-            )
+        for order in orders:
+            order_id = order.get("id", "unknown")
+            total_price = float(order.get("total_price", 0))
+
+            # Extract UTM params
+            utm = self._extract_utm(order)
+
+            # Determine ad platform
+            platform = self._resolve_platform(utm["utm_source"])
+
+            # Match to a campaign
+            campaign = match(utm["utm_campaign"], utm["utm_source"], platform)
+
+            result = {
+                "order_id": order_id,
+                "total_price": total_price,
+                "utm_source": utm["utm_source"],
+                "utm_medium": utm["utm_medium"],
+                "utm_campaign": utm["utm_campaign"],
+                "utm_content": utm["utm_content"],
+                "platform": platform,
+                "campaign_id": None,
+                "campaign_name": None,
+                "attributed": False,
+            }
+
+            if campaign and total_price > 0:
+                delta = deltas[campaign.id]
+                delta[0] += total_price
+                delta[1] += 1
+
+                result["campaign_id"] = campaign.id
+                result["campaign_name"] = campaign.name
+                result["attributed"] = True
+
+                log_rows.append(self._log_row(
+                    "ORDER_ATTRIBUTED", str(order_id),
+                    f"${total_price:.2f} -> '{campaign.name}' "
+                    f"(utm_source={utm['utm_source']}, platform={platform})",
+                ))
+            else:
+                log_rows.append(self._log_row(
+                    "ORDER_UNATTRIBUTED", str(order_id),
+                    f"${total_price:.2f} unattributed "
+                    f"(utm_source={utm['utm_source']}, utm_campaign={utm['utm_campaign']})",
+                ))
+
+            results.append(result)
+
+        if background is not None and log_rows:
+            if deltas:
+                self._write_revenue(deltas)
+            background.add_task(_write_log_rows, log_rows)
         else:
-            self._log(
-                "ORDER_UNATTRIBUTED", str(order_id),
-                f"${total_price:.2f} unattributed "
-                f"(utm_source={utm['utm_source']}, utm_campaign={utm['utm_campaign']})",
-            )
+            self._apply(deltas, log_rows)
+        return results
 
-        return result
+    def _apply(self, deltas: Dict, log_rows: List[Dict]):
+        """Write revenue deltas and activity logs; a failed log insert must not lose revenue."""
+        try:
+            self._update_campaigns(deltas)
+            if log_rows:
+                self.db.execute(insert(ActivityLogModel), log_rows)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            if not deltas:
+                logger.warning(f"Failed to log attribution: {e}")
+                return
+            logger.warning(f"Failed to log attribution, retrying without logs: {e}")
+            self._write_revenue(deltas)
+
+    def _write_revenue(self, deltas: Dict):
+        """Commit revenue deltas on their own; on failure roll back and log, never raise."""
+        try:
+            self._update_campaigns(deltas)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Failed to record attributed revenue: {e}")
+
+    def _update_campaigns(self, deltas: Dict):
+        now = datetime.now(timezone.utc)
+        for campaign_id, (revenue, conversions) in deltas.items():
+            total_revenue = func.coalesce(CampaignModel.total_revenue, 0) + revenue
+            self.db.execute(
+                update(CampaignModel)
+                .where(CampaignModel.id == campaign_id)
+                .values(
+                    total_revenue=total_revenue,
+                    revenue=func.coalesce(CampaignModel.revenue, 0) + revenue,
+                    conversions=func.coalesce(CampaignModel.conversions, 0) + conversions,
+                    roas=case(
+                        (CampaignModel.total_spend > 0, total_revenue / CampaignModel.total_spend),
+                        else_=CampaignModel.roas,
+                    ),
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
 
     def _extract_utm(self, order: Dict) -> Dict:
         """Extract UTM parameters from landing_site, referring_site, and note_attributes."""
-        utm = {
-            "utm_source": "",
-            "utm_medium": "",
-            "utm_campaign": "",
-            "utm_content": "",
-        }
+        utm = dict.fromkeys(_UTM_KEYS, "")
 
         # Parse from landing_site or referring_site URLs
         for url_field in ("landing_site", "referring_site"):
             source_url = order.get(url_field, "") or ""
             if "?" in source_url:
-                parsed = urlparse(source_url)
-                params = parse_qs(parsed.query)
-                for key in utm:
+                for key, value in _query_utm(source_url).items():
                     if not utm[key]:
-                        utm[key] = params.get(key, [""])[0]
+                        utm[key] = value
 
         # Also check note_attributes (Shopify custom attributes on checkout)
         for attr in order.get("note_attributes", []):
@@ -126,50 +224,76 @@ class AttributionService:
         if not utm_source:
             return None
         source_lower = utm_source.lower()
-        for keyword, platform in PLATFORM_MAP.items():
-            if keyword in source_lower:
-                return platform
-        return None
+        platform = PLATFORM_MAP.get(source_lower)
+        if platform:
+            return platform
+        m = _PLATFORM_RE.match(source_lower)
+        return _PLATFORM_GROUPS[m.lastindex - 1] if m else None
 
     def _match_campaign(self, utm_campaign: str, utm_source: str,
                         platform: Optional[str]) -> Optional[CampaignModel]:
-        """Try to match to a CampaignModel, from most to least specific."""
+        """Try to match to a CampaignModel, from most to least specific.
 
-        # 1. Exact match on platform_campaign_id
+        The three stages run as one UNION ALL query ranked by stage:
+        1. exact platform_campaign_id, 2. name ILIKE, 3. most recently
+        updated active campaign on the matched platform.
+        """
+        stages = []
         if utm_campaign:
-            campaign = self.db.query(CampaignModel).filter(
-                CampaignModel.platform_campaign_id == utm_campaign,
-            ).first()
-            if campaign:
-                return campaign
-
-            # 2. Fuzzy match on campaign name
-            campaign = self.db.query(CampaignModel).filter(
-                CampaignModel.name.ilike(f"%{utm_campaign}%"),
-            ).first()
-            if campaign:
-                return campaign
-
-        # 3. Fallback: most recently active campaign on the matched platform
+            stages.append(select(CampaignModel.id, literal(1).label("stage"), CampaignModel.updated_at)
+                          .where(CampaignModel.platform_campaign_id == utm_campaign))
+            stages.append(select(CampaignModel.id, literal(2).label("stage"), CampaignModel.updated_at)
+                          .where(CampaignModel.name.ilike(f"%{utm_campaign}%")))
         if platform:
-            campaign = self.db.query(CampaignModel).filter(
-                CampaignModel.platform == platform,
-                CampaignModel.status.in_(["active", "ACTIVE", "live"]),
-            ).order_by(CampaignModel.updated_at.desc()).first()
-            if campaign:
-                return campaign
+            stages.append(select(CampaignModel.id, literal(3).label("stage"), CampaignModel.updated_at)
+                          .where(CampaignModel.platform == platform,
+                                 CampaignModel.status.in_(_ACTIVE_STATUSES)))
+        if not stages:
+            return None
 
-        return None
+        ranked = union_all(*stages).subquery()
+        return self.db.execute(
+            select(CampaignModel)
+            .join(ranked, CampaignModel.id == ranked.c.id)
+            .order_by(ranked.c.stage, ranked.c.updated_at.desc())
+            .limit(1)
+        ).scalars().first()
 
-    def _log(self, action: str, entity_id: str, details: str):
-        try:
-            log = ActivityLogModel(
-                action=action,
-                entity_type="attribution",
-                entity_id=entity_id,
-                details=details,
-            )
-            self.db.add(log)
-            self.db.commit()
-        except Exception as e:
-            logger.warning(f"Failed to log attribution: {e}")
+    def _campaign_lookup(self):
+        """In-memory equivalent of _match_campaign over one SELECT of all campaigns."""
+        by_recency = sorted(
+            self.db.query(CampaignModel).all(),
+            key=lambda c: c.updated_at or datetime.min, reverse=True,
+        )
+        by_cid, by_platform, names = {}, {}, []
+        for c in by_recency:
+            if c.platform_campaign_id:
+                by_cid.setdefault(c.platform_campaign_id, c)
+            if c.status in _ACTIVE_STATUSES:
+                by_platform.setdefault(c.platform, c)
+            names.append(((c.name or "").lower(), c))
+
+        def match(utm_campaign: str, utm_source: str,
+                  platform: Optional[str]) -> Optional[CampaignModel]:
+            if utm_campaign:
+                campaign = by_cid.get(utm_campaign)
+                if campaign:
+                    return campaign
+                needle = utm_campaign.lower()
+                campaign = next((c for name, c in names if needle in name), None)
+                if campaign:
+                    return campaign
+            if platform:
+                return by_platform.get(platform)
+            return None
+
+        return match
+
+    @staticmethod
+    def _log_row(action: str, entity_id: str, details: str) -> Dict:
+        return {
+            "action": action,
+            "entity_type": "attribution",
+            "entity_id": entity_id,
+            "details": details,
+        }
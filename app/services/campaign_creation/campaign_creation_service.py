@@ -1,8 +1,10 @@
 import logging
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import exists, insert, select
 from sqlalchemy.orm import Session
-from app.crud import product, campaign
-from app.models import Product
+from app.models import Campaign, Product
 from app.schemas.campaign import CampaignCreate
 from app.services.bidding import bidding_engine
 from app.services.google_ads import google_ads_service
@@ -11,6 +13,9 @@ from app.services.creative import creative_engine
 
 logger = logging.getLogger(__name__)
 
+# At most 7 platform campaigns per product (4 Google + 3 Meta), created concurrently
+_platform_pool = ThreadPoolExecutor(max_workers=7, thread_name_prefix="campaign-create")
+
 
 class CampaignCreationService:
     def __init__(self, db: Session):
@@ -18,50 +23,62 @@ class CampaignCreationService:
 
     def create_campaigns_for_product(self, product: Product) -> List[str]:
         """Create all relevant campaigns for a product"""
-        created_campaigns = []
-
-        # Calculate bidding parameters
+        rows = self._campaign_rows_for_product(product)
+        self._insert_campaigns(rows)
+        self.db.commit()
+        return [f"{row['platform']}:{row['platform_campaign_id']}" for row in rows]
+
+    def _campaign_rows_for_product(self, product: Product) -> List[Dict[str, Any]]:
+        """Create the product's campaigns on each ad platform and return their DB rows (not yet inserted)"""
+        # Calculate bidding parameters (this also loads `product` on this thread,
+        # so the worker threads below never trigger a lazy load on the session)
         target_cpa = bidding_engine.calculate_target_cpa(product)
         target_roas = bidding_engine.calculate_target_roas(product)
 
-        # Google Ads campaigns
-        google_campaigns = self._create_google_campaigns_for_product(product, target_cpa, target_roas)
-        created_campaigns.extend(google_campaigns)
-
-        # Meta Ads campaigns
-        meta_campaigns = self._create_meta_campaigns_for_product(product, target_cpa, target_roas)
-        created_campaigns.extend(meta_campaigns)
-
-        return created_campaigns
-
-    def _create_google_campaigns_for_product(self, product: Product, target_cpa: float, target_roas: float) -> List[str]:
-        """Create Google Ads campaigns for a product"""
-        campaigns_created = []
+        jobs = (self._google_campaign_jobs(product, target_cpa, target_roas)
+                + self._meta_campaign_jobs(product, target_cpa, target_roas))
+        # The platform calls are independent blocking HTTP requests; overlap them
+        futures = [_platform_pool.submit(job) for job in jobs]
+
+        # Wait for every job: one failing must not drop the rows of campaigns the
+        # others already created on the platforms
+        rows = []
+        for job, future in zip(jobs, futures):
+            try:
+                row = future.result()
+            except Exception as e:
+                logger.error(f"{job.func.__name__} failed for {product.title}: {e}")
+                continue
+            if row:
+                rows.append(row)
+        return rows
+
+    def _insert_campaigns(self, rows: List[Dict[str, Any]]):
+        """One executemany INSERT for a product's campaigns instead of an ORM add/commit per campaign"""
+        if rows:
+            self.db.execute(insert(Campaign), rows)
+
+    def _google_campaign_jobs(self, product: Product, target_cpa: float,
+                              target_roas: float) -> List[Callable[[], Optional[Dict[str, Any]]]]:
+        """Google Ads campaigns to create for a product"""
+        jobs = []
 
         # Brand campaign (if product has brand terms)
         if product.vendor and product.vendor.lower() not in ['generic', 'unknown']:
-            brand_campaign = self._create_google_brand_campaign(product, target_cpa)
-            if brand_campaign:
-                campaigns_created.append(f"google:{brand_campaign}")
+            jobs.append(partial(self._create_google_brand_campaign, product, target_cpa))
 
         # Shopping campaign
-        shopping_campaign = self._create_google_shopping_campaign(product, target_roas)
-        if shopping_campaign:
-            campaigns_created.append(f"google:{shopping_campaign}")
+        jobs.append(partial(self._create_google_shopping_campaign, product, target_roas))
 
         # Performance Max campaign
-        pmax_campaign = self._create_google_pmax_campaign(product, target_roas)
-        if pmax_campaign:
-            campaigns_created.append(f"google:{pmax_campaign}")
+        jobs.append(partial(self._create_google_pmax_campaign, product, target_roas))
 
         # Non-brand search campaign
-        search_campaign = self._create_google_search_campaign(product, target_cpa)
-        if search_campaign:
-            campaigns_created.append(f"google:{search_campaign}")
+        jobs.append(partial(self._create_google_search_campaign, product, target_cpa))
 
-        return campaigns_created
+        return jobs
 
-    def _create_google_brand_campaign(self, product: Product, target_cpa: float) -> Optional[str]:
+    def _create_google_brand_campaign(self, product: Product, target_cpa: float) -> Optional[Dict[str, Any]]:
         """Create brand protection campaign"""
         campaign_data = {
             'name': f"[BRAND] {product.vendor} - Brand Terms",
@@ -72,23 +89,20 @@ class CampaignCreationService:
         }
 
         campaign_id = google_ads_service.create_campaign(campaign_data)
-        if campaign_id:
-            # Save to database
-            db_campaign = CampaignCreate(
-                platform='google',
-                platform_campaign_id=campaign_id,
-                name=campaign_data['name'],
-                campaign_type='BRAND',
-                product_id=product.id,
-                daily_budget=campaign_data['daily_budget'],
-                target_cpa=target_cpa
-            )
-            campaign.create(self.db, obj_in=db_campaign)
-            logger.info(f"Created Google brand campaign for {product.title}")
-
-        return campaign_id
-
-    def _create_google_shopping_campaign(self, product: Product, target_roas: float) -> Optional[str]:
+        if not campaign_id:
+            return None
+        logger.info(f"Created Google brand campaign for {product.title}")
+        return CampaignCreate(
+            platform='google',
+            platform_campaign_id=campaign_id,
+            name=campaign_data['name'],
+            campaign_type='BRAND',
+            product_id=product.id,
+            daily_budget=campaign_data['daily_budget'],
+            target_cpa=target_cpa
+        ).model_dump()
+
+    def _create_google_shopping_campaign(self, product: Product, target_roas: float) -> Optional[Dict[str, Any]]:
         """Create shopping campaign"""
         campaign_data = {
             'name': f"[SHOPPING] {product.product_type} - {product.vendor}",
@@ -99,22 +113,20 @@ class CampaignCreationService:
         }
 
         campaign_id = google_ads_service.create_campaign(campaign_data)
-        if campaign_id:
-            db_campaign = CampaignCreate(
-                platform='google',
-                platform_campaign_id=campaign_id,
-                name=campaign_data['name'],
-                campaign_type='SHOPPING',
-                product_id=product.id,
-                daily_budget=campaign_data['daily_budget'],
-                target_roas=target_roas
-            )
-            campaign.create(self.db, obj_in=db_campaign)
-            logger.info(f"Created Google shopping campaign for {product.title}")
-
-        return campaign_id
-
-    def _create_google_pmax_campaign(self, product: Product, target_roas: float) -> Optional[str]:
+        if not campaign_id:
+            return None
+        logger.info(f"Created Google shopping campaign for {product.title}")
+        return CampaignCreate(
+            platform='google',
+            platform_campaign_id=campaign_id,
+            name=campaign_data['name'],
+            campaign_type='SHOPPING',
+            product_id=product.id,
+            daily_budget=campaign_data['daily_budget'],
+            target_roas=target_roas
+        ).model_dump()
+
+    def _create_google_pmax_campaign(self, product: Product, target_roas: float) -> Optional[Dict[str, Any]]:
         """Create Performance Max campaign"""
         campaign_data = {
             'name': f"[PMAX] {product.product_type} - Full Catalog",
@@ -125,22 +137,20 @@ class CampaignCreationService:
         }
 
         campaign_id = google_ads_service.create_campaign(campaign_data)
-        if campaign_id:
-            db_campaign = CampaignCreate(
-                platform='google',
-                platform_campaign_id=campaign_id,
-                name=campaign_data['name'],
-                campaign_type='PMAX',
-                product_id=product.id,
-                daily_budget=campaign_data['daily_budget'],
-                target_roas=target_roas
-            )
-            campaign.create(self.db, obj_in=db_campaign)
-            logger.info(f"Created Google PMAX campaign for {product.title}")
-
-        return campaign_id
-
-    def _create_google_search_campaign(self, product: Product, target_cpa: float) -> Optional[str]:
+        if not campaign_id:
+            return None
+        logger.info(f"Created Google PMAX campaign for {product.title}")
+        return CampaignCreate(
+            platform='google',
+            platform_campaign_id=campaign_id,
+            name=campaign_data['name'],
+            campaign_type='PMAX',
+            product_id=product.id,
+            daily_budget=campaign_data['daily_budget'],
+            target_roas=target_roas
+        ).model_dump()
+
+    def _create_google_search_campaign(self, product: Product, target_cpa: float) -> Optional[Dict[str, Any]]:
         """Create non-brand search campaign"""
         campaign_data = {
             'name': f"[SEARCH] {product.product_type} - High Intent",
@@ -151,43 +161,32 @@ class CampaignCreationService:
         }
 
         campaign_id = google_ads_service.create_campaign(campaign_data)
-        if campaign_id:
-            db_campaign = CampaignCreate(
-                platform='google',
-                platform_campaign_id=campaign_id,
-                name=campaign_data['name'],
-                campaign_type='SEARCH',
-                product_id=product.id,
-                daily_budget=campaign_data['daily_budget'],
-                target_cpa=target_cpa
-            )
-            campaign.create(self.db, obj_in=db_campaign)
-            logger.info(f"Created Google search campaign for {product.title}")
-
-        return campaign_id
-
-    def _create_meta_campaigns_for_product(self, product: Product, target_cpa: float, target_roas: float) -> List[str]:
-        """Create Meta Ads campaigns for a product"""
-        campaigns_created = []
-
-        # Prospecting campaign
-        prospecting_campaign = self._create_meta_prospecting_campaign(product, target_cpa)
-        if prospecting_campaign:
-            campaigns_created.append(f"meta:{prospecting_campaign}")
-
-        # Retargeting campaign
-        retargeting_campaign = self._create_meta_retargeting_campaign(product, target_cpa)
-        if retargeting_campaign:
-            campaigns_created.append(f"meta:{retargeting_campaign}")
-
-        # DPA campaign
-        dpa_campaign = self._create_meta_dpa_campaign(product, target_roas)
-        if dpa_campaign:
-            campaigns_created.append(f"meta:{dpa_campaign}")
-
-        return campaigns_created
-
-    def _create_meta_prospecting_campaign(self, product: Product, target_cpa: float) -> Optional[str]:
+        if not campaign_id:
+            return None
+        logger.info(f"Created Google search campaign for {product.title}")
+        return CampaignCreate(
+            platform='google',
+            platform_campaign_id=campaign_id,
+            name=campaign_data['name'],
+            campaign_type='SEARCH',
+            product_id=product.id,
+            daily_budget=campaign_data['daily_budget'],
+            target_cpa=target_cpa
+        ).model_dump()
+
+    def _meta_campaign_jobs(self, product: Product, target_cpa: float,
+                            target_roas: float) -> List[Callable[[], Optional[Dict[str, Any]]]]:
+        """Meta Ads campaigns to create for a product"""
+        return [
+            # Prospecting campaign
+            partial(self._create_meta_prospecting_campaign, product, target_cpa),
+            # Retargeting campaign
+            partial(self._create_meta_retargeting_campaign, product, target_cpa),
+            # DPA campaign
+            partial(self._create_meta_dpa_campaign, product, target_roas),
+        ]
+
+    def _create_meta_prospecting_campaign(self, product: Product, target_cpa: float) -> Optional[Dict[str, Any]]:
         """Create prospecting campaign with broad interest targeting"""
         campaign_data = {
             'name': f"[PROSPECTING] {product.product_type} - Broad Interest",
@@ -197,22 +196,20 @@ class CampaignCreationService:
         }
 
         campaign_id = meta_ads_service.create_campaign(campaign_data)
-        if campaign_id:
-            db_campaign = CampaignCreate(
-                platform='meta',
-                platform_campaign_id=campaign_id,
-                name=campaign_data['name'],
-                campaign_type='PROSPECTING',
-                product_id=product.id,
-                daily_budget=campaign_data['daily_budget'],
-                target_cpa=target_cpa
-            )
-            campaign.create(self.db, obj_in=db_campaign)
-            logger.info(f"Created Meta prospecting campaign for {product.title}")
-
-        return campaign_id
-
-    def _create_meta_retargeting_campaign(self, product: Product, target_cpa: float) -> Optional[str]:
+        if not campaign_id:
+            return None
+        logger.info(f"Created Meta prospecting campaign for {product.title}")
+        return CampaignCreate(
+            platform='meta',
+            platform_campaign_id=campaign_id,
+            name=campaign_data['name'],
+            campaign_type='PROSPECTING',
+            product_id=product.id,
+            daily_budget=campaign_data['daily_budget'],
+            target_cpa=target_cpa
+        ).model_dump()
+
+    def _create_meta_retargeting_campaign(self, product: Product, target_cpa: float) -> Optional[Dict[str, Any]]:
         """Create retargeting campaign"""
         campaign_data = {
             'name': f"[RETARGETING] {product.product_type} - Website Visitors",
@@ -222,22 +219,20 @@ class CampaignCreationService:
         }
 
         campaign_id = meta_ads_service.create_campaign(campaign_data)
-        if campaign_id:
-            db_campaign = CampaignCreate(
-                platform='meta',
-                platform_campaign_id=campaign_id,
-                name=campaign_data['name'],
-                campaign_type='RETARGETING',
-                product_id=product.id,
-                daily_budget=campaign_data['daily_budget'],
-                target_cpa=target_cpa
-            )
-            campaign.create(self.db, obj_in=db_campaign)
-            logger.info(f"Created Meta retargeting campaign for {product.title}")
-
-        return campaign_id
-
-    def _create_meta_dpa_campaign(self, product: Product, target_roas: float) -> Optional[str]:
+        if not campaign_id:
+            return None
+        logger.info(f"Created Meta retargeting campaign for {product.title}")
+        return CampaignCreate(
+            platform='meta',
+            platform_campaign_id=campaign_id,
+            name=campaign_data['name'],
+            campaign_type='RETARGETING',
+            product_id=product.id,
+            daily_budget=campaign_data['daily_budget'],
+            target_cpa=target_cpa
+        ).model_dump()
+
+    def _create_meta_dpa_campaign(self, product: Product, target_roas: float) -> Optional[Dict[str, Any]]:
         """Create Dynamic Product Ads campaign"""
         campaign_data = {
             'name': f"[DPA] {product.product_type} - Dynamic Product Ads",
@@ -247,35 +242,36 @@ class CampaignCreationService:
         }
 
         campaign_id = meta_ads_service.create_campaign(campaign_data)
-        if campaign_id:
-            db_campaign = CampaignCreate(
-                platform='meta',
-                platform_campaign_id=campaign_id,
-                name=campaign_data['name'],
-                campaign_type='DPA',
-                product_id=product.id,
-                daily_budget=campaign_data['daily_budget'],
-                target_roas=target_roas
-            )
-            campaign.create(self.db, obj_in=db_campaign)
-            logger.info(f"Created Meta DPA campaign for {product.title}")
-
-        return campaign_id
+        if not campaign_id:
+            return None
+        logger.info(f"Created Meta DPA campaign for {product.title}")
+        return CampaignCreate(
+            platform='meta',
+            platform_campaign_id=campaign_id,
+            name=campaign_data['name'],
+            campaign_type='DPA',
+            product_id=product.id,
+            daily_budget=campaign_data['daily_budget'],
+            target_roas=target_roas
+        ).model_dump()
 
     def create_all_campaigns_for_new_products(self) -> Dict[str, int]:
         """Create campaigns for all products that don't have campaigns yet"""
-        products = product.get_available_products(self.db)
+        # Available products with no campaign yet; the database does the anti-join
+        products = self.db.scalars(select(Product).where(
+            Product.is_available == True,
+            ~exists().where(Campaign.product_id == Product.id),
+        )).all()
         stats = {'processed': 0, 'campaigns_created': 0}
 
         for prod in products:
-            # Check if product already has campaigns
-            existing_campaigns = campaign.get_multi(self.db, skip=0, limit=1000)
-            product_campaigns = [c for c in existing_campaigns if c.product_id == prod.id]
-
-            if not product_campaigns:
-                created = self.create_campaigns_for_product(prod)
-                stats['campaigns_created'] += len(created)
-                stats['processed'] += 1
+            rows = self._campaign_rows_for_product(prod)
+            # Record this product's campaigns as soon as they exist on the ad platforms,
+            # so a later failure can't roll them back and get them created twice
+            self._insert_campaigns(rows)
+            self.db.commit()
+            stats['campaigns_created'] += len(rows)
+            stats['processed'] += 1
 
         logger.info(f"Campaign creation complete: {stats}")
         return stats
@@ -3,14 +3,109 @@ Campaign Generator Service
 Automatically creates Google Ads and Meta campaigns from Shopify products.
 """
 import os
+import re
+import time
 import logging
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from sqlalchemy import exists, insert, or_, select
 from sqlalchemy.orm import Session
 from app.database import ProductModel, CampaignModel, SettingsModel
 
 logger = logging.getLogger("autosem.campaign_generator")
 
+STORE_URL = "https://court-sportswear.com"
+
+SETTING_DEFAULTS = {
+    "daily_spend_limit": 200.0,
+    "monthly_spend_limit": 5000.0,
+    "min_roas_threshold": 1.5,
+    "emergency_pause_loss": 500.0,
+}
+# One pass over the title. Alternatives are tried in priority order
+# (headwear, apparel, bottoms), each matching a whole word anywhere in the title.
+_CATEGORY_RE = re.compile(
+    r".*?\b(?P<headwear>hats?|caps?|visors?)\b"
+    r"|.*?\b(?P<apparel>shirts?|tees?|polos?|tops?)\b"
+    r"|.*?\b(?P<bottoms>shorts|skirts?|skorts?)\b"
+)
+
+
+def _product_category(title: str) -> str:
+    """Classify a product title as headwear, apparel, bottoms or gear."""
+    m = _CATEGORY_RE.match(title.lower())
+    return m.lastgroup if m else "gear"
+
+
+def _category_copy(category: str, benefit: str) -> Dict[str, str]:
+    return {
+        "benefit": benefit,
+        "headline_3": f"Premium Tennis {category.title()}",
+        "description_2": f"Premium tennis {category} designed for players who demand style and performance. "
+                         "Shop now at Court Sportswear.",
+        "meta_pitch": f"Premium tennis {category} for players who demand the best. 🎾",
+    }
+
+
+# Ad copy that depends only on the category, built once at import
+_CATEGORY_COPY = {
+    "headwear": _category_copy("headwear", "Stay cool on the court"),
+    "apparel": _category_copy("apparel", "Look sharp, play sharper"),
+    "bottoms": _category_copy("bottoms", "Move freely on every shot"),
+    "gear": _category_copy("gear", "Elevate your tennis game"),
+}
+
+
+# Keyword seeds per category, each ending with the store-wide seeds and already deduped
+_STORE_KEYWORDS = ("court sportswear", "court tennis")
+_CATEGORY_KEYWORDS = {
+    category: tuple(dict.fromkeys(seeds + _STORE_KEYWORDS))
+    for category, seeds in {
+        "headwear": ("tennis hat", "tennis cap", "tennis visor",
+                     "tennis headwear", "court hat", "tennis sun hat"),
+        "apparel": ("tennis shirt", "tennis polo", "tennis top",
+                    "tennis tee", "court shirt", "tennis apparel"),
+        "bottoms": ("tennis shorts", "tennis skirt", "tennis skort",
+                    "court shorts", "tennis bottoms"),
+        "gear": ("tennis gear", "tennis accessories", "court sportswear", "tennis outfit"),
+    }.items()
+}
+
+
+def _product_url(product: ProductModel) -> str:
+    return f"{STORE_URL}/products/{product.handle}" if product.handle else STORE_URL
+
+
+PRODUCT_BATCH_SIZE = 500
+INSERT_BATCH_SIZE = 1000
+# Targeting presets; sequences are tuples so the shallow copies handed out never share mutable state
+_BASE_TARGETING = {
+    "age_range": "25-55",
+    "gender": "all",
+    "countries": ("US",),
+    "interests": ("tennis", "racquet sports", "athletic apparel", "sports fashion"),
+}
+_GOOGLE_TARGETING = {
+    **_BASE_TARGETING,
+    "match_type": "phrase",
+    "network": "search",
+    "bid_strategy": "target_roas",
+}
+_META_TARGETING = {
+    **_BASE_TARGETING,
+    "placements": ("facebook_feed", "instagram_feed", "instagram_stories"),
+    "optimization_goal": "CONVERSIONS",
+    "pixel_event": "Purchase",
+    "lookalike_source": "website_visitors",
+}
+
+# Product fields used by the generator (id, title, price, handle)
+_PRODUCT_COLUMNS = (ProductModel.id, ProductModel.title, ProductModel.price, ProductModel.handle)
+
+# Settings rarely change; skip the SELECT for SETTINGS_CACHE_TTL seconds
+SETTINGS_CACHE_TTL = 60
+_settings_cache = {"loaded_at": 0.0, "settings": None}
+
 
 class CampaignGenerator:
     """Generates ad campaigns from product catalog."""
@@ -20,57 +115,92 @@ class CampaignGenerator:
         self.settings = self._load_settings()
 
     def _load_settings(self) -> dict:
-        """Load settings from SettingsModel key/value store."""
-        def _get(key, default):
-            row = self.db.query(SettingsModel).filter(SettingsModel.key == key).first()
-            return float(row.value) if row and row.value else default
-        return {
-            "daily_spend_limit": _get("daily_spend_limit", 200.0),
-            "monthly_spend_limit": _get("monthly_spend_limit", 5000.0),
-            "min_roas_threshold": _get("min_roas_threshold", 1.5),
-            "emergency_pause_loss": _get("emergency_pause_loss", 500.0),
+        """Load settings from SettingsModel key/value store (one query, cached for SETTINGS_CACHE_TTL)."""
+        if _settings_cache["settings"] and time.monotonic() - _settings_cache["loaded_at"] < SETTINGS_CACHE_TTL:
+            return _settings_cache["settings"]
+        rows = dict(self.db.query(SettingsModel.key, SettingsModel.value).filter(
+            SettingsModel.key.in_(SETTING_DEFAULTS)
+        ).all())
+        settings = {
+            key: float(rows[key]) if rows.get(key) else default
+            for key, default in SETTING_DEFAULTS.items()
         }
+        _settings_cache.update(loaded_at=time.monotonic(), settings=settings)
+        return settings
 
     def generate_campaigns(self, platform: str = "both") -> List[Dict]:
-        products = self.db.query(ProductModel).filter(
-            ProductModel.status == "active"
-        ).all()
-
-        if not products:
-            logger.warning("No active products found for campaign generation")
-            return []
-
-        existing_campaigns = self.db.query(CampaignModel).all()
-        existing_product_platforms = {
-            (c.product_id, c.platform) for c in existing_campaigns
-        }
-
         platforms = []
         if platform in ("google", "both"):
             platforms.append("google")
         if platform in ("meta", "both"):
             platforms.append("meta")
+        if not platforms:
+            return []
 
-        created = []
-        for product in products:
-            for plat in platforms:
-                if (product.id, plat) in existing_product_platforms:
-                    continue
+        # Per platform, whether the product still lacks a campaign there; the database
+        # does the anti-join, and fully covered products never leave it.
+        missing = {
+            plat: ~exists().where(CampaignModel.product_id == ProductModel.id,
+                                  CampaignModel.platform == plat)
+            for plat in platforms
+        }
+
+        # Only the columns campaign generation reads, streamed in batches rather than
+        # loaded up front; unpriced products cannot get a budget and are left out here
+        products = self.db.execute(
+            select(*_PRODUCT_COLUMNS, *(cond.label(plat) for plat, cond in missing.items()))
+            .where(ProductModel.is_available == True, ProductModel.price > 0, or_(*missing.values())),
+            execution_options={"yield_per": PRODUCT_BATCH_SIZE},
+        )
 
-                campaign = self._create_campaign_for_product(product, plat)
-                if campaign:
-                    created.append(campaign)
+        # The whole run is one transaction. Campaign rows are inserted every
+        # INSERT_BATCH_SIZE rows as one executemany (no ORM unit of work); RETURNING
+        # gives the new ids. Nothing is committed unless every row was written.
+        # One timestamp for the whole run, shared by every row it creates.
+        created, pending = [], []
+        product_count = 0
+        now = datetime.utcnow()
+        try:
+            for product in products:
+                product_count += 1
+                category = _product_category(product.title or "")
+                for plat in platforms:
+                    if not product._mapping[plat]:
+                        continue
+
+                    pending.append(self._create_campaign_for_product(product, plat, now, category))
+                    if len(pending) >= INSERT_BATCH_SIZE:
+                        created.extend(self._insert_campaigns(pending))
+                        pending = []
+            created.extend(self._insert_campaigns(pending))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        if not product_count:
+            logger.warning("No active products without campaigns found for campaign generation")
+            return []
 
         logger.info(f"Generated {len(created)} new campaigns")
         return created
 
-    def _create_campaign_for_product(self, product: ProductModel, platform: str) -> Optional[Dict]:
-        product_price = product.price or 0
-        if product_price <= 0:
-            logger.warning(f"Skipping product {product.id} - no price set")
-            return None
-
-        estimated_margin = product_price * 0.45
+    def _insert_campaigns(self, pending: List[Tuple[Dict, Dict]]) -> List[Dict]:
+        """Insert a batch of campaign rows in one executemany and fill in the new ids."""
+        if not pending:
+            return []
+        ids = self.db.execute(
+            insert(CampaignModel).returning(CampaignModel.id, sort_by_parameter_order=True),
+            [row for row, _ in pending],
+        ).scalars().all()
+        for campaign_id, (_, result) in zip(ids, pending):
+            result["id"] = campaign_id
+        return [result for _, result in pending]
+
+    def _create_campaign_for_product(self, product: ProductModel, platform: str, now: datetime,
+                                     category: Optional[str] = None) -> Tuple[Dict, Dict]:
+        """Build (campaigns table row, API result dict) for one product/platform; the caller inserts."""
+        estimated_margin = product.price * 0.45
         daily_budget = round(estimated_margin / self.settings["min_roas_threshold"], 2)
         daily_budget = min(daily_budget, 25.0)
         daily_budget = max(daily_budget, 5.0)
@@ -78,35 +208,31 @@ class CampaignGenerator:
         title_short = (product.title or "Product")[:50]
         campaign_name = f"AutoSEM - {title_short} - {platform.title()}"
 
-        ad_copy = self._generate_ad_copy(product, platform)
-        keywords = self._generate_keywords(product) if platform == "google" else []
+        ad_copy = self._generate_ad_copy(product, platform, category)
+        keywords = self._generate_keywords(product, category) if platform == "google" else []
         targeting = self._generate_targeting(product, platform)
 
-        campaign = CampaignModel(
-            product_id=product.id,
-            platform=platform,
-            campaign_name=campaign_name,
-            status="draft",
-            daily_budget=daily_budget,
-            total_spend=0.0,
-            total_revenue=0.0,
-            roas=0.0,
-            impressions=0,
-            clicks=0,
-            conversions=0,
-            ad_copy=ad_copy.get("headline", ""),
-            keywords=", ".join(keywords) if keywords else None,
-            targeting=str(targeting),
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
-        )
-
-        self.db.add(campaign)
-        self.db.commit()
-        self.db.refresh(campaign)
+        row = {
+            "product_id": product.id,
+            "platform": platform,
+            "name": campaign_name,
+            "status": "draft",
+            "daily_budget": daily_budget,
+            "total_spend": 0.0,
+            "total_revenue": 0.0,
+            "roas": 0.0,
+            "impressions": 0,
+            "clicks": 0,
+            "conversions": 0,
+            "headlines": ad_copy.get("headline", ""),
+            "keywords": ", ".join(keywords) if keywords else None,
+            "targeting": targeting,
+            "created_at": now,
+            "updated_at": now,
+        }
 
         result = {
-            "id": campaign.id,
+            "id": None,  # assigned by the caller's batch insert
             "product_id": product.id,
             "product_title": product.title,
             "platform": platform,
@@ -119,103 +245,44 @@ class CampaignGenerator:
         }
 
         logger.info(f"Created campaign: {campaign_name}")
-        return result
+        return row, result
 
-    def _generate_ad_copy(self, product: ProductModel, platform: str) -> Dict:
+    def _generate_ad_copy(self, product: ProductModel, platform: str,
+                          category: Optional[str] = None) -> Dict:
         title = product.title or "Tennis Apparel"
-        
-        is_hat = any(w in title.lower() for w in ["hat", "cap", "visor"])
-        is_shirt = any(w in title.lower() for w in ["shirt", "tee", "polo", "top"])
-        is_shorts = any(w in title.lower() for w in ["shorts", "skirt", "skort"])
-
-        if is_hat:
-            category = "headwear"
-            benefit = "Stay cool on the court"
-        elif is_shirt:
-            category = "apparel"
-            benefit = "Look sharp, play sharper"
-        elif is_shorts:
-            category = "bottoms"
-            benefit = "Move freely on every shot"
-        else:
-            category = "gear"
-            benefit = "Elevate your tennis game"
-
+        copy = _CATEGORY_COPY[category or _product_category(title)]
         price_text = f"${product.price:.0f}" if product.price else ""
 
         if platform == "google":
             return {
                 "headline": f"{title} | Court Sportswear",
-                "headline_2": benefit,
-                "headline_3": f"Premium Tennis {category.title()}",
-                "description": f"Shop {title} from Court Sportswear. {benefit}. Free shipping on orders $50+. {price_text}",
-                "description_2": f"Premium tennis {category} designed for players who demand style and performance. Shop now at Court Sportswear.",
+                "headline_2": copy["benefit"],
+                "headline_3": copy["headline_3"],
+                "description": f"Shop {title} from Court Sportswear. {copy['benefit']}. Free shipping on orders $50+. {price_text}",
+                "description_2": copy["description_2"],
                 "display_url": "court-sportswear.com",
-                "final_url": product.url or "https://court-sportswear.com",
+                "final_url": _product_url(product),
             }
         else:
             return {
-                "headline": f"{title}",
-                "primary_text": f"{benefit} with {title} from Court Sportswear. Premium tennis {category} for players who demand the best. 🎾",
+                "headline": title,
+                "primary_text": f"{copy['benefit']} with {title} from Court Sportswear. {copy['meta_pitch']}",
                 "description": f"Shop now - {price_text}" if price_text else "Shop the collection",
                 "cta": "SHOP_NOW",
-                "link": product.url or "https://court-sportswear.com",
+                "link": _product_url(product),
             }
 
-    def _generate_keywords(self, product: ProductModel) -> List[str]:
+    def _generate_keywords(self, product: ProductModel, category: Optional[str] = None) -> List[str]:
         title = (product.title or "").lower()
-        keywords = []
-
-        if any(w in title for w in ["hat", "cap", "visor"]):
-            keywords.extend([
-                "tennis hat", "tennis cap", "tennis visor",
-                "tennis headwear", "court hat", "tennis sun hat",
-            ])
-        elif any(w in title for w in ["shirt", "tee", "polo", "top"]):
-            keywords.extend([
-                "tennis shirt", "tennis polo", "tennis top",
-                "tennis tee", "court shirt", "tennis apparel",
-            ])
-        elif any(w in title for w in ["shorts", "skirt", "skort"]):
-            keywords.extend([
-                "tennis shorts", "tennis skirt", "tennis skort",
-                "court shorts", "tennis bottoms",
-            ])
-        else:
-            keywords.extend([
-                "tennis gear", "tennis accessories",
-                "court sportswear", "tennis outfit",
-            ])
-
-        keywords.extend(["court sportswear", "court tennis"])
+        keywords = list(_CATEGORY_KEYWORDS[category or _product_category(title)])
 
         title_words = [w for w in title.split() if len(w) > 3 and w not in ("with", "from", "this", "that")]
-        for word in title_words[:5]:
-            keywords.append(f"tennis {word}")
+        keywords.extend([f"tennis {word}" for word in title_words[:5]])
 
-        return list(set(keywords))
+        # Order-preserving dedupe so the stored keyword string is deterministic
+        return list(dict.fromkeys(keywords))
 
     def _generate_targeting(self, product: ProductModel, platform: str) -> Dict:
-        base_targeting = {
-            "age_range": "25-55",
-            "gender": "all",
-            "countries": ["US"],
-            "interests": ["tennis", "racquet sports", "athletic apparel", "sports fashion"],
-        }
-
         if platform == "google":
-            base_targeting.update({
-                "match_type": "phrase",
-                "network": "search",
-                "bid_strategy": "target_roas",
-                "target_roas": self.settings["min_roas_threshold"],
-            })
-        else:
-            base_targeting.update({
-                "placements": ["facebook_feed", "instagram_feed", "instagram_stories"],
-                "optimization_goal": "CONVERSIONS",
-                "pixel_event": "Purchase",
-                "lookalike_source": "website_visitors",
-            })
-
-        return base_targeting
+            return {**_GOOGLE_TARGETING, "target_roas": self.settings["min_roas_threshold"]}
+        return dict(_META_TARGETING)
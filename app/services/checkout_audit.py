@@ -9,31 +9,153 @@ Key question: 509 ad clicks, 0 purchases — where are visitors dropping off?
 """
 
 import logging
+import re
+import time
 from collections import Counter, defaultdict
 from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Optional
-from urllib.parse import urlparse, parse_qs
+from functools import lru_cache
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote_plus
 
 logger = logging.getLogger("autosem.checkout_audit")
 
+# Only the checkout fields the audit reads; line_items and addresses dominate the payload
+CHECKOUT_FIELDS = (
+    "id,created_at,total_price,currency,line_items,email,landing_site,referring_site,"
+    "gateway,payment_url,shipping_address,billing_address,abandoned_checkout_url,customer"
+)
+
+_CLICK_ID_KEYS = ("fbclid", "gclid", "ttclid")
+_CHECKOUT_STEPS = ("contact_info", "shipping", "payment", "unknown")
+_TRAFFIC_SOURCES = ("meta", "tiktok", "google", "organic", "direct", "other")
+
+# Traffic-source markers, one alternative per source in priority order (meta, tiktok,
+# google) so a URL carrying several markers still resolves the same way.
+_SOURCE_MARKER_RE = re.compile(
+    r".*?(?P<meta>utm_source=(?:meta|facebook)|fbclid)"
+    r"|.*?(?P<tiktok>utm_source=tiktok|ttclid)"
+    r"|.*?(?P<google>utm_source=google|gclid)",
+    re.IGNORECASE | re.DOTALL,
+)
+_REFERRER_RE = re.compile(
+    r".*?(?P<meta>facebook\.com|instagram\.com)"
+    r"|.*?(?P<tiktok>tiktok\.com)"
+    r"|.*?(?P<google>google)",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+# Reports are rebuilt at most once per REPORT_CACHE_TTL seconds per (shop, kind, window);
+# dashboards poll them and each build costs two Shopify round-trips.
+REPORT_CACHE_TTL = 60
+_REPORT_CACHE: Dict[tuple, Tuple[float, Dict]] = {}
+
+# Recommendation templates; placeholders are filled with str.format
+_REC_NO_CART_ACTIVITY = ("CRITICAL: Zero abandoned checkouts AND zero orders — visitors are NOT adding to cart. "
+                         "Focus on product page CRO: reviews, trust signals, compelling CTAs.")
+_REC_HEALTHY_CHECKOUT = "No abandoned checkouts found — checkout completion rate appears healthy."
+_REC_FOUND = "Found {total} abandoned checkouts worth ${value:.2f} in the last 30 days."
+_REC_UNKNOWN = ("HIGH: {count}/{total} abandoned before entering email — "
+                "product pages or cart experience is losing visitors. "
+                "Add trust signals, reviews, and urgency elements.")
+_REC_CONTACT = ("MEDIUM: {count}/{total} abandoned at contact info step — "
+                "consider guest checkout, simpler forms, or email-only first step.")
+_REC_SHIPPING = ("MEDIUM: {count}/{total} abandoned at shipping step — "
+                 "shipping cost surprise? Show free shipping earlier. "
+                 "Consider showing estimated delivery time.")
+_REC_PAYMENT = ("LOW: {count}/{total} abandoned at payment step — "
+                "add more payment options (Apple Pay, Google Pay, Shop Pay). "
+                "Ensure SSL trust badges are visible.")
+_REC_META = ("Meta ads drove {count} abandoned checkouts — "
+             "visitors ARE reaching the store from ads but not converting. "
+             "This confirms the ad targeting is working, focus on CRO.")
+_REC_RECOVERY_EMAILS = ("ACTION: Enable abandoned cart recovery emails via Klaviyo. "
+                        "Use GET /shopify/cart-recovery to get recovery URLs for the last 48h.")
+_REC_REVENUE = ("REVENUE OPPORTUNITY: ${value:.2f} in abandoned carts. "
+                "With a 10-15% recovery rate, that's ${recoverable:.2f} recoverable.")
+RECOVERY_RATE = 0.125  # midpoint of the 10-15% quoted in _REC_REVENUE
+
+# Checkouts from the same ad share landing/referring URLs, so the per-URL parsing
+# below is memoized. Bounded: click IDs make many URLs unique.
+URL_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def _source_for(landing_site: str, referring_site: str) -> str:
+    m = _SOURCE_MARKER_RE.match(landing_site + " " + referring_site)
+    if m:
+        return m.lastgroup
+    if referring_site:
+        m = _REFERRER_RE.match(referring_site)
+        return m.lastgroup if m else "organic"
+    return "direct"
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def _utm_items(url: str) -> Tuple[Tuple[str, str], ...]:
+    """(key, value) pairs for the UTM and click-ID parameters of a URL, first non-empty value per key."""
+    if not url or "?" not in url:
+        return ()
+    # Direct scan of the query string
+    query = url.partition("?")[2].partition("#")[0]
+    found = {}
+    for pair in query.split("&"):
+        key, _, value = pair.partition("=")
+        if value and (key.startswith("utm_") or key in _CLICK_ID_KEYS) and key not in found:
+            found[key] = unquote_plus(value)
+    return tuple(found.items())
+
+
+def _dated(checkouts: List[Dict]) -> List[Tuple[datetime, Dict]]:
+    """Parse each checkout's created_at once, dropping checkouts without a valid one.
+
+    Shopify's trailing "Z" is accepted natively by fromisoformat on Python 3.11+.
+    """
+    dated = []
+    for co in checkouts:
+        created = co.get("created_at")
+        if not created:
+            continue
+        try:
+            dated.append((datetime.fromisoformat(created), co))
+        except (ValueError, TypeError):
+            continue
+    return dated
+
 
 class CheckoutAuditor:
     """Analyzes Shopify abandoned checkouts and orders."""
 
-    def __init__(self, shopify_api_func):
+    def __init__(self, shopify_api_func, shop: str = ""):
         """
         Args:
             shopify_api_func: The _api(method, endpoint, **kwargs) function
                               from shopify.py for making authenticated requests.
+            shop: Store domain the API function talks to; keys the report cache.
         """
         self._api = shopify_api_func
+        self._shop = shop
+
+    def _cached(self, key: tuple, loader, refresh: bool = False) -> Dict:
+        """Serve a report built in the last REPORT_CACHE_TTL seconds for this shop.
+
+        Cached reports are shared between callers and must not be mutated.
+        """
+        key = (self._shop,) + key
+        hit = _REPORT_CACHE.get(key)
+        if hit and not refresh and time.monotonic() - hit[0] < REPORT_CACHE_TTL:
+            return hit[1]
+        value = loader()
+        _REPORT_CACHE[key] = (time.monotonic(), value)
+        return value
 
     def get_abandoned_checkouts(self, limit: int = 250) -> Dict:
         """Fetch abandoned checkouts from Shopify.
 
         Shopify keeps abandoned checkouts for 3 months.
         """
-        data = self._api("GET", f"checkouts.json?limit={limit}")
+        data = self._api("GET", f"checkouts.json?limit={limit}&fields={CHECKOUT_FIELDS}")
         checkouts = data.get("checkouts", [])
         return {
             "count": len(checkouts),
@@ -55,59 +177,94 @@ class CheckoutAuditor:
             "orders": orders,
         }
 
-    def analyze_abandonment(self, checkouts: List[Dict]) -> Dict:
-        """Analyze each abandoned checkout for actionable insights."""
-        product_counts = Counter()
-        step_counts = {"contact_info": 0, "shipping": 0, "payment": 0, "unknown": 0}
-        utm_counts = {"meta": 0, "tiktok": 0, "google": 0, "organic": 0, "direct": 0, "other": 0}
-        total_value = 0.0
-        analyzed = []
+    def analyze_abandonment(self, checkouts: List[Dict], include_detail: bool = True) -> Dict:
+        """Analyze each abandoned checkout for actionable insights.
 
-        for co in checkouts:
-            cart_value = float(co.get("total_price", 0) or 0)
-            total_value += cart_value
-            line_items = co.get("line_items", []) or []
+        With include_detail=False only the aggregates are computed and "checkouts" is empty.
+        """
+        analyzed = [self._analyze_checkout(co, include_detail) for co in checkouts]
+        return self._summarize(analyzed, include_detail)
+
+    def analyze_abandonment_multi(self, dated_checkouts: List[Tuple[datetime, Dict]],
+                                  cutoffs: List[datetime],
+                                  include_detail: Optional[List[bool]] = None) -> List[Dict]:
+        """Analyze checkouts for several time windows in one pass.
+
+        Each checkout newer than the widest cutoff is analyzed once; the per-window
+        results only re-count the already analyzed rows. Returns one analysis per cutoff.
+        include_detail (one flag per cutoff, default all True) says which windows need
+        the per-checkout rows; checkouts outside those windows are only aggregated.
+        """
+        if include_detail is None:
+            include_detail = [True] * len(cutoffs)
+        oldest = min(cutoffs)
+        detail_cutoffs = [c for c, detail in zip(cutoffs, include_detail) if detail]
+        detail_from = min(detail_cutoffs) if detail_cutoffs else None
+
+        analyzed = [
+            (dt, self._analyze_checkout(co, detail_from is not None and dt >= detail_from))
+            for dt, co in dated_checkouts if dt >= oldest
+        ]
+        return [
+            self._summarize([row for dt, row in analyzed if dt >= cutoff], detail)
+            for cutoff, detail in zip(cutoffs, include_detail)
+        ]
 
-            # Products in cart
-            products = []
-            for item in line_items:
-                title = item.get("title", "Unknown")
-                product_counts[title] += 1
-                products.append({
-                    "title": title,
-                    "variant_title": item.get("variant_title", ""),
-                    "quantity": item.get("quantity", 1),
-                    "price": item.get("price", "0.00"),
-                    "product_id": item.get("product_id"),
-                })
+    def _analyze_checkout(self, co: Dict, include_detail: bool = True) -> Dict:
+        """Per-checkout breakdown: cart contents, step reached, traffic source.
 
-            # Determine checkout step reached
-            step = self._determine_step(co)
-            step_counts[step] += 1
+        Without detail, only the fields _summarize counts are filled in.
+        """
+        line_items = co.get("line_items", []) or []
+        landing = co.get("landing_site", "") or ""
+        referring = co.get("referring_site", "") or ""
 
-            # UTM attribution
-            landing = co.get("landing_site", "") or ""
-            referring = co.get("referring_site", "") or ""
-            source = self._classify_source(landing, referring)
-            utm_counts[source] += 1
+        if not include_detail:
+            return {
+                "cart_value": float(co.get("total_price", 0) or 0),
+                "products": [{"title": item.get("title", "Unknown")} for item in line_items],
+                "step_reached": self._determine_step(co),
+                "source": self._classify_source(landing, referring),
+            }
 
-            # Extract UTM params
-            utm_params = self._extract_utm(landing)
+        # Products in cart
+        products = [
+            {
+                "title": item.get("title", "Unknown"),
+                "variant_title": item.get("variant_title", ""),
+                "quantity": item.get("quantity", 1),
+                "price": item.get("price", "0.00"),
+                "product_id": item.get("product_id"),
+            }
+            for item in line_items
+        ]
 
-            analyzed.append({
-                "checkout_id": co.get("id"),
-                "created_at": co.get("created_at"),
-                "cart_value": cart_value,
-                "currency": co.get("currency", "USD"),
-                "products": products,
-                "step_reached": step,
-                "email": co.get("email", ""),
-                "landing_site": landing[:200] if landing else "",
-                "referring_site": referring[:200] if referring else "",
-                "source": source,
-                "utm": utm_params,
-                "recovery_url": co.get("abandoned_checkout_url", ""),
-            })
+        return {
+            "checkout_id": co.get("id"),
+            "created_at": co.get("created_at"),
+            "cart_value": float(co.get("total_price", 0) or 0),
+            "currency": co.get("currency", "USD"),
+            "products": products,
+            "step_reached": self._determine_step(co),
+            "email": co.get("email", ""),
+            "landing_site": landing[:200] if landing else "",
+            "referring_site": referring[:200] if referring else "",
+            "source": self._classify_source(landing, referring),
+            "utm": self._extract_utm(landing),
+            "recovery_url": co.get("abandoned_checkout_url", ""),
+        }
+
+    @staticmethod
+    def _summarize(analyzed: List[Dict], include_detail: bool = True) -> Dict:
+        """Aggregate analyzed checkouts into the abandonment report section."""
+        # Counted in C (Counter/sum over itemgetter) rather than a per-row Python loop;
+        # the fromkeys dicts keep every bucket present, in a fixed order
+        product_counts = Counter(p["title"] for row in analyzed for p in row["products"])
+        step_counts = dict.fromkeys(_CHECKOUT_STEPS, 0)
+        step_counts.update(Counter(map(itemgetter("step_reached"), analyzed)))
+        utm_counts = dict.fromkeys(_TRAFFIC_SOURCES, 0)
+        utm_counts.update(Counter(map(itemgetter("source"), analyzed)))
+        total_value = sum(map(itemgetter("cart_value"), analyzed), 0.0)
 
         most_abandoned = [
             {"product": title, "abandoned_count": count}
@@ -115,16 +272,19 @@ class CheckoutAuditor:
         ]
 
         return {
-            "total_abandoned": len(checkouts),
+            "total_abandoned": len(analyzed),
             "total_abandoned_value": round(total_value, 2),
             "most_abandoned_products": most_abandoned,
             "abandonment_by_step": step_counts,
             "utm_attribution": utm_counts,
-            "checkouts": analyzed,
+            "checkouts": analyzed if include_detail else [],
         }
 
-    def generate_report(self, days_back: int = 30) -> Dict:
-        """Generate a full checkout audit report."""
+    def generate_report(self, days_back: int = 30, refresh: bool = False) -> Dict:
+        """Generate a full checkout audit report (cached briefly; refresh=True rebuilds it)."""
+        return self._cached(("report", days_back), lambda: self._build_report(days_back), refresh)
+
+    def _build_report(self, days_back: int) -> Dict:
 
         # Fetch data
         checkout_data = self.get_abandoned_checkouts(limit=250)
@@ -138,33 +298,19 @@ class CheckoutAuditor:
         cutoff_7d = now - timedelta(days=7)
         cutoff_30d = now - timedelta(days=days_back)
 
-        checkouts_7d = []
-        checkouts_30d = []
-        for co in all_checkouts:
-            created = co.get("created_at", "")
-            if not created:
-                continue
-            try:
-                dt = datetime.fromisoformat(created.replace("Z", "+00:00"))
-            except (ValueError, TypeError):
-                continue
-            if dt >= cutoff_7d:
-                checkouts_7d.append(co)
-            if dt >= cutoff_30d:
-                checkouts_30d.append(co)
-
-        # Analyze
-        analysis_7d = self.analyze_abandonment(checkouts_7d)
-        analysis_30d = self.analyze_abandonment(checkouts_30d)
+        # Analyze both windows in one pass; only the 7-day window's rows are reported
+        analysis_7d, analysis_30d = self.analyze_abandonment_multi(
+            _dated(all_checkouts), [cutoff_7d, cutoff_30d], include_detail=[True, False],
+        )
 
         # Order stats
-        completed = [o for o in all_orders if not o.get("cancelled_at")]
-        total_revenue = sum(float(o.get("total_price", 0) or 0) for o in completed)
-        aov = total_revenue / len(completed) if completed else 0
+        completed_totals = [float(o.get("total_price", 0) or 0) for o in all_orders if not o.get("cancelled_at")]
+        total_revenue = sum(completed_totals, 0.0)
+        aov = total_revenue / len(completed_totals) if completed_totals else 0
 
         # Recommendations
         recommendations = self._generate_recommendations(
-            analysis_30d, len(completed), total_revenue,
+            analysis_30d, len(completed_totals), total_revenue,
         )
 
         return {
@@ -178,7 +324,7 @@ class CheckoutAuditor:
             "abandonment_by_step": analysis_30d["abandonment_by_step"],
             "utm_attribution": analysis_30d["utm_attribution"],
             "recent_orders": {
-                "count": len(completed),
+                "count": len(completed_totals),
                 "total_count_all_status": len(all_orders),
                 "revenue": f"${total_revenue:.2f}",
                 "aov": f"${aov:.2f}",
@@ -189,29 +335,24 @@ class CheckoutAuditor:
             },
         }
 
-    def get_recoverable_carts(self, hours_back: int = 48) -> Dict:
-        """Get abandoned checkouts from last N hours with recovery URLs.
+    def get_recoverable_carts(self, hours_back: int = 48, refresh: bool = False) -> Dict:
+        """Get abandoned checkouts from last N hours with recovery URLs (cached briefly).
 
         Returns carts that have:
         - A customer email (for sending recovery email)
         - A recovery URL (Shopify-generated checkout recovery link)
         - Items still in the cart
         """
+        return self._cached(("carts", hours_back), lambda: self._build_recoverable_carts(hours_back), refresh)
+
+    def _build_recoverable_carts(self, hours_back: int) -> Dict:
         checkout_data = self.get_abandoned_checkouts(limit=250)
         all_checkouts = checkout_data["checkouts"]
 
         cutoff = datetime.now(timezone.utc) - timedelta(hours=hours_back)
 
         recoverable = []
-        for co in all_checkouts:
-            created = co.get("created_at", "")
-            if not created:
-                continue
-            try:
-                dt = datetime.fromisoformat(created.replace("Z", "+00:00"))
-            except (ValueError, TypeError):
-                continue
-
+        for dt, co in _dated(all_checkouts):
             if dt < cutoff:
                 continue
 
@@ -236,7 +377,7 @@ class CheckoutAuditor:
 
             recoverable.append({
                 "checkout_id": co.get("id"),
-                "created_at": created,
+                "created_at": co.get("created_at"),
                 "email": email,
                 "first_name": customer.get("first_name", ""),
                 "last_name": customer.get("last_name", ""),
@@ -282,39 +423,12 @@ class CheckoutAuditor:
     @staticmethod
     def _classify_source(landing_site: str, referring_site: str) -> str:
         """Classify the traffic source from landing/referring URLs."""
-        combined = (landing_site + " " + referring_site).lower()
-
-        if "utm_source=meta" in combined or "utm_source=facebook" in combined or "fbclid" in combined:
-            return "meta"
-        if "utm_source=tiktok" in combined or "ttclid" in combined:
-            return "tiktok"
-        if "utm_source=google" in combined or "gclid" in combined:
-            return "google"
-        if referring_site:
-            ref_lower = referring_site.lower()
-            if "facebook.com" in ref_lower or "instagram.com" in ref_lower:
-                return "meta"
-            if "tiktok.com" in ref_lower:
-                return "tiktok"
-            if "google" in ref_lower:
-                return "google"
-            return "organic"
-        return "direct"
+        return _source_for(landing_site, referring_site)
 
     @staticmethod
     def _extract_utm(url: str) -> Dict:
         """Extract UTM parameters from a URL."""
-        if not url or "?" not in url:
-            return {}
-        try:
-            parsed = urlparse(url)
-            params = parse_qs(parsed.query)
-            return {
-                k: v[0] for k, v in params.items()
-                if k.startswith("utm_") or k in ("fbclid", "gclid", "ttclid")
-            }
-        except Exception:
-            return {}
+        return dict(_utm_items(url))
 
     @staticmethod
     def _generate_recommendations(analysis: Dict, order_count: int, revenue: float) -> List[str]:
@@ -326,16 +440,15 @@ class CheckoutAuditor:
         value = analysis.get("total_abandoned_value", 0)
 
         if total == 0 and order_count == 0:
-            recs.append("CRITICAL: Zero abandoned checkouts AND zero orders — visitors are NOT adding to cart. "
-                         "Focus on product page CRO: reviews, trust signals, compelling CTAs.")
+            recs.append(_REC_NO_CART_ACTIVITY)
             return recs
 
         if total == 0 and order_count > 0:
-            recs.append("No abandoned checkouts found — checkout completion rate appears healthy.")
+            recs.append(_REC_HEALTHY_CHECKOUT)
             return recs
 
         if total > 0:
-            recs.append(f"Found {total} abandoned checkouts worth ${value:.2f} in the last 30 days.")
+            recs.append(_REC_FOUND.format(total=total, value=value))
 
         # Step analysis
         contact = steps.get("contact_info", 0)
@@ -344,39 +457,28 @@ class CheckoutAuditor:
         unknown = steps.get("unknown", 0)
 
         if unknown > total * 0.5:
-            recs.append(f"HIGH: {unknown}/{total} abandoned before entering email — "
-                         "product pages or cart experience is losing visitors. "
-                         "Add trust signals, reviews, and urgency elements.")
+            recs.append(_REC_UNKNOWN.format(count=unknown, total=total))
 
         if contact > total * 0.3:
-            recs.append(f"MEDIUM: {contact}/{total} abandoned at contact info step — "
-                         "consider guest checkout, simpler forms, or email-only first step.")
+            recs.append(_REC_CONTACT.format(count=contact, total=total))
 
         if shipping > total * 0.2:
-            recs.append(f"MEDIUM: {shipping}/{total} abandoned at shipping step — "
-                         "shipping cost surprise? Show free shipping earlier. "
-                         "Consider showing estimated delivery time.")
+            recs.append(_REC_SHIPPING.format(count=shipping, total=total))
 
         if payment > total * 0.1:
-            recs.append(f"LOW: {payment}/{total} abandoned at payment step — "
-                         "add more payment options (Apple Pay, Google Pay, Shop Pay). "
-                         "Ensure SSL trust badges are visible.")
+            recs.append(_REC_PAYMENT.format(count=payment, total=total))
 
         # UTM analysis
         meta_count = utm.get("meta", 0)
         if meta_count > 0:
-            recs.append(f"Meta ads drove {meta_count} abandoned checkouts — "
-                         "visitors ARE reaching the store from ads but not converting. "
-                         "This confirms the ad targeting is working, focus on CRO.")
+            recs.append(_REC_META.format(count=meta_count))
 
         # Recovery
         if total > 3:
-            recs.append(f"ACTION: Enable abandoned cart recovery emails via Klaviyo. "
-                         f"Use GET /shopify/cart-recovery to get recovery URLs for the last 48h.")
+            recs.append(_REC_RECOVERY_EMAILS)
 
         # Value
         if value > 100:
-            recs.append(f"REVENUE OPPORTUNITY: ${value:.2f} in abandoned carts. "
-                         "With a 10-15% recovery rate, that's ${:.2f} recoverable.".format(value * 0.125))
+            recs.append(_REC_REVENUE.format(value=value, recoverable=value * RECOVERY_RATE))
 
         return recs
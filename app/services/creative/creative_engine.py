@@ -3,6 +3,32 @@ from app.models import Product
 
 
 class CreativeEngine:
+    # Copy templates, filled per product with str.format_map
+    _HEADLINE_TEMPLATES = (
+        "{title} - Free Shipping",
+        "Shop {ptype} | Court Sportswear",
+        "Tennis {ptype} for USTA Players",
+        "{title} - Starting at ${price}",
+        "Premium Tennis Apparel | {title}",
+        "Custom {ptype} | {vendor}",
+        "USTA Approved {title}",
+        "Professional Tennis {ptype}",
+        "{title} - Best Seller",
+        "Tennis Team {ptype}",
+        "High-Quality {title}",
+        "{vendor} {ptype}",
+        "Comfortable {title}",
+        "Durable Tennis {ptype}",
+        "{title} - Limited Stock",
+    )
+    _DESCRIPTION_TEMPLATES = (
+        "Premium {ptype} designed for serious tennis players. Made by {vendor}.",
+        "High-quality tennis apparel for USTA tournaments and league play. Free shipping on orders over $50.",
+        "Professional-grade {ptype} with moisture-wicking fabric. Perfect for competitive tennis.",
+        "Custom tennis gear for teams and individuals. Durable construction that lasts.",
+        "Designed for comfort and performance on the court. Trusted by tennis professionals worldwide.",
+    )
+
     def generate_ad_content(self, product: Product) -> Dict[str, Any]:
         return {
             "headlines": self.generate_headlines(product),
@@ -12,34 +38,21 @@ class CreativeEngine:
         }
 
     def generate_headlines(self, product: Product) -> List[str]:
-        templates = [
-            f"{product.title} - Free Shipping",
-            f"Shop {product.product_type} | Court Sportswear",
-            f"Tennis {product.product_type} for USTA Players",
-            f"{product.title} - Starting at ${product.price}",
-            f"Premium Tennis Apparel | {product.title}",
-            f"Custom {product.product_type} | {product.vendor}",
-            f"USTA Approved {product.title}",
-            f"Professional Tennis {product.product_type}",
-            f"{product.title} - Best Seller",
-            f"Tennis Team {product.product_type}",
-            f"High-Quality {product.title}",
-            f"{product.vendor} {product.product_type}",
-            f"Comfortable {product.title}",
-            f"Durable Tennis {product.product_type}",
-            f"{product.title} - Limited Stock"
-        ]
-        return templates[:15]
+        fields = self._template_fields(product)
+        return [t.format_map(fields) for t in self._HEADLINE_TEMPLATES]
 
     def generate_descriptions(self, product: Product) -> List[str]:
-        descriptions = [
-            f"Premium {product.product_type} designed for serious tennis players. Made by {product.vendor}.",
-            f"High-quality tennis apparel for USTA tournaments and league play. Free shipping on orders over $50.",
-            f"Professional-grade {product.product_type} with moisture-wicking fabric. Perfect for competitive tennis.",
-            f"Custom tennis gear for teams and individuals. Durable construction that lasts.",
-            f"Designed for comfort and performance on the court. Trusted by tennis professionals worldwide."
-        ]
-        return descriptions
+        fields = self._template_fields(product)
+        return [t.format_map(fields) for t in self._DESCRIPTION_TEMPLATES]
+
+    @staticmethod
+    def _template_fields(product: Product) -> Dict[str, Any]:
+        return {
+            "title": product.title,
+            "ptype": product.product_type,
+            "vendor": product.vendor,
+            "price": product.price,
+        }
 
     def process_images(self, images_str: str) -> List[str]:
         """Process and optimize images for ads"""
@@ -262,3 +262,49 @@ def mock_external_apis():
         mock_post.side_effect = _generic_post
         mock_delete.side_effect = _generic_delete
         yield {"get": mock_get, "post": mock_post, "delete": mock_delete}
+
+
+@pytest.fixture()
+def mock_tiktok_api():
+    """Route the TikTok router's shared httpx client through a MockTransport."""
+    import httpx
+
+    calls = []
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        path = request.url.path
+        if path.endswith("/oauth2/advertiser/get/"):
+            body = {"code": 0, "data": {"list": [{"advertiser_id": "test_tiktok_adv"}]}}
+        elif path.endswith("/campaign/get/"):
+            body = {"code": 0, "data": {"list": [
+                {"campaign_id": "111", "campaign_name": "Low", "operation_status": "ENABLE"},
+                {"campaign_id": "222", "campaign_name": "High", "operation_status": "DISABLE"},
+            ]}}
+        elif path.endswith("/report/integrated/get/"):
+            body = {"code": 0, "data": {"list": [
+                {"dimensions": {"campaign_id": "111"},
+                 "metrics": {"spend": "2.50", "impressions": "1000", "clicks": "10",
+                             "ctr": "0.01", "cpc": "0.25", "reach": "900"}},
+                {"dimensions": {"campaign_id": "222"},
+                 "metrics": {"spend": "7.50", "impressions": "3000", "clicks": "30",
+                             "ctr": "0.01", "cpc": "0.25", "reach": "2500"}},
+            ]}}
+        elif path.endswith("/identity/get/"):
+            body = {"code": 0, "data": {"identity_list": []}}
+        elif path.endswith("/file/image/ad/upload/"):
+            body = {"code": 0, "data": {"image_id": f"img_{len(calls)}"}}
+        elif path.endswith("/products.json"):
+            body = {"products": [{"images": [{"src": "https://cdn.example/a.jpg"}]},
+                                 {"images": [{"src": "https://cdn.example/b.jpg"}]}]}
+        else:
+            body = {"code": 0, "data": {}}
+        return httpx.Response(200, json=body)
+
+    from app.routers import tiktok
+    tiktok._CACHE.clear()
+    tiktok._URL_TO_IMAGE_ID.clear()
+    tiktok._token_cache["creds"] = None
+    client = httpx.AsyncClient(base_url=tiktok.TIKTOK_API_BASE, transport=httpx.MockTransport(_handler))
+    with patch("app.routers.tiktok._http", return_value=client):
+        yield calls
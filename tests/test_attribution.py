@@ -0,0 +1,132 @@
+"""Tests for AttributionService — UTM parsing, platform resolution, batch writes."""
+
+from app.database import ActivityLogModel, CampaignModel
+from app.services.attribution import AttributionService
+
+
+def _order(order_id, price, utm_campaign="", utm_source="tiktok"):
+    return {
+        "id": order_id,
+        "total_price": str(price),
+        "landing_site": f"/products/x?utm_source={utm_source}&utm_campaign={utm_campaign}",
+    }
+
+
+class TestAttributeOrders:
+    def test_single_order_attributed(self, db_session, seed_campaigns):
+        result = AttributionService(db_session).attribute_order(_order(1, 40, "tt_campaign_001"))
+        assert result["attributed"] is True
+        assert result["platform"] == "tiktok"
+        assert result["campaign_name"] == "TikTok Test Campaign"
+
+        campaign = db_session.query(CampaignModel).filter_by(platform_campaign_id="tt_campaign_001").one()
+        assert campaign.revenue == 160.0
+        assert campaign.conversions == 4
+
+    def test_batch_aggregates_per_campaign(self, db_session, seed_campaigns):
+        orders = [
+            _order(1, 10, "tt_campaign_001"),
+            _order(2, 15.5, "tt_campaign_001"),
+            _order(3, 20, "nope", utm_source="newsletter"),
+        ]
+        results = AttributionService(db_session).attribute_orders(orders)
+        assert [r["attributed"] for r in results] == [True, True, False]
+
+        campaign = db_session.query(CampaignModel).filter_by(platform_campaign_id="tt_campaign_001").one()
+        assert campaign.revenue == 145.5
+        assert campaign.total_revenue == 25.5
+        assert campaign.conversions == 5
+
+        actions = [a for (a,) in db_session.query(ActivityLogModel.action).order_by(ActivityLogModel.id)]
+        assert actions == ["ORDER_ATTRIBUTED", "ORDER_ATTRIBUTED", "ORDER_UNATTRIBUTED"]
+
+    def test_roas_uses_total_spend(self, db_session, seed_campaigns):
+        campaign = db_session.query(CampaignModel).filter_by(platform_campaign_id="tt_campaign_001").one()
+        campaign.total_spend = 50.0
+        db_session.commit()
+
+        AttributionService(db_session).attribute_order(_order(1, 100, "tt_campaign_001"))
+        db_session.refresh(campaign)
+        assert campaign.roas == 2.0
+
+    def test_match_stages_in_order(self, db_session, seed_campaigns):
+        svc = AttributionService(db_session)
+        assert svc._match_campaign("120241759616260364", "", None).name == "Test Paused Campaign"
+        assert svc._match_campaign("paused camp", "", None).name == "Test Paused Campaign"
+        assert svc._match_campaign("unknown", "fb", "meta").name == "Test Active Campaign"
+        assert svc._match_campaign("unknown", "bing", None) is None
+
+    def test_batch_lookup_matches_query(self, db_session, seed_campaigns):
+        svc = AttributionService(db_session)
+        match = svc._campaign_lookup()
+        for args in [("120241759616260364", "", None), ("paused camp", "", None),
+                     ("unknown", "fb", "meta"), ("unknown", "bing", None), ("", "tiktok", "tiktok")]:
+            assert match(*args) is svc._match_campaign(*args)
+
+    def test_background_defers_log_write(self, db_session, seed_campaigns):
+        from fastapi import BackgroundTasks
+        background = BackgroundTasks()
+        AttributionService(db_session).attribute_order(_order(1, 40, "tt_campaign_001"), background)
+
+        campaign = db_session.query(CampaignModel).filter_by(platform_campaign_id="tt_campaign_001").one()
+        assert campaign.revenue == 160.0
+        assert db_session.query(ActivityLogModel).count() == 0
+        assert len(background.tasks) == 1
+
+
+    def test_revenue_kept_when_log_insert_fails(self, db_session, seed_campaigns, monkeypatch):
+        # A row with no matching column makes the activity-log INSERT fail
+        monkeypatch.setattr(AttributionService, "_log_row", lambda self, *args: {"no_such_column": 1})
+        AttributionService(db_session).attribute_order(_order(1, 40, "tt_campaign_001"))
+
+        campaign = db_session.query(CampaignModel).filter_by(platform_campaign_id="tt_campaign_001").one()
+        assert campaign.revenue == 160.0
+        assert campaign.conversions == 4
+        assert db_session.query(ActivityLogModel).count() == 0
+
+    def test_failed_revenue_retry_does_not_raise(self, db_session, seed_campaigns, monkeypatch):
+        def _fail(self, deltas):
+            raise RuntimeError("update failed")
+
+        monkeypatch.setattr(AttributionService, "_update_campaigns", _fail)
+        result = AttributionService(db_session).attribute_order(_order(1, 40, "tt_campaign_001"))
+        assert result["attributed"] is True
+
+    def test_failed_revenue_write_with_background_does_not_raise(self, db_session, seed_campaigns, monkeypatch):
+        from fastapi import BackgroundTasks
+
+        def _fail(self, deltas):
+            raise RuntimeError("update failed")
+
+        monkeypatch.setattr(AttributionService, "_update_campaigns", _fail)
+        background = BackgroundTasks()
+        result = AttributionService(db_session).attribute_order(_order(1, 40, "tt_campaign_001"), background)
+        assert result["attributed"] is True
+        # The activity log is still scheduled, and the session is usable afterwards
+        assert len(background.tasks) == 1
+        assert db_session.query(CampaignModel).count() == 3
+
+
+class TestResolvePlatform:
+    def test_keywords_resolve_in_map_order(self, db_session):
+        svc = AttributionService(db_session)
+        assert svc._resolve_platform("facebook") == "meta"
+        assert svc._resolve_platform("Google_CPC") == "google_ads"
+        assert svc._resolve_platform("google_fb_retarget") == "meta"
+        assert svc._resolve_platform("klaviyo-email") == "klaviyo"
+        assert svc._resolve_platform("bing") is None
+        assert svc._resolve_platform("") is None
+
+
+class TestExtractUtm:
+    def test_landing_site_then_referrer(self, db_session):
+        utm = AttributionService(db_session)._extract_utm({
+            "landing_site": "/p?utm_source=&utm_campaign=Spring+Sale%21#top",
+            "referring_site": "https://x.com/?utm_source=ig&utm_campaign=other&utm_medium=social",
+        })
+        assert utm == {
+            "utm_source": "ig",
+            "utm_medium": "social",
+            "utm_campaign": "Spring Sale!",
+            "utm_content": "",
+        }
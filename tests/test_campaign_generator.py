@@ -0,0 +1,82 @@
+"""Tests for CampaignGenerator — title classification, ad copy, keywords."""
+
+import pytest
+
+from app.database import CampaignModel, ProductModel
+from app.services import campaign_generator
+from app.services.campaign_generator import CampaignGenerator, _product_category
+
+
+@pytest.fixture(autouse=True)
+def _fresh_settings():
+    campaign_generator._settings_cache["settings"] = None
+
+
+def _seed_products(db):
+    db.add_all([
+        ProductModel(shopify_id="1", title="Court Cap", handle="court-cap", price=30.0),
+        ProductModel(shopify_id="2", title="Tennis Polo Shirt", price=50.0),
+        ProductModel(shopify_id="3", title="Gift Card", price=0),
+        ProductModel(shopify_id="5", title="Sample Visor", price=None),
+        ProductModel(shopify_id="4", title="Retired Skort", price=40.0, is_available=False),
+    ])
+    db.commit()
+
+
+class TestProductCategory:
+    def test_categories_match_whole_words(self):
+        assert _product_category("Court Cap") == "headwear"
+        assert _product_category("Dad Hats") == "headwear"
+        assert _product_category("Tennis Polo Shirt") == "apparel"
+        assert _product_category("Pleated Skort") == "bottoms"
+        assert _product_category("Racket Bag") == "gear"
+
+    def test_substrings_do_not_match(self):
+        # "top" inside "Desktop", "cap" inside "Escape"
+        assert _product_category("Desktop Stand") == "gear"
+        assert _product_category("Escape Towel") == "gear"
+
+    def test_category_priority_not_position(self):
+        assert _product_category("Polo Cap") == "headwear"
+        assert _product_category("Shorts and Tee") == "apparel"
+
+
+class TestKeywords:
+    def test_keywords_deduped_in_order(self, db_session):
+        keywords = CampaignGenerator(db_session)._generate_keywords(ProductModel(title="Court Polo Shirt"))
+        assert keywords == [
+            "tennis shirt", "tennis polo", "tennis top", "tennis tee", "court shirt", "tennis apparel",
+            "court sportswear", "court tennis", "tennis court",
+        ]
+
+
+class TestGenerateCampaigns:
+    def test_creates_one_campaign_per_priced_product_and_platform(self, db_session):
+        _seed_products(db_session)
+        created = CampaignGenerator(db_session).generate_campaigns()
+
+        assert sorted((c["product_title"], c["platform"]) for c in created) == [
+            ("Court Cap", "google"), ("Court Cap", "meta"),
+            ("Tennis Polo Shirt", "google"), ("Tennis Polo Shirt", "meta"),
+        ]
+        assert all(c["id"] for c in created)
+        assert db_session.query(CampaignModel).count() == 4
+        cap = next(c for c in created if c["product_title"] == "Court Cap" and c["platform"] == "meta")
+        assert cap["ad_copy"]["link"] == "https://court-sportswear.com/products/court-cap"
+
+        stored = db_session.get(CampaignModel, cap["id"])
+        assert stored.targeting["pixel_event"] == "Purchase"
+        assert stored.targeting["countries"] == ["US"]
+
+    def test_skips_existing_product_platforms(self, db_session):
+        _seed_products(db_session)
+        generator = CampaignGenerator(db_session)
+        generator.generate_campaigns(platform="google")
+        created = generator.generate_campaigns()
+        assert {c["platform"] for c in created} == {"meta"}
+
+    def test_inserts_in_batches_within_one_commit(self, db_session, monkeypatch):
+        monkeypatch.setattr(campaign_generator, "INSERT_BATCH_SIZE", 1)
+        _seed_products(db_session)
+        created = CampaignGenerator(db_session).generate_campaigns()
+        assert len({c["id"] for c in created}) == 4
@@ -0,0 +1,162 @@
+"""Tests for CheckoutAuditor — time windows, recoverable carts."""
+
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from app.services import checkout_audit
+from app.services.checkout_audit import CheckoutAuditor
+
+
+@pytest.fixture(autouse=True)
+def _fresh_report_cache():
+    checkout_audit._REPORT_CACHE.clear()
+
+
+def _iso_ago(**delta) -> str:
+    return (datetime.now(timezone.utc) - timedelta(**delta)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _auditor(checkouts, orders=(), shop="", calls=None):
+    def fake_api(method, endpoint, **kwargs):
+        if calls is not None:
+            calls.append(endpoint)
+        if endpoint.startswith("checkouts.json"):
+            return {"checkouts": list(checkouts)}
+        return {"orders": list(orders)}
+    return CheckoutAuditor(fake_api, shop=shop)
+
+
+CHECKOUTS = [
+    {"id": 1, "created_at": _iso_ago(hours=2), "total_price": "40.00", "email": "a@example.com",
+     "line_items": [{"title": "Court Cap", "price": "40.00"}]},
+    {"id": 2, "created_at": _iso_ago(days=10), "total_price": "25.00", "email": "b@example.com",
+     "line_items": [{"title": "Tennis Polo", "price": "25.00"}]},
+    {"id": 3, "created_at": _iso_ago(days=45), "total_price": "99.00",
+     "line_items": [{"title": "Old Skort", "price": "99.00"}]},
+    {"id": 4, "created_at": "not a date", "total_price": "10.00"},
+    {"id": 5, "created_at": None, "total_price": "10.00"},
+]
+
+
+class TestGenerateReport:
+    def test_splits_checkouts_into_windows(self):
+        report = _auditor(CHECKOUTS).generate_report(days_back=30)
+        assert report["abandoned_checkouts_7d"] == 1
+        assert report["abandoned_checkouts_30d"] == 2
+        assert report["abandoned_cart_value_30d"] == "$65.00"
+
+    def test_order_stats_skip_cancelled_orders(self):
+        orders = [
+            {"id": 1, "total_price": "30.00"},
+            {"id": 2, "total_price": "50.00"},
+            {"id": 3, "total_price": "99.00", "cancelled_at": _iso_ago(days=1)},
+        ]
+        report = _auditor([], orders).generate_report()
+        assert report["recent_orders"] == {
+            "count": 2, "total_count_all_status": 3, "revenue": "$80.00", "aov": "$40.00",
+        }
+        assert report["abandonment_by_step"] == {"contact_info": 0, "shipping": 0, "payment": 0, "unknown": 0}
+
+    def test_multi_window_matches_separate_analyses(self):
+        from app.services.checkout_audit import _dated
+
+        auditor = _auditor(CHECKOUTS)
+        now = datetime.now(timezone.utc)
+        cutoffs = [now - timedelta(days=7), now - timedelta(days=30)]
+        dated = _dated(CHECKOUTS)
+
+        fused = auditor.analyze_abandonment_multi(dated, cutoffs)
+        separate = [auditor.analyze_abandonment([co for dt, co in dated if dt >= c]) for c in cutoffs]
+        assert fused == separate
+
+    def test_aggregates_without_detail_match(self):
+        auditor = _auditor(CHECKOUTS)
+        full = auditor.analyze_abandonment(CHECKOUTS[:3])
+        lean = auditor.analyze_abandonment(CHECKOUTS[:3], include_detail=False)
+        assert lean["checkouts"] == []
+        assert {**lean, "checkouts": full["checkouts"]} == full
+
+
+class TestRecoverableCarts:
+    def test_only_recent_carts_with_email_and_items(self):
+        result = _auditor(CHECKOUTS).get_recoverable_carts(hours_back=48)
+        assert [c["checkout_id"] for c in result["carts"]] == [1]
+        assert result["carts"][0]["created_at"] == CHECKOUTS[0]["created_at"]
+        assert result["recoverable_value"] == "$40.00"
+
+
+class TestExtractUtm:
+    def test_keeps_utm_and_click_ids_only(self):
+        url = "/products/cap?utm_source=meta&utm_campaign=Summer+Sale&variant=1&fbclid=abc%3D#top"
+        assert CheckoutAuditor._extract_utm(url) == {
+            "utm_source": "meta", "utm_campaign": "Summer Sale", "fbclid": "abc=",
+        }
+
+    def test_first_non_empty_value_wins(self):
+        assert CheckoutAuditor._extract_utm("/?utm_source=&utm_source=tiktok&utm_source=meta") == {
+            "utm_source": "tiktok",
+        }
+
+    def test_no_query(self):
+        assert CheckoutAuditor._extract_utm("/products/cap") == {}
+        assert CheckoutAuditor._extract_utm("") == {}
+
+
+class TestClassifySource:
+    def test_url_markers(self):
+        classify = CheckoutAuditor._classify_source
+        assert classify("/?utm_source=Facebook", "") == "meta"
+        assert classify("/?ttclid=1", "https://www.google.com/") == "tiktok"
+        assert classify("/?gclid=1", "") == "google"
+
+    def test_meta_marker_wins_over_earlier_tiktok_marker(self):
+        assert CheckoutAuditor._classify_source("/?utm_source=tiktok&fbclid=1", "") == "meta"
+
+    def test_referrer_fallbacks(self):
+        classify = CheckoutAuditor._classify_source
+        assert classify("/", "https://l.instagram.com/") == "meta"
+        assert classify("/", "https://www.tiktok.com/") == "tiktok"
+        assert classify("/", "https://www.Google.com/") == "google"
+        assert classify("/", "https://duckduckgo.com/") == "organic"
+        assert classify("/", "") == "direct"
+
+
+class TestRecommendations:
+    def test_revenue_opportunity_is_formatted(self):
+        analysis = {
+            "total_abandoned": 5,
+            "total_abandoned_value": 200.0,
+            "abandonment_by_step": {"unknown": 3},
+            "utm_attribution": {"meta": 2},
+        }
+        recs = CheckoutAuditor._generate_recommendations(analysis, 0, 0.0)
+        assert recs[0] == "Found 5 abandoned checkouts worth $200.00 in the last 30 days."
+        assert recs[1].startswith("HIGH: 3/5 abandoned before entering email")
+        assert recs[-1] == ("REVENUE OPPORTUNITY: $200.00 in abandoned carts. "
+                            "With a 10-15% recovery rate, that's $25.00 recoverable.")
+        assert not any("{" in rec for rec in recs)
+
+    def test_no_activity(self):
+        recs = CheckoutAuditor._generate_recommendations({"total_abandoned": 0}, 0, 0.0)
+        assert len(recs) == 1 and recs[0].startswith("CRITICAL")
+
+
+class TestReportCache:
+    def test_repeat_report_is_served_from_cache(self):
+        calls = []
+        auditor = _auditor(CHECKOUTS, calls=calls)
+        first = auditor.generate_report(days_back=30)
+        assert auditor.generate_report(days_back=30) is first
+        assert len(calls) == 2
+
+        auditor.generate_report(days_back=30, refresh=True)
+        assert len(calls) == 4
+
+    def test_cache_is_keyed_by_shop_and_window(self):
+        calls = []
+        _auditor(CHECKOUTS, shop="a.myshopify.com", calls=calls).get_recoverable_carts(hours_back=48)
+        _auditor(CHECKOUTS, shop="b.myshopify.com", calls=calls).get_recoverable_carts(hours_back=48)
+        _auditor(CHECKOUTS, shop="a.myshopify.com", calls=calls).get_recoverable_carts(hours_back=24)
+        _auditor(CHECKOUTS, shop="a.myshopify.com", calls=calls).get_recoverable_carts(hours_back=48)
+        assert len(calls) == 3
@@ -0,0 +1,414 @@
+"""Tests for TikTok router — status, performance, campaign list."""
+
+
+class TestTikTokStatus:
+    def test_status_connected(self, client, mock_tiktok_api):
+        resp = client.get("/api/v1/tiktok/status")
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["connected"] is True
+        assert data["advertiser_id"] == "test_tiktok_adv"
+
+    def test_status_sends_access_token(self, client, mock_tiktok_api):
+        client.get("/api/v1/tiktok/status")
+        assert mock_tiktok_api[0].headers["Access-Token"] == "test_tiktok_token"
+
+
+class TestTikTokToken:
+    def test_saved_token_is_singleton_row(self, db_session):
+        from app.database import TikTokTokenModel
+        from app.routers import tiktok
+
+        tiktok._save_token(db_session, "tok_1", "adv_1", ["adv_1"])
+        tiktok._save_token(db_session, "tok_2", "adv_2", ["adv_2"])
+        rows = db_session.query(TikTokTokenModel).all()
+        assert [(r.id, r.access_token) for r in rows] == [(tiktok.TOKEN_ROW_ID, "tok_2")]
+        assert tiktok._get_active_token(db_session) == {"access_token": "tok_2", "advertiser_id": "adv_2"}
+        tiktok._token_cache["creds"] = None
+
+
+class TestTikTokPerformance:
+    def test_performance_summary(self, client, mock_tiktok_api):
+        data = client.get("/api/v1/tiktok/performance").json()
+        assert data["summary"]["total_campaigns"] == 2
+        assert data["summary"]["total_spend"] == 10.0
+        assert data["summary"]["total_clicks"] == 40
+
+    def test_performance_sorted_by_spend(self, client, mock_tiktok_api):
+        data = client.get("/api/v1/tiktok/performance").json()
+        assert [c["id"] for c in data["campaigns"]] == ["222", "111"]
+
+
+class TestTikTokCampaigns:
+    def test_campaigns_merge_metrics(self, client, mock_tiktok_api):
+        data = client.get("/api/v1/tiktok/campaigns").json()
+        assert data["total_campaigns"] == 2
+        assert data["active_campaigns"] == 1
+        assert data["campaigns"][0]["campaign_id"] == "222"
+        assert data["campaigns"][0]["spend"] == 7.5
+
+    def test_campaigns_limit_returns_top_spenders(self, client, mock_tiktok_api):
+        data = client.get("/api/v1/tiktok/campaigns", params={"limit": 1}).json()
+        assert [c["campaign_id"] for c in data["campaigns"]] == ["222"]
+        assert data["total_campaigns"] == 2
+
+    def test_campaigns_stream_ndjson(self, client, mock_tiktok_api):
+        import json
+        resp = client.get("/api/v1/tiktok/campaigns", params={"stream": 1})
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in resp.text.splitlines()]
+        assert [r["campaign_id"] for r in rows] == ["222", "111"]
+
+    def test_campaigns_not_connected(self, client, mock_tiktok_api, monkeypatch):
+        import time
+        from app.routers import tiktok
+        monkeypatch.setitem(tiktok._token_cache, "creds", {"access_token": "", "advertiser_id": ""})
+        monkeypatch.setitem(tiktok._token_cache, "loaded_at", time.monotonic())
+
+        data = client.get("/api/v1/tiktok/campaigns").json()
+        assert data["campaigns"] == [] and "not connected" in data["error"]
+        assert mock_tiktok_api == []
+
+    def test_campaigns_cached_per_advertiser(self, client, mock_tiktok_api):
+        first = client.get("/api/v1/tiktok/campaigns").json()
+        calls = len(mock_tiktok_api)
+        assert client.get("/api/v1/tiktok/campaigns").json() == first
+        assert len(mock_tiktok_api) == calls
+
+    def test_no_cache_header_bypasses_cache(self, client, mock_tiktok_api):
+        client.get("/api/v1/tiktok/campaigns")
+        calls = len(mock_tiktok_api)
+        client.get("/api/v1/tiktok/campaigns", headers={"Cache-Control": "no-cache"})
+        assert len(mock_tiktok_api) == calls + 2
+
+    def test_pause_invalidates_cache(self, client, mock_tiktok_api):
+        client.get("/api/v1/tiktok/campaigns")
+        client.post("/api/v1/tiktok/pause-campaign", params={"campaign_id": "111"})
+        calls = len(mock_tiktok_api)
+        client.get("/api/v1/tiktok/campaigns")
+        assert len(mock_tiktok_api) == calls + 2
+
+
+class TestTikTokIdentities:
+    def test_identities_probes_every_type(self, client, mock_tiktok_api):
+        data = client.get("/api/v1/tiktok/identities").json()
+        assert set(data["identities"]) == {"TT_USER", "BC_AUTH_TT", "CUSTOMIZED_USER"}
+        probed = {r.url.params["identity_type"] for r in mock_tiktok_api}
+        assert probed == set(data["identities"])
+
+    def test_identities_cached_per_advertiser(self, client, mock_tiktok_api):
+        from app.routers import tiktok
+        tiktok._CACHE[("test_tiktok_adv", "identities")] = (
+            tiktok.time.monotonic(), {"TT_USER": [{"identity_id": "cached"}], "BC_AUTH_TT": [], "CUSTOMIZED_USER": []})
+        data = client.get("/api/v1/tiktok/identities").json()
+        assert data["identities"]["TT_USER"]["count"] == 1
+        assert not mock_tiktok_api
+
+
+class TestTikTokCallback:
+    def test_callback_error_is_escaped(self, client):
+        resp = client.get("/api/v1/tiktok/callback", params={"error": "<script>x</script>"})
+        assert resp.status_code == 200
+        assert "<script>" not in resp.text
+        assert "&lt;script&gt;" in resp.text
+
+    def test_callback_without_code(self, client):
+        resp = client.get("/api/v1/tiktok/callback")
+        assert "No auth code received." in resp.text
+        assert resp.headers["content-type"].startswith("text/html")
+
+
+class TestTikTokConnectEvents:
+    def test_streams_each_summary_then_done(self, client, mock_tiktok_api):
+        from app.routers import tiktok
+
+        state = tiktok._issue_connect_events_token()
+        resp = client.get("/api/v1/tiktok/connect-events", params={"state": state})
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        events = [line.split(": ", 1)[1] for line in resp.text.splitlines() if line.startswith("event: ")]
+        assert sorted(events[:-1]) == ["advertiser", "identities", "images"]
+        assert events[-1] == "done"
+        assert '"TT_USER":0' in resp.text
+
+        # The token is single-use
+        assert client.get("/api/v1/tiktok/connect-events", params={"state": state}).status_code == 403
+
+    def test_requires_state_from_callback(self, client, mock_tiktok_api):
+        assert client.get("/api/v1/tiktok/connect-events").status_code == 403
+        assert client.get("/api/v1/tiktok/connect-events", params={"state": "autosem_connect"}).status_code == 403
+        assert not mock_tiktok_api
+
+    def test_success_page_embeds_state(self, client, monkeypatch):
+        from app.routers import tiktok
+
+        async def _exchange(code, db):
+            return {"success": True, "advertiser_id": "adv_1"}
+
+        monkeypatch.setattr(tiktok, "_exchange_token", _exchange)
+        resp = client.get("/api/v1/tiktok/callback", params={"auth_code": "abc"})
+        state = resp.text.split("connect-events?state=", 1)[1].split('"', 1)[0]
+        assert state in tiktok._connect_event_tokens
+
+
+class TestTikTokRetry:
+    def _run(self, monkeypatch, responses, method="GET"):
+        import asyncio
+        import httpx
+        from app.routers import tiktok
+
+        seen = []
+
+        def _handler(request):
+            seen.append(request)
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        client = httpx.AsyncClient(base_url=tiktok.TIKTOK_API_BASE, transport=httpx.MockTransport(_handler))
+        monkeypatch.setattr(tiktok, "_http", lambda: client)
+        monkeypatch.setattr(tiktok, "RETRY_BASE_DELAY", 0)
+        result = asyncio.run(tiktok._tiktok_api(method, "/campaign/get/", "tok", data={}))
+        return result, seen
+
+    def test_retries_transient_status(self, monkeypatch):
+        import httpx
+        result, seen = self._run(monkeypatch, [
+            httpx.Response(503), httpx.Response(429), httpx.Response(200, json={"code": 0, "data": {}}),
+        ])
+        assert result["code"] == 0
+        assert len(seen) == 3
+
+    def test_write_not_retried_after_server_error_or_timeout(self, monkeypatch):
+        import httpx
+        result, seen = self._run(monkeypatch, [httpx.Response(502)], method="POST")
+        assert result["code"] == -1
+        assert len(seen) == 1
+
+        result, seen = self._run(monkeypatch, [httpx.ReadTimeout("slow")], method="POST")
+        assert result["code"] == -1
+        assert len(seen) == 1
+
+    def test_write_retried_when_request_never_processed(self, monkeypatch):
+        import httpx
+        result, seen = self._run(monkeypatch, [
+            httpx.ConnectError("refused"), httpx.Response(429), httpx.Response(200, json={"code": 0, "data": {}}),
+        ], method="POST")
+        assert result["code"] == 0
+        assert len(seen) == 3
+
+    def test_get_with_list_and_dict_params(self, monkeypatch):
+        import asyncio
+        import httpx
+        from app.routers import tiktok
+
+        seen = []
+
+        def _handler(request):
+            seen.append(request)
+            return httpx.Response(200, json={"code": 0, "data": {}})
+
+        client = httpx.AsyncClient(base_url=tiktok.TIKTOK_API_BASE, transport=httpx.MockTransport(_handler))
+        monkeypatch.setattr(tiktok, "_http", lambda: client)
+        params = {"advertiser_id": "adv", "fields": ["campaign_id", "budget"], "filtering": {"status": "ENABLE"}}
+
+        async def _both():
+            return await asyncio.gather(tiktok._tiktok_api("GET", "/campaign/get/", "tok", params=params),
+                                        tiktok._tiktok_api("GET", "/campaign/get/", "tok", params=dict(params)))
+
+        first, second = asyncio.run(_both())
+        assert first["code"] == 0 and second == first
+        assert len(seen) == 1
+
+    def test_client_error_not_retried(self, monkeypatch):
+        import httpx
+        result, seen = self._run(monkeypatch, [httpx.Response(400, json={"code": 40002, "message": "bad"})])
+        assert result["code"] == 40002
+        assert len(seen) == 1
+
+    def test_non_json_error_body(self, monkeypatch):
+        import httpx
+        result, seen = self._run(monkeypatch, [httpx.Response(404, text="not found")])
+        assert result == {"code": -1, "message": "HTTP 404: not found"}
+
+
+class TestTikTokProductImages:
+    def test_product_feed_cached(self, mock_tiktok_api):
+        import asyncio
+        from app.routers import tiktok
+
+        async def _twice():
+            return await tiktok._get_product_images(), await tiktok._get_product_images()
+
+        first, second = asyncio.run(_twice())
+        assert first == ["https://cdn.example/a.jpg", "https://cdn.example/b.jpg"]
+        assert second == first
+        assert sum(r.url.path.endswith("/products.json") for r in mock_tiktok_api) == 1
+
+
+class TestTikTokImageUpload:
+    def test_duplicate_name_reuses_library_image(self, monkeypatch):
+        import asyncio
+        import httpx
+        from app.routers import tiktok
+
+        seen = []
+
+        def _handler(request):
+            seen.append(request.url.path)
+            if request.url.path.endswith("/file/image/ad/upload/"):
+                return httpx.Response(200, json={"code": 40911, "message": "duplicate"})
+            name = f"cs_{1700000000}_0.jpg"
+            return httpx.Response(200, json={"code": 0, "data": {"list": [
+                {"image_id": "img_existing", "file_name": name}]}})
+
+        client = httpx.AsyncClient(base_url=tiktok.TIKTOK_API_BASE, transport=httpx.MockTransport(_handler))
+        monkeypatch.setattr(tiktok, "_http", lambda: client)
+        monkeypatch.setattr(tiktok.time, "time", lambda: 1700000000)
+        tiktok._CACHE.clear()
+        tiktok._URL_TO_IMAGE_ID.clear()
+
+        ids = asyncio.run(tiktok._upload_images("tok", "adv", ["https://x/a.jpg"]))
+        assert ids == ["img_existing"]
+        assert sum(p.endswith("/file/image/ad/upload/") for p in seen) == 1
+        assert sum(p.endswith("/file/image/ad/get/") for p in seen) == 1
+
+    def test_uploaded_url_not_reuploaded(self, mock_tiktok_api):
+        import asyncio
+        from app.routers import tiktok
+
+        first = asyncio.run(tiktok._upload_image_by_url("tok", "adv", "https://x/a.jpg"))
+        again = asyncio.run(tiktok._upload_images("tok", "adv", ["https://x/a.jpg"]))
+        assert again == [first]
+        assert sum(r.url.path.endswith("/file/image/ad/upload/") for r in mock_tiktok_api) == 1
+
+    def test_uploaded_url_survives_restart(self, mock_tiktok_api, db_session):
+        import asyncio
+        from app.database import TikTokImageModel
+        from app.routers import tiktok
+
+        first = asyncio.run(tiktok._upload_image_by_url("tok", "adv", "https://x/b.jpg"))
+        assert db_session.query(TikTokImageModel).filter_by(image_id=first).count() == 1
+        tiktok._URL_TO_IMAGE_ID.clear()
+        assert asyncio.run(tiktok._upload_images("tok", "adv", ["https://x/b.jpg"])) == [first]
+        assert sum(r.url.path.endswith("/file/image/ad/upload/") for r in mock_tiktok_api) == 1
+
+
+class TestTikTokCoalescing:
+    def test_concurrent_identical_gets_share_one_request(self, mock_tiktok_api):
+        import asyncio
+        from app.routers import tiktok
+
+        async def _burst():
+            return await asyncio.gather(*[
+                tiktok._tiktok_api("GET", "/campaign/get/", "tok", params={"advertiser_id": "adv"})
+                for _ in range(5)])
+
+        results = asyncio.run(_burst())
+        assert all(r["code"] == 0 for r in results)
+        assert len(mock_tiktok_api) == 1
+        assert not tiktok._INFLIGHT
+
+
+class TestTikTokVideoPoster:
+    def test_poll_until_poster_ready(self, monkeypatch):
+        import asyncio
+        import httpx
+        from app.routers import tiktok
+
+        polls = []
+
+        def _handler(request):
+            polls.append(request)
+            video = {"video_id": "v1", "poster_url": "https://cdn/p.jpg" if len(polls) >= 3 else ""}
+            return httpx.Response(200, json={"code": 0, "data": {"list": [video]}})
+
+        async def _no_sleep(_):
+            pass
+
+        client = httpx.AsyncClient(base_url=tiktok.TIKTOK_API_BASE, transport=httpx.MockTransport(_handler))
+        monkeypatch.setattr(tiktok, "_http", lambda: client)
+        monkeypatch.setattr(tiktok.asyncio, "sleep", _no_sleep)
+        assert asyncio.run(tiktok._poll_video_poster("tok", "adv", "v1")) == "https://cdn/p.jpg"
+        assert len(polls) == 3
+
+
+class TestTikTokAdCreation:
+    def test_ads_created_paused_winner_enabled_surplus_deleted(self, monkeypatch):
+        import asyncio
+        import json
+        import httpx
+        from app.routers import tiktok
+
+        seen = []
+
+        def _handler(request):
+            body = json.loads(request.content)
+            seen.append((request.url.path, body))
+            if request.url.path.endswith("/ad/create/"):
+                name = body["creatives"][0]["ad_name"]
+                return httpx.Response(200, json={"code": 0, "data": {"ad_ids": [f"ad_{name[-1]}"]}})
+            return httpx.Response(200, json={"code": 0, "data": {}})
+
+        client = httpx.AsyncClient(base_url=tiktok.TIKTOK_API_BASE, transport=httpx.MockTransport(_handler))
+        monkeypatch.setattr(tiktok, "_http", lambda: client)
+
+        candidates = [("first", {"ad_name": "A 1"}, {}), ("second", {"ad_name": "A 2"}, {})]
+        attempts = []
+        winner = asyncio.run(tiktok._first_successful_ad("tok", "adv", "ag", candidates, attempts))
+
+        assert winner["strategy"] == "first" and winner["ad_ids"] == ["ad_1"]
+        creates = [b for p, b in seen if p.endswith("/ad/create/")]
+        assert {b["operation_status"] for b in creates} == {"DISABLE"}
+        updates = [(b["ad_ids"], b["operation_status"]) for p, b in seen if p.endswith("/ad/status/update/")]
+        assert updates == [(["ad_1"], "ENABLE"), (["ad_2"], "DELETE")]
+        assert attempts[1]["ad_ids"] == ["ad_2"] and attempts[1]["discarded"] is True
+
+
+class TestTikTokCampaignsViewInvalidation:
+    def test_invalidation_during_refresh_is_not_overwritten(self, monkeypatch):
+        import asyncio
+        import httpx
+        from app.routers import tiktok, tiktok_campaigns
+
+        creds = {"access_token": "tok", "advertiser_id": "adv_inv"}
+        key = tiktok._campaigns_view_key("adv_inv")
+        tiktok._CACHE.pop(key, None)
+        campaign_gets = []
+
+        async def _run():
+            gate = asyncio.Event()
+            first_sent = asyncio.Event()
+
+            async def _handler(request):
+                if request.url.path.endswith("/campaign/get/"):
+                    campaign_gets.append(request)
+                    if len(campaign_gets) == 1:
+                        first_sent.set()
+                        await gate.wait()
+                        status = "ENABLE"  # pre-mutation state
+                    else:
+                        status = "DISABLE"
+                    return httpx.Response(200, json={"code": 0, "data": {"list": [
+                        {"campaign_id": "1", "campaign_name": "C", "operation_status": status}]}})
+                return httpx.Response(200, json={"code": 0, "data": {"list": []}})
+
+            client = httpx.AsyncClient(base_url=tiktok.TIKTOK_API_BASE, transport=httpx.MockTransport(_handler))
+            monkeypatch.setattr(tiktok, "_http", lambda: client)
+
+            stale = asyncio.create_task(tiktok_campaigns._refresh(key, creds))
+            await first_sent.wait()
+            tiktok._invalidate_campaigns_view("adv_inv")  # e.g. /pause-campaign finished
+
+            # A post-mutation build must not join the (still blocked) pre-mutation request
+            try:
+                fresh = await asyncio.wait_for(tiktok_campaigns._refresh(key, creds), timeout=5)
+            finally:
+                gate.set()
+            await stale
+            return fresh
+
+        fresh = asyncio.run(_run())
+        assert len(campaign_gets) == 2
+        assert fresh["active_campaigns"] == 0
+        assert tiktok._CACHE[key][1] is fresh